@@ -0,0 +1,62 @@
+"""Asynchronous page crawler used by the dataset builders."""
+
+import asyncio
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, List, Optional, Tuple
+
+
+async def crawl_pages_async(
+    fetch_page: Callable[[int], Optional[List[dict]]],
+    handle_page: Callable[[int, Optional[List[dict]]], bool],
+    start_page: int,
+    max_in_flight: int,
+) -> int:
+    """Crawls pages concurrently, while handling them in page order.
+
+    Up to `max_in_flight` pages are fetched at the same time in a thread pool. The
+    pages are handed to `handle_page` strictly in increasing page order, so the
+    results can be appended to the dataset file in the same order as a sequential
+    crawl would have done, which keeps the resume logic working.
+
+    Args:
+        fetch_page (callable):
+            Function that fetches the articles on a given page.
+        handle_page (callable):
+            Function that handles the articles on a given page. Returns False when
+            the crawl should stop, and True otherwise.
+        start_page (int):
+            Page to start the crawl from.
+        max_in_flight (int):
+            Maximum number of pages being fetched at the same time.
+
+    Returns:
+        int:
+            The page at which the crawl stopped.
+    """
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=max_in_flight)
+    in_flight: Deque[Tuple[int, Future]] = deque()
+    next_page = start_page
+
+    try:
+        while True:
+            # Keep the window of in-flight requests full.
+            while len(in_flight) < max_in_flight:
+                future = executor.submit(fetch_page, next_page)
+                in_flight.append((next_page, future))
+                next_page += 1
+
+            # Wait for the oldest page, such that pages are handled in order.
+            page, future = in_flight.popleft()
+            articles = await asyncio.wrap_future(future, loop=loop)
+            if not handle_page(page, articles):
+                return page
+    finally:
+        # Pages fetched beyond the last page are not needed. The fetches that have
+        # already started are waited for, so none of them touches the builder after
+        # the crawl has returned. This is `shutdown(cancel_futures=True)`, which
+        # needs Python 3.9.
+        for _, future in in_flight:
+            future.cancel()
+        executor.shutdown(wait=True)
@@ -1,35 +1,58 @@
 """Base class that builds a dataset with the TV2 Nord API"""
 
+import asyncio
 import logging
 import os
+import threading
 import time
 from abc import ABC, abstractmethod
+from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
 
 import requests
 from omegaconf import DictConfig
 from requests import Response
 
+from .async_crawler import crawl_pages_async
+from .checkpoint import CrawlCheckpoint
 from .constants import (
-    HEADERS,
     INTERNAL_SERVER_ERROR,
+    PARTIAL_CONTENT,
     SERVICE_UNAVAILABLE,
     STATUS_CODE_OK,
+    THROTTLE_STATUS_CODES,
     TOO_MANY_REQUESTS,
 )
 from .exceptions import (
+    CircuitOpenException,
     InternalServerErrorException,
     ServiceUnavailableException,
     StatusCodeException,
     TooManyRequestsException,
 )
-from .utils import init_jsonl, load_jsonl
+from .parquet_store import ParquetDatasetWriter
+from .rate_limiter import build_rate_limiter, parse_retry_after
+from .retry import (
+    HOST_DOWN_EXCEPTIONS,
+    CircuitBreaker,
+    RetryBudget,
+    build_retry_policies,
+    get_retry_policy,
+)
+from .transport import build_transport
+from .utils import JSONL_SUFFIXES, append_jsonl, init_jsonl
+from .uuid_index import UUIDIndex
+from .uuid_set import build_uuid_set
 
 
 class DataSetBuilder(ABC):
     """Base class for building datasets with the TV2 Nord API"""
 
+    # Name and Arrow type of the columns of the Parquet copy of the dataset.
+    parquet_fields: List[Tuple[str, str]] = []
+
     def __init__(self, dataset_name: str, cfg: DictConfig) -> None:
         """Initialize DataSetBuilder (base class).
 
@@ -52,28 +75,90 @@ class DataSetBuilder(ABC):
                 Maximum number of articles per page.
             articles_api_url (str):
                 URL to articles API.
-            dataset (list of dict):
-                Dataset.
-            seen_uuids (set of str):
+            uuid_index (UUIDIndex):
+                Persistent index of the uuids in the dataset file.
+            seen_uuids (CompactUUIDSet):
                 Set of seen uuids.
             current_page (int):
                 Current page to scrape.
-            sleep_length (dict of int):
-                Length of sleep in seconds.
+            checkpoint (CrawlCheckpoint):
+                Manifest of the pages committed to the dataset file.
+            fsync_every_n_pages (int):
+                Number of pages after which the dataset file is synced to disk and
+                the checkpoint persisted. If 0, this is only done when a crawl
+                finishes.
+            n_unsynced_pages (int):
+                Number of pages committed since the dataset file was last synced.
+            compression (str or None):
+                Compression of the dataset file, either "gzip", "zstd" or None.
+            parquet_writer (ParquetDatasetWriter or None):
+                Writer of the Parquet copy of the dataset, or None if it is disabled.
+            n_pages_without_new_data (int):
+                Number of consecutive pages already in the dataset.
+            incremental (bool):
+                Whether to only fetch articles published since the last crawl.
+            stop_after_seen_pages (int):
+                Number of consecutive pages without new data after which an
+                incremental crawl stops.
+            max_in_flight (int):
+                Maximum number of pages fetched concurrently when crawling
+                asynchronously.
+            transport (HTTPTransport or HTTP2Transport):
+                Transport used to send requests.
+            owns_transport (bool):
+                Whether the builder closes the transport when a crawl finishes.
+            rate_limiter (AdaptiveRateLimiter):
+                Rate limiter shared by all requests of the builder.
+            retry_policies (dict of RetryPolicy):
+                Retry policies, keyed by exception class name.
+            retry_budget (RetryBudget):
+                Global budget for retries.
+            circuit_breaker (CircuitBreaker):
+                Per-host circuit breaker.
         """
         self.dataset_name = dataset_name
         self.logger = logging.getLogger(self.dataset_name)
 
         self.read_cfg(cfg)
 
-        # Load dataset currently stored on disk, and use it to set current_page.
-        self.dataset = self.load_dataset() if not self.testing else []
+        # Pooled keep-alive connections shared by all requests of the builder.
+        self.transport = build_transport(cfg["transport"])
+        self.owns_transport = True
+
+        # Adapts the request rate to how the API responds.
+        self.rate_limiter = build_rate_limiter(cfg["rate_limit"])
+
+        # Decide how failed requests are retried.
+        retry_cfg = cfg["retry"]
+        self.retry_policies = build_retry_policies(retry_cfg["policies"])
+        self.retry_budget = RetryBudget(
+            ratio=retry_cfg["budget"]["ratio"],
+            min_retries=retry_cfg["budget"]["min_retries"],
+        )
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=retry_cfg["circuit_breaker"]["failure_threshold"],
+            reset_timeout=retry_cfg["circuit_breaker"]["reset_timeout"],
+        )
+        self._dead_letter_lock = threading.Lock()
+
+        # Remove anything written after the last committed page, in case the previous
+        # crawl crashed in the middle of a page.
+        self.checkpoint = self.load_checkpoint()
+
+        # Get all uuids in the dataset from its index, without loading the dataset.
+        self.uuid_index = self.load_uuid_index()
+        self.seen_uuids = build_uuid_set(cfg["seen_uuids"], self.uuid_index.uuids())
+        self.parquet_writer = self.load_parquet_writer()
 
-        # Get all uuids in dataset
-        self.seen_uuids = set(data["uuid"] for data in self.dataset)
+        # Resume after the furthest committed page. Incremental updates commit the
+        # first pages again, so this is not necessarily the last committed page.
+        self.current_page = (self.checkpoint.last_page or 0) + 1
 
-        # Get page from which the last articles in the dataset was scraped.
-        self.current_page = self.dataset[-1]["page"] if self.dataset else 1
+        # Number of pages committed since the dataset file was last synced to disk.
+        self.n_unsynced_pages = 0
+
+        # Number of consecutive pages already in the dataset, used in incremental mode.
+        self.n_pages_without_new_data = 0
 
         # Get total number of articles in the API at the time of initialization.
         self.total_articles = self.get_total_articles()
@@ -91,12 +176,13 @@ class DataSetBuilder(ABC):
                 Data path.
         """
         if self.dataset_name == "test":
-            data_path = f"{self.dataset_name}.jsonl"
+            data_path = f"{self.dataset_name}{JSONL_SUFFIXES[self.compression]}"
         else:
             dirs = self.cfg["dirs"]
             data = dirs["data"]
             raw = dirs["raw"]
-            data_path = Path(data) / raw / f"{self.dataset_name}.jsonl"
+            file_name = f"{self.dataset_name}{JSONL_SUFFIXES[self.compression]}"
+            data_path = Path(data) / raw / file_name
         return data_path
 
     def get_total_articles(self) -> int:
@@ -114,11 +200,231 @@ class DataSetBuilder(ABC):
         total_articles = data["meta"]["total"]
         return total_articles
 
-    @abstractmethod
     def build_dataset(self) -> None:
-        """Builds dataset."""
+        """Builds dataset.
+
+        Starts from page self.current_page. When a page is reached that has no articles,
+        the method stops and returns None. If `crawler.asynchronous` is set in the
+        config, the pages are fetched concurrently with `build_dataset_async`.
+
+        If `crawler.incremental` is set in the config, the crawl instead starts from
+        the first page, which has the newest articles, and stops once
+        `crawler.stop_after_seen_pages` consecutive pages were already in the dataset.
+        """
+        if self.incremental:
+            self.logger.info("Updating dataset with new articles")
+            self.current_page = 1
+            self.n_pages_without_new_data = 0
+
+        self.start_crawl()
+        try:
+            if self.cfg["crawler"]["asynchronous"]:
+                asyncio.run(self.build_dataset_async())
+            else:
+                self.crawl()
+        finally:
+            self.finish_crawl()
+
+    def start_crawl(self) -> None:
+        """Prepares the builder for handling pages. Called before a crawl starts."""
+        pass
+
+    def finish_crawl(self) -> None:
+        """Writes any data still pending. Called when a crawl has finished.
+
+        Subclasses writing data of their own should do so before calling this method,
+        which persists the pages that have not been synced to disk yet, and closes
+        the pooled connections of the transport if the builder owns it.
+        """
+        if self.n_unsynced_pages:
+            self.checkpoint.persist(self.data_path)
+            self.n_unsynced_pages = 0
+        if self.parquet_writer is not None:
+            self.parquet_writer.flush()
+        if self.owns_transport:
+            self.transport.close()
+
+    def crawl(self) -> None:
+        """Crawls the API one page at a time."""
+        # Iterate over pages until a page with no articles is visited.
+        while True:
+            articles = self.get_page_with_articles(page=self.current_page)
+            if not self.handle_page(self.current_page, articles):
+                return
+
+            self.page_increment()
+
+    async def build_dataset_async(self) -> None:
+        """Crawls the API with up to `max_in_flight` pages being fetched at a time.
+
+        Pages are still handled and appended to the dataset in page order, so the
+        dataset on disk looks the same as if it was built with `crawl`.
+        """
+        last_page = await crawl_pages_async(
+            fetch_page=self.get_page_with_articles,
+            handle_page=self.handle_page,
+            start_page=self.current_page,
+            max_in_flight=self.max_in_flight,
+        )
+        self.current_page = last_page
+
+    def handle_page(self, page: int, articles: Optional[List[dict]]) -> bool:
+        """Processes the articles on a page and appends the new data to the dataset.
+
+        A page that could not be fetched is skipped, as it has been recorded in the
+        dead-letter file. If the API is down, the crawl is stopped instead.
+
+        Args:
+            page (int):
+                Page number.
+            articles (list of dict or None):
+                List of articles data, or None if the page could not be fetched.
+
+        Returns:
+            bool:
+                False if the dataset is done, up to date or the API is down, True
+                otherwise.
+        """
+        self.current_page = page
+
+        if articles is None:
+            api_host = urlparse(self.articles_api_url).netloc
+            if self.circuit_breaker.is_open(api_host):
+                self.logger.info("API is down. Stopping.")
+                return False
+            self.logger.info(f"Skipping page {page}, which could not be fetched.")
+            return True
+
+        if self.dataset_done(articles):
+            self.logger.info("Dataset done.")
+            return False
+
+        # Check against the dataset before processing the page, as processing marks
+        # the uuids on the page as seen.
+        page_seen = self.page_seen(articles)
+
+        new_data = self.process_page(articles)
+
+        # Append new data to dataset.
+        self.write_page(new_data)
+
+        self.log_progress()
+
+        if self.incremental:
+            return not self.up_to_date(page_seen)
+        return True
+
+    def page_seen(self, articles: List[dict]) -> bool:
+        """Checks if all the data on a page is already in the dataset.
+
+        Args:
+            articles (list of dict):
+                List of articles data.
+
+        Returns:
+            bool:
+                True if the page has data for the dataset, and all of it has been seen
+                before, False otherwise.
+        """
+        uuids = self.page_uuids(articles)
+        return bool(uuids) and all(uuid in self.seen_uuids for uuid in uuids)
+
+    def up_to_date(self, page_seen: bool) -> bool:
+        """Checks if an incremental crawl has caught up with the dataset.
+
+        Pages are counted by whether their uuids were already in the dataset, not by
+        whether they produced new data, as new articles can be left out of the dataset,
+        e.g. if they have no summary.
+
+        Args:
+            page_seen (bool):
+                Whether all the data on the current page was already in the dataset.
+
+        Returns:
+            bool:
+                True if the last `stop_after_seen_pages` pages had been seen before,
+                False otherwise.
+        """
+        if page_seen:
+            self.n_pages_without_new_data += 1
+        else:
+            self.n_pages_without_new_data = 0
+
+        if self.n_pages_without_new_data >= self.stop_after_seen_pages:
+            self.logger.info(
+                f"The last {self.n_pages_without_new_data} pages were already in the "
+                "dataset. "
+                "Dataset is up to date."
+            )
+            return True
+        return False
+
+    @abstractmethod
+    def page_uuids(self, articles: List[dict]) -> List[str]:
+        """Gets the uuids of the data on a page that belongs in the dataset.
+
+        Args:
+            articles (list of dict):
+                List of articles data.
+
+        Returns:
+            list of str:
+                Uuids of the data on the page.
+        """
+        pass
+
+    @abstractmethod
+    def process_page(self, articles: List[dict]) -> List[dict]:
+        """Extracts new data from the articles on the current page.
+
+        Args:
+            articles (list of dict):
+                List of articles data.
+
+        Returns:
+            list of dict:
+                New data to append to the dataset.
+        """
         pass
 
+    def write_page(self, new_data: List[dict]) -> None:
+        """Appends the new data from the current page to the dataset, and commits it.
+
+        Args:
+            new_data (list of dict):
+                New data to append to the dataset.
+        """
+        append_jsonl(new_data, self.data_path)
+
+        # Group commit: the dataset file is only synced to disk, and the checkpoint
+        # only persisted, every `fsync_every_n_pages` pages.
+        self.n_unsynced_pages += 1
+        durable = 0 < self.fsync_every_n_pages <= self.n_unsynced_pages
+        self.checkpoint.commit(
+            page=self.current_page,
+            data_path=self.data_path,
+            n_new_records=len(new_data),
+            durable=durable,
+        )
+        if durable:
+            self.n_unsynced_pages = 0
+        self.uuid_index.add_page(
+            page=self.current_page,
+            uuids=(data["uuid"] for data in new_data),
+            n_new_records=len(new_data),
+        )
+        if self.parquet_writer is not None:
+            self.parquet_writer.add_page(new_data)
+
+    def log_progress(self) -> None:
+        """Logs progress of the crawl."""
+        # Most pages will contain 100 articles, but there are some exceptions.
+        # The log might therefore not be exactly correct, but should give a good indication of progress.
+        self.logger.info(
+            f"{self.current_page * self.max_per_page}/{self.total_articles} "
+            f"({self.rate_limiter.state['effective_rate']:.2f} requests/s)"
+        )
+
     def read_cfg(self, cfg: DictConfig) -> None:
         """Reads config.
 
@@ -128,15 +434,16 @@ class DataSetBuilder(ABC):
         """
         self.max_per_page = cfg["api_info"]["max_per_page"]
         self.articles_api_url = cfg["api_info"]["url"]
-        self.sleep_length = {
-            "short": cfg["sleeps"]["short"],
-            "medium": cfg["sleeps"]["medium"],
-            "long": cfg["sleeps"]["long"],
-        }
         self.testing = cfg["testing"]
+        self.max_in_flight = cfg["crawler"]["max_in_flight"]
+        self.incremental = cfg["crawler"]["incremental"]
+        self.stop_after_seen_pages = cfg["crawler"]["stop_after_seen_pages"]
+        self.fsync_every_n_pages = cfg["storage"]["fsync_every_n_pages"]
+        self.compression = cfg["storage"]["compression"]
+        self.parquet_cfg = cfg["storage"]["parquet"]
         self.cfg = cfg
 
-    def get_page_with_articles(self, page: int) -> List[dict]:
+    def get_page_with_articles(self, page: int) -> Optional[List[dict]]:
         """Gets page with articles data from the API.
 
         Args:
@@ -144,31 +451,142 @@ class DataSetBuilder(ABC):
                 Page number.
 
         Returns:
-            list of dict:
-                List of articles data.
+            list of dict or None:
+                List of articles data, or None if the page could not be fetched.
         """
 
         url = f"{self.articles_api_url}?page[number]={page}&page[size]={self.max_per_page}"
         response = self.send_request(url)
         if not response.status_code:
-            return []
+            return None
 
         data = response.json()
         articles = data["data"]
         return articles
 
-    def load_dataset(self) -> List[dict]:
-        """Loads dataset.
+    def sidecar_path(self, suffix: str) -> Path:
+        """Gets path to a file kept next to the dataset file, named after it.
+
+        The name is derived from the name of the dataset file, so that a dataset file
+        with another compression gets its own checkpoint, uuid index and so on. For
+        example, `summary.jsonl` has `summary_checkpoint.json` and `summary.jsonl.zst`
+        has `summary_zst_checkpoint.json`.
+
+        Args:
+            suffix (str):
+                Suffix added to the name of the dataset.
 
         Returns:
-            list of dict:
-                Dataset.
+            Path:
+                Sidecar path.
         """
+        data_path = Path(self.data_path)
+        stem = data_path.name.replace(".jsonl", "").replace(".", "_")
+        return data_path.with_name(f"{stem}{suffix}")
+
+    @property
+    def uuid_index_path(self) -> Path:
+        """Gets path to the uuid index of the dataset.
+
+        Returns:
+            Path:
+                Uuid index path.
+        """
+        return self.sidecar_path("_uuids.sqlite")
+
+    def load_uuid_index(self) -> UUIDIndex:
+        """Opens the uuid index of the dataset.
+
+        The index is rebuilt from the dataset file if it does not cover the same
+        records as the checkpoint, such as for datasets built before the index was
+        introduced, or when a crawl crashed between committing a page and indexing
+        it.
+
+        Returns:
+            UUIDIndex:
+                Uuid index.
+        """
+        if self.testing:
+            return UUIDIndex(":memory:")
+
         if not os.path.exists(self.data_path):
             init_jsonl(self.data_path)
 
-        dataset = load_jsonl(self.data_path)
-        return dataset
+        uuid_index = UUIDIndex(self.uuid_index_path)
+        if uuid_index.n_records != self.checkpoint.n_records:
+            self.logger.info("Rebuilding the uuid index from the dataset file")
+            uuid_index.rebuild(self.data_path, n_records=self.checkpoint.n_records)
+        return uuid_index
+
+    @property
+    def parquet_path(self) -> Path:
+        """Gets path to the folder of the Parquet copy of the dataset.
+
+        Returns:
+            Path:
+                Parquet folder.
+        """
+        return self.sidecar_path("_parquet")
+
+    def load_parquet_writer(self) -> Optional[ParquetDatasetWriter]:
+        """Opens the writer of the Parquet copy of the dataset, if it is enabled.
+
+        The Parquet copy is brought up to date with the committed records of the
+        dataset file, which stays the source of truth of the checkpoint.
+
+        Returns:
+            ParquetDatasetWriter or None:
+                Parquet writer, or None if the Parquet copy is disabled.
+        """
+        if self.testing or not self.parquet_cfg["enabled"]:
+            return None
+
+        parquet_writer = ParquetDatasetWriter(
+            folder=self.parquet_path,
+            fields=self.parquet_fields,
+            pages_per_row_group=self.parquet_cfg["pages_per_row_group"],
+        )
+        parquet_writer.sync(self.data_path, n_records=self.checkpoint.n_records)
+        return parquet_writer
+
+    @property
+    def checkpoint_path(self) -> Path:
+        """Gets path to the checkpoint manifest of the dataset.
+
+        Returns:
+            Path:
+                Checkpoint path.
+        """
+        return self.sidecar_path("_checkpoint.json")
+
+    def load_checkpoint(self) -> CrawlCheckpoint:
+        """Loads the checkpoint manifest, and truncates any uncommitted data.
+
+        Datasets built before checkpoints were introduced get a manifest created from
+        the records in the dataset file.
+
+        Returns:
+            CrawlCheckpoint:
+                Checkpoint.
+        """
+        if self.testing:
+            return CrawlCheckpoint(self.checkpoint_path)
+
+        if self.checkpoint_path.exists():
+            checkpoint = CrawlCheckpoint.load(self.checkpoint_path)
+        else:
+            checkpoint = CrawlCheckpoint.from_dataset(
+                self.checkpoint_path, self.data_path
+            )
+            if os.path.exists(self.data_path):
+                checkpoint.save()
+
+        n_truncated = checkpoint.recover(self.data_path)
+        if n_truncated:
+            self.logger.info(
+                f"Truncated {n_truncated} bytes written after the last committed page."
+            )
+        return checkpoint
 
     def dataset_done(self, articles: List[dict]) -> bool:
         """Checks if dataset is done.
@@ -187,33 +605,75 @@ class DataSetBuilder(ABC):
         """
         return not bool(articles)
 
-    def sleep(self) -> None:
-        """Sleep to avoid getting blocked by the API."""
-        time.sleep(self.sleep_length["medium"])
-
     def page_increment(self) -> None:
         """Increments current page."""
         self.current_page += 1
 
-    def send_request(self, url: str, n_requests: int = 100) -> requests.Response:
+    def send_request(
+        self,
+        url: str,
+        n_requests: int = 100,
+        headers: Optional[Dict[str, str]] = None,
+        stream: bool = False,
+    ) -> requests.Response:
         """Sends request.
 
+        Every attempt waits for the rate limiter. The rate is increased when the
+        request succeeds and decreased when the API is overloaded, in which case a
+        `Retry-After` header from the API is respected.
+
+        Failed attempts are retried with exponential backoff and jitter, following
+        the retry policy configured for the type of error, as long as the global
+        retry budget allows it. Requests to a host whose circuit breaker is open
+        fail immediately. Requests that fail for good are recorded in the
+        dead-letter file, so they can be retried later.
+
         Args:
             url (str):
                 Url to send request to.
             n_requests (int):
-                Number of requests to send, before giving up.
+                Maximum number of requests to send, before giving up.
+            headers (dict of str, optional):
+                Extra headers for the request. If it contains a `Range` header, a
+                206 Partial Content response counts as a success. Defaults to None.
+            stream (bool):
+                Whether to stream the response body. Defaults to False.
 
         Returns:
             requests.Response:
                 Response object - empty if request failed.
         """
-        for _ in range(n_requests):
+        host = urlparse(url).netloc
+        self.retry_budget.record_request()
+
+        success_status_codes = [STATUS_CODE_OK]
+        if headers is not None and "Range" in headers:
+            success_status_codes.append(PARTIAL_CONTENT)
+
+        n_attempts = 0
+        while True:
+            if not self.circuit_breaker.allow_request(host):
+                error: Exception = CircuitOpenException(
+                    f"Request failed for url: {url} because the circuit for host: {host} is open"
+                )
+                break
+
+            n_attempts += 1
             try:
-                response = requests.get(
-                    url, headers=HEADERS, timeout=self.cfg["timeout"]
+                self.rate_limiter.acquire()
+                response = self.transport.get(
+                    url, timeout=self.cfg["timeout"], headers=headers, stream=stream
                 )
 
+                if response.status_code in THROTTLE_STATUS_CODES:
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    self.rate_limiter.on_throttle(retry_after=retry_after)
+
+                # Give the connection of an error response back to the pool, also
+                # when its body is streamed.
+                if response.status_code not in success_status_codes:
+                    response.close()
+
                 if response.status_code == TOO_MANY_REQUESTS:
                     raise TooManyRequestsException(
                         f"Request failed for url: {url} because of too many requests"
@@ -229,36 +689,82 @@ class DataSetBuilder(ABC):
                         f"Request failed for url: {url} because of internal server error"
                     )
 
-                elif response.status_code != STATUS_CODE_OK:
+                elif response.status_code not in success_status_codes:
                     raise StatusCodeException(
                         f"Request failed for url: {url} with status code: {response.status_code}"
                     )
 
                 else:
+                    self.rate_limiter.on_success()
+                    self.circuit_breaker.record_success(host)
                     return response
 
-            except requests.RequestException:
+            except requests.RequestException as e:
+                # Transport errors are left to the retry policy, as only the server
+                # can ask us to slow down.
                 self.logger.info(f"Request failed for url: {url}")
-                time.sleep(self.sleep_length["medium"])
-
-            except TooManyRequestsException as e:
+                error = e
+
+            except (
+                TooManyRequestsException,
+                ServiceUnavailableException,
+                InternalServerErrorException,
+                StatusCodeException,
+            ) as e:
                 self.logger.info(e)
-                time.sleep(self.sleep_length["long"])
+                error = e
 
-            except ServiceUnavailableException as e:
-                self.logger.info(e)
-                time.sleep(self.sleep_length["long"])
+            # Only errors showing that the host is down count towards opening the circuit.
+            if isinstance(error, HOST_DOWN_EXCEPTIONS):
+                self.circuit_breaker.record_failure(host)
+            else:
+                self.circuit_breaker.record_success(host)
 
-            except InternalServerErrorException as e:
-                self.logger.info(e)
-                time.sleep(self.sleep_length["long"])
+            policy = get_retry_policy(self.retry_policies, error)
+            if policy is None or n_attempts >= min(n_requests, policy.max_attempts):
+                break
+            if not self.retry_budget.try_retry():
+                self.logger.info("Retry budget spent.")
+                break
 
-            except StatusCodeException as e:
-                self.logger.info(e)
-                time.sleep(self.sleep_length["medium"])
+            time.sleep(policy.delay(n_attempts))
 
         self.logger.info(
-            f"Request failed for url: {url} after {n_requests} requests. Skipping this request."
+            f"Request failed for url: {url} after {n_attempts} requests. Skipping this request."
         )
+        self.write_dead_letter(url=url, error=error, n_attempts=n_attempts)
 
         return Response()
+
+    @property
+    def dead_letter_path(self) -> Path:
+        """Gets path to the file with requests that failed for good.
+
+        Returns:
+            Path:
+                Dead-letter path.
+        """
+        return self.sidecar_path("_dead_letter.jsonl")
+
+    def write_dead_letter(self, url: str, error: Exception, n_attempts: int) -> None:
+        """Records a request that failed for good in the dead-letter file.
+
+        Args:
+            url (str):
+                Url of the request.
+            error (Exception):
+                Error of the last attempt.
+            n_attempts (int):
+                Number of attempts made.
+        """
+        if self.testing or not self.cfg["retry"]["dead_letter"]:
+            return
+
+        dead_letter = {
+            "url": url,
+            "error": f"{type(error).__name__}: {error}",
+            "n_attempts": n_attempts,
+            "time": datetime.now().isoformat(),
+        }
+        with self._dead_letter_lock:
+            append_jsonl([dead_letter], self.dead_letter_path)
@@ -0,0 +1,219 @@
+"""Checkpoint manifest recording which pages have been committed to a dataset."""
+
+import json
+import os
+from pathlib import Path
+from typing import List, Optional, Set, Union
+
+from .utils import iter_jsonl_frames
+
+
+class CrawlCheckpoint:
+    """Manifest of the pages committed to a JSONL dataset file.
+
+    After the records of a page have been appended to the dataset file, the page is
+    committed by atomically replacing the manifest with one recording the page, the
+    size of the dataset file and the number of records in it. Anything in the
+    dataset file beyond the recorded size was written by a page that never got
+    committed, and is truncated away when the crawl is resumed.
+
+    Args:
+        path (str or Path):
+            Path to the manifest.
+
+    Attributes:
+        path (Path):
+            Path to the manifest.
+        completed_pages (list of list of int):
+            Committed pages, as sorted and disjoint inclusive ranges.
+        offset (int):
+            Size in bytes of the dataset file after the last commit.
+        n_records (int):
+            Number of records in the dataset file after the last commit.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self.completed_pages: List[List[int]] = []
+        self.offset = 0
+        self.n_records = 0
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "CrawlCheckpoint":
+        """Loads a checkpoint manifest.
+
+        Args:
+            path (str or Path):
+                Path to the manifest.
+
+        Returns:
+            CrawlCheckpoint:
+                The checkpoint, which is empty if the manifest does not exist.
+        """
+        checkpoint = cls(path)
+        if checkpoint.path.exists():
+            with open(checkpoint.path, "r") as f:
+                manifest = json.load(f)
+            checkpoint.completed_pages = manifest["completed_pages"]
+            checkpoint.offset = manifest["offset"]
+            checkpoint.n_records = manifest["n_records"]
+        return checkpoint
+
+    @classmethod
+    def from_dataset(
+        cls, path: Union[str, Path], data_path: Union[str, Path]
+    ) -> "CrawlCheckpoint":
+        """Creates a checkpoint from a dataset file that was written without one.
+
+        Every complete record in the file is counted, and the pages of the records
+        are marked as committed, except for the last page, which might only have been
+        partly written. The offset is set to the end of the last complete record, or
+        frame of a compressed file, so a truncated end is removed by `recover`.
+
+        Args:
+            path (str or Path):
+                Path to the manifest.
+            data_path (str or Path):
+                Path to the dataset file.
+
+        Returns:
+            CrawlCheckpoint:
+                The checkpoint.
+        """
+        checkpoint = cls(path)
+        if not os.path.exists(data_path):
+            return checkpoint
+
+        offset = 0
+        pages: Set[int] = set()
+        for offset, records in iter_jsonl_frames(str(data_path)):
+            checkpoint.n_records += len(records)
+            pages.update(record["page"] for record in records)
+
+        if pages:
+            pages.remove(max(pages))
+        for page in pages:
+            checkpoint._add_page(page)
+        checkpoint.offset = offset
+        return checkpoint
+
+    @property
+    def last_page(self) -> Optional[int]:
+        """Gets the furthest committed page.
+
+        Returns:
+            int or None:
+                The furthest committed page, or None if no page has been committed.
+        """
+        return self.completed_pages[-1][1] if self.completed_pages else None
+
+    def is_completed(self, page: int) -> bool:
+        """Checks whether a page has been committed.
+
+        Args:
+            page (int):
+                Page number.
+
+        Returns:
+            bool:
+                True if the page has been committed, False otherwise.
+        """
+        return any(start <= page <= end for start, end in self.completed_pages)
+
+    def recover(self, data_path: Union[str, Path]) -> int:
+        """Truncates anything written to the dataset file after the last commit.
+
+        Args:
+            data_path (str or Path):
+                Path to the dataset file.
+
+        Returns:
+            int:
+                Number of bytes truncated.
+        """
+        if not os.path.exists(data_path):
+            return 0
+
+        size = os.path.getsize(data_path)
+        if size <= self.offset:
+            return 0
+
+        with open(data_path, "r+b") as f:
+            f.truncate(self.offset)
+            f.flush()
+            os.fsync(f.fileno())
+        return size - self.offset
+
+    def commit(
+        self,
+        page: int,
+        data_path: Union[str, Path],
+        n_new_records: int,
+        durable: bool = True,
+    ) -> None:
+        """Commits a page, whose records have been appended to the dataset file.
+
+        A durable commit flushes the dataset file to disk before the manifest is
+        replaced, so the manifest never points beyond data that has been persisted.
+        Other commits only record the page in memory, so several pages can be
+        persisted together by a later durable commit or a call to `persist`.
+
+        Args:
+            page (int):
+                Page number.
+            data_path (str or Path):
+                Path to the dataset file.
+            n_new_records (int):
+                Number of records appended for the page.
+            durable (bool):
+                Whether to persist the commit. Defaults to True.
+        """
+        self.n_records += n_new_records
+        self._add_page(page)
+        if durable:
+            self.persist(data_path)
+        else:
+            self.offset = os.path.getsize(data_path)
+
+    def persist(self, data_path: Union[str, Path]) -> None:
+        """Flushes the dataset file to disk, and then saves the manifest.
+
+        Args:
+            data_path (str or Path):
+                Path to the dataset file.
+        """
+        with open(data_path, "rb") as f:
+            os.fsync(f.fileno())
+            self.offset = os.fstat(f.fileno()).st_size
+        self.save()
+
+    def save(self) -> None:
+        """Atomically writes the manifest, by writing a temporary file and renaming it."""
+        manifest = {
+            "completed_pages": self.completed_pages,
+            "offset": self.offset,
+            "n_records": self.n_records,
+        }
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def _add_page(self, page: int) -> None:
+        """Adds a page to the completed pages, merging adjacent ranges.
+
+        Args:
+            page (int):
+                Page number.
+        """
+        ranges = self.completed_pages + [[page, page]]
+        ranges.sort()
+        merged: List[List[int]] = []
+        for start, end in ranges:
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self.completed_pages = merged
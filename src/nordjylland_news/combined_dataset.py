@@ -0,0 +1,166 @@
+"""Class that builds several datasets in a single pass over the TV2 Nord API."""
+
+import asyncio
+import logging
+from typing import List, Optional, Set
+
+from omegaconf import DictConfig
+
+from .async_crawler import crawl_pages_async
+from .base_dataset_class import DataSetBuilder
+
+
+class CombinedDataSetBuilder:
+    """Builds several datasets while fetching every page of articles only once.
+
+    Every page is fetched once and handed to each of the registered dataset
+    builders, which extract their own data from the articles and append it to their
+    own dataset file. Each builder keeps its own `seen_uuids` and resume point. The
+    transport, rate limiter, retry budget and circuit breaker of the first builder
+    are shared by all builders, so all requests count towards the same limits.
+
+    Args:
+        cfg (DictConfig):
+            Hydra config.
+        builders (list of DataSetBuilder, optional):
+            Dataset builders to register. More can be added with `register`.
+            Defaults to None.
+
+    Attributes:
+        cfg (DictConfig):
+            Hydra config.
+        logger (logging.Logger):
+            Logger.
+        builders (list of DataSetBuilder):
+            Registered dataset builders.
+        start_pages (list of int):
+            Page each registered builder resumes from.
+        finished (set of int):
+            Indices of the builders that are done with the current crawl.
+    """
+
+    def __init__(
+        self, cfg: DictConfig, builders: Optional[List[DataSetBuilder]] = None
+    ) -> None:
+        self.cfg = cfg
+        self.logger = logging.getLogger("combined")
+        self.builders: List[DataSetBuilder] = []
+        self.start_pages: List[int] = []
+        self.finished: Set[int] = set()
+        for builder in builders or []:
+            self.register(builder)
+
+    def register(self, builder: DataSetBuilder) -> None:
+        """Registers a dataset builder, which will receive every crawled page.
+
+        Args:
+            builder (DataSetBuilder):
+                Dataset builder to register.
+        """
+        if self.builders:
+            first = self.builders[0]
+            builder.transport.close()
+            builder.transport = first.transport
+            builder.owns_transport = False
+            builder.rate_limiter = first.rate_limiter
+            builder.retry_budget = first.retry_budget
+            builder.circuit_breaker = first.circuit_breaker
+
+        self.builders.append(builder)
+        self.start_pages.append(builder.current_page)
+
+    @property
+    def current_page(self) -> int:
+        """Gets the page to resume from, which is the earliest page of any builder.
+
+        Returns:
+            int:
+                Current page.
+        """
+        return min(self.start_pages)
+
+    def build_dataset(self) -> None:
+        """Builds all registered datasets in a single pass over the API.
+
+        Starts from the earliest page any of the builders has to resume from. When a
+        page is reached that has no articles, the method stops and returns None. In
+        incremental mode all builders start from the first page, and the crawl stops
+        once all of them are up to date.
+        """
+        if self.cfg["crawler"]["incremental"]:
+            self.start_pages = [1] * len(self.builders)
+            for builder in self.builders:
+                builder.n_pages_without_new_data = 0
+        self.finished = set()
+
+        self.logger.info(
+            "Building datasets: "
+            + ", ".join(builder.dataset_name for builder in self.builders)
+        )
+        for builder in self.builders:
+            builder.start_crawl()
+        try:
+            if self.cfg["crawler"]["asynchronous"]:
+                asyncio.run(self.build_dataset_async())
+            else:
+                self.crawl()
+        finally:
+            # The first builder owns the shared transport, so it is finished last,
+            # once the others are done downloading.
+            for builder in reversed(self.builders):
+                builder.finish_crawl()
+
+    def crawl(self) -> None:
+        """Crawls the API one page at a time."""
+        page = self.current_page
+        while True:
+            articles = self.get_page_with_articles(page=page)
+            if not self.handle_page(page, articles):
+                return
+            page += 1
+
+    async def build_dataset_async(self) -> None:
+        """Crawls the API with up to `max_in_flight` pages being fetched at a time."""
+        await crawl_pages_async(
+            fetch_page=self.get_page_with_articles,
+            handle_page=self.handle_page,
+            start_page=self.current_page,
+            max_in_flight=self.cfg["crawler"]["max_in_flight"],
+        )
+
+    def get_page_with_articles(self, page: int) -> Optional[List[dict]]:
+        """Gets page with articles data from the API.
+
+        Args:
+            page (int):
+                Page number.
+
+        Returns:
+            list of dict or None:
+                List of articles data, or None if the page could not be fetched.
+        """
+        return self.builders[0].get_page_with_articles(page)
+
+    def handle_page(self, page: int, articles: Optional[List[dict]]) -> bool:
+        """Hands the articles on a page to every builder that has reached the page.
+
+        Builders that are done, because they returned False for an earlier page, do
+        not receive any more pages.
+
+        Args:
+            page (int):
+                Page number.
+            articles (list of dict or None):
+                List of articles data, or None if the page could not be fetched.
+
+        Returns:
+            bool:
+                False if all datasets are done, True otherwise.
+        """
+        for i, (builder, start_page) in enumerate(zip(self.builders, self.start_pages)):
+            # Builders resuming from a later page have already handled this page.
+            if i in self.finished or page < start_page:
+                continue
+            if not builder.handle_page(page, articles):
+                self.finished.add(i)
+        return len(self.finished) < len(self.builders)
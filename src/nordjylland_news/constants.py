@@ -5,6 +5,10 @@ HEADERS = {"Accept": "application/json", "Authorization": "centered"}
 
 # Status codes
 STATUS_CODE_OK = 200
+PARTIAL_CONTENT = 206
 TOO_MANY_REQUESTS = 429
 INTERNAL_SERVER_ERROR = 500
 SERVICE_UNAVAILABLE = 503
+
+# Status codes telling us to slow down
+THROTTLE_STATUS_CODES = (TOO_MANY_REQUESTS, INTERNAL_SERVER_ERROR, SERVICE_UNAVAILABLE)
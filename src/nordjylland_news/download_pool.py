@@ -0,0 +1,77 @@
+"""Pool of worker threads downloading files from a bounded job queue."""
+
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+
+class DownloadPool:
+    """Pool of worker threads that drain a bounded queue of download jobs.
+
+    The producer is blocked by `submit` when the queue is full, so the number of
+    jobs waiting to be downloaded stays bounded when the downloads cannot keep up.
+
+    Args:
+        download (callable):
+            Function doing a single download. It is called with the job, and its
+            return value is set as the result of the job's future.
+        n_workers (int):
+            Number of worker threads.
+        queue_size (int):
+            Maximum number of jobs waiting in the queue.
+
+    Attributes:
+        n_workers (int):
+            Number of worker threads.
+    """
+
+    def __init__(
+        self, download: Callable[[Any], Any], n_workers: int, queue_size: int
+    ) -> None:
+        self.download = download
+        self.n_workers = n_workers
+        self._jobs: "queue.Queue[Optional[Tuple[Any, Future]]]" = queue.Queue(
+            maxsize=queue_size
+        )
+        self._workers: List[threading.Thread] = []
+        for _ in range(n_workers):
+            worker = threading.Thread(target=self._work, daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, job: Any) -> Future:
+        """Puts a job on the queue, blocking while the queue is full.
+
+        Args:
+            job:
+                Job to download.
+
+        Returns:
+            Future:
+                Future holding the result of the download.
+        """
+        future: Future = Future()
+        self._jobs.put((job, future))
+        return future
+
+    def close(self) -> None:
+        """Waits for all queued jobs to finish, and stops the workers."""
+        for _ in self._workers:
+            self._jobs.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+    def _work(self) -> None:
+        """Downloads jobs from the queue until told to stop."""
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                return
+
+            job, future = item
+            try:
+                future.set_result(self.download(job))
+            except Exception as e:
+                future.set_exception(e)
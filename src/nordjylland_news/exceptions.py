@@ -1,3 +1,7 @@
+class CircuitOpenException(Exception):
+    pass
+
+
 class InternalServerErrorException(Exception):
     pass
 
@@ -0,0 +1,218 @@
+"""Streaming extraction of the text of HTML fragments."""
+
+import re
+from html.entities import html5
+from html.parser import HTMLParser
+from typing import List, Optional, Tuple
+
+# Tags whose text is not part of the text of the document
+SKIPPED_TAGS = {"rp", "rt", "script", "style", "template"}
+
+# Tags that never have any content, so they are closed as soon as they are opened
+VOID_TAGS = {
+    "area",
+    "base",
+    "basefont",
+    "bgsound",
+    "br",
+    "col",
+    "command",
+    "embed",
+    "frame",
+    "hr",
+    "image",
+    "img",
+    "input",
+    "isindex",
+    "keygen",
+    "link",
+    "menuitem",
+    "meta",
+    "nextid",
+    "param",
+    "source",
+    "spacer",
+    "track",
+    "wbr",
+}
+
+# Characters of the named character references, without their trailing semicolon
+ENTITIES = {name.rstrip(";"): character for name, character in html5.items()}
+
+# Leading digits of a malformed numeric character reference
+DECIMAL_REFERENCE = re.compile(r"^([0-9]+)(.*)")
+HEX_REFERENCE = re.compile(r"^([0-9a-f]+)(.*)")
+
+
+class HTMLTextExtractor(HTMLParser):
+    """HTML tokenizer that collects the text of a fragment without building a tree.
+
+    The text is the same as `BeautifulSoup(html, "html.parser").get_text(separator="
+    ", strip=True)`: every run of text between two tokens is stripped, empty runs are
+    dropped, and the rest are joined by spaces. Comments, declarations, processing
+    instructions and the text inside `script`, `style`, `template` and ruby
+    annotation tags are left out. Only the stack of open tags is kept, and end tags
+    close the open tags the same way as in the BeautifulSoup tree.
+
+    Attributes:
+        strings (list of str):
+            Stripped runs of text collected so far.
+    """
+
+    def __init__(self) -> None:
+        # Character references are resolved by the handlers below, the same way
+        # BeautifulSoup resolves them.
+        super().__init__(convert_charrefs=False)
+        self.strings: List[str] = []
+        self._data: List[str] = []
+        self._open_tags: List[str] = []
+        self._n_open_skipped = 0
+        self._closed_void_tags: List[str] = []
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        self._flush()
+        if tag in VOID_TAGS:
+            # A later end tag of a void tag is ignored.
+            self._closed_void_tags.append(tag)
+            return
+        self._open_tags.append(tag)
+        if tag in SKIPPED_TAGS:
+            self._n_open_skipped += 1
+
+    def handle_startendtag(
+        self, tag: str, attrs: List[Tuple[str, Optional[str]]]
+    ) -> None:
+        self._flush()
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in self._closed_void_tags:
+            self._closed_void_tags.remove(tag)
+            return
+
+        self._flush()
+        if tag not in self._open_tags:
+            return
+
+        # Close the most recently opened tag with the name, and every tag inside it.
+        while True:
+            open_tag = self._open_tags.pop()
+            if open_tag in SKIPPED_TAGS:
+                self._n_open_skipped -= 1
+            if open_tag == tag:
+                return
+
+    def handle_data(self, data: str) -> None:
+        self._data.append(data)
+
+    def handle_entityref(self, name: str) -> None:
+        # Unknown entities are kept as text, without their semicolon.
+        self._data.append(ENTITIES.get(name, f"&{name}"))
+
+    def handle_charref(self, name: str) -> None:
+        base, pattern = 10, DECIMAL_REFERENCE
+        if name[:1] in ("x", "X"):
+            name = name[1:]
+            base, pattern = 16, HEX_REFERENCE
+
+        try:
+            self._data.append(numeric_reference_to_text(int(name, base)))
+        except ValueError:
+            # Malformed references are resolved from their leading digits, and
+            # anything after the digits is kept as text.
+            match = pattern.search(name)
+            if match is None:
+                self._data.append(name)
+            else:
+                digits, extra = match.groups()
+                self._data.append(numeric_reference_to_text(int(digits, base)))
+                self._data.append(extra)
+
+    def handle_comment(self, data: str) -> None:
+        self._flush()
+
+    def handle_decl(self, decl: str) -> None:
+        self._flush()
+
+    def handle_pi(self, data: str) -> None:
+        self._flush()
+
+    def unknown_decl(self, data: str) -> None:
+        self._flush()
+        # CDATA sections are text, even inside skipped tags.
+        if data.startswith("CDATA["):
+            self._add_string(data[len("CDATA[") :])
+
+    def close(self) -> None:
+        super().close()
+        self._flush()
+
+    def _flush(self) -> None:
+        """Ends the current run of text, keeping it if it is part of the text."""
+        if not self._data:
+            return
+        if not self._n_open_skipped:
+            self._add_string("".join(self._data))
+        self._data = []
+
+    def _add_string(self, string: str) -> None:
+        """Adds a run of text to the collected strings, unless it is empty.
+
+        Args:
+            string (str):
+                Run of text.
+        """
+        string = string.strip()
+        if string:
+            self.strings.append(string)
+
+
+def numeric_reference_to_text(number: int) -> str:
+    """Resolves a numeric character reference, as described in the HTML standard.
+
+    Args:
+        number (int):
+            Number of the character reference.
+
+    Returns:
+        str:
+            The referenced character.
+
+    Examples:
+        >>> numeric_reference_to_text(230), numeric_reference_to_text(150)
+        ('æ', '–')
+    """
+    if number == 0 or number > 0x10FFFF or 0xD800 <= number <= 0xDFFF:
+        return "\ufffd"
+
+    # References to C1 controls were most likely meant as Windows-1252 characters.
+    if 0x80 <= number <= 0x9F:
+        try:
+            return bytes([number]).decode("cp1252")
+        except UnicodeDecodeError:
+            pass
+    return chr(number)
+
+
+def stream_html_to_text(html: str) -> str:
+    """Converts html to text with a streaming tokenizer.
+
+    Args:
+        html (str):
+            Html to convert.
+
+    Returns:
+        str:
+            Text from html.
+
+    Examples:
+        >>> stream_html_to_text("<p>Hello <b>world</b></p><script>x = 1</script>")
+        'Hello world'
+    """
+    # Plain text needs no parsing.
+    if "<" not in html and "&" not in html:
+        return html.strip()
+
+    extractor = HTMLTextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return " ".join(extractor.strings)
@@ -1,13 +1,19 @@
 """Class that builds the image caption dataset."""
 
-import time
+import os
+from collections import deque
+from concurrent.futures import Future
 from pathlib import Path
-from typing import Dict, List
+from typing import Deque, Dict, List, Optional, Tuple
 
+import requests
 from omegaconf import DictConfig
 
 from .base_dataset_class import DataSetBuilder
-from .utils import append_jsonl
+from .constants import PARTIAL_CONTENT
+from .download_pool import DownloadPool
+from .image_store import ContentAddressedImageStore
+from .parquet_store import IMAGE_CAPTION_FIELDS
 
 
 class ImageCaptionDataSetBuilder(DataSetBuilder):
@@ -32,23 +38,71 @@ class ImageCaptionDataSetBuilder(DataSetBuilder):
             Maximum number of articles per page.
         articles_api_url (str):
             URL to articles API.
-        dataset (list of dict):
-            Dataset.
-        seen_uuids (set of str):
+        uuid_index (UUIDIndex):
+            Persistent index of the uuids in the dataset file.
+        seen_uuids (CompactUUIDSet):
             Set of seen uuids.
         current_page (int):
             Current page to scrape.
-        sleep_length (dict of int):
-            Length of sleep in seconds.
+        checkpoint (CrawlCheckpoint):
+            Manifest of the pages committed to the dataset file.
+        fsync_every_n_pages (int):
+            Number of pages after which the dataset file is synced to disk and the
+            checkpoint persisted. If 0, this is only done when a crawl finishes.
+        n_unsynced_pages (int):
+            Number of pages committed since the dataset file was last synced.
+        compression (str or None):
+            Compression of the dataset file, either "gzip", "zstd" or None.
+        parquet_writer (ParquetDatasetWriter or None):
+            Writer of the Parquet copy of the dataset, or None if it is disabled.
+        n_pages_without_new_data (int):
+            Number of consecutive pages already in the dataset.
+        incremental (bool):
+            Whether to only fetch articles published since the last crawl.
+        stop_after_seen_pages (int):
+            Number of consecutive pages without new data after which an incremental
+            crawl stops.
+        max_in_flight (int):
+            Maximum number of pages fetched concurrently when crawling asynchronously.
+        transport (HTTPTransport or HTTP2Transport):
+            Transport used to send requests.
+        owns_transport (bool):
+            Whether the builder closes the transport when a crawl finishes.
+        rate_limiter (AdaptiveRateLimiter):
+            Rate limiter shared by all requests of the builder.
+        retry_policies (dict of RetryPolicy):
+            Retry policies, keyed by exception class name.
+        retry_budget (RetryBudget):
+            Global budget for retries.
+        circuit_breaker (CircuitBreaker):
+            Per-host circuit breaker.
         new_data (list of dict):
             New data to append to dataset.
+        new_downloads (list of Future):
+            Downloads of the images in `new_data`.
         image_folder (pathlib.Path):
             Path to image folder.
+        image_store (ContentAddressedImageStore):
+            Store of the downloaded images, keyed by their hash.
+        download_pool (DownloadPool or None):
+            Pool of workers downloading images during a crawl.
+        pending_pages (deque of tuple):
+            Pages whose data is waiting for its images to be downloaded, as tuples
+            of page number, new data and downloads.
     """
 
+    parquet_fields = IMAGE_CAPTION_FIELDS
+
     def __init__(self, cfg: DictConfig) -> None:
         dataset_name = cfg["dataset_names"]["image_caption"]
         self.image_folder = Path(cfg["dirs"]["image_folder"])
+        self.image_store = ContentAddressedImageStore(
+            root=self.image_folder,
+            shard_depth=cfg["image_store"]["shard_depth"],
+            shard_width=cfg["image_store"]["shard_width"],
+        )
+        self.download_pool: Optional[DownloadPool] = None
+        self.pending_pages: Deque[Tuple[int, List[dict], List[Future]]] = deque()
         super().__init__(dataset_name=dataset_name, cfg=cfg)
 
     def build_dataset(self) -> None:
@@ -59,38 +113,113 @@ class ImageCaptionDataSetBuilder(DataSetBuilder):
         """
 
         self.logger.info("Building image caption dataset")
+        super().build_dataset()
 
-        # Iterate over pages until a page with no articles is visited.
-        while True:
-            self.new_data: List[Dict] = []
-            articles = self.get_page_with_articles(page=self.current_page)
-
-            if self.dataset_done(articles):
-                self.logger.info("Dataset done.")
-                return
-            else:
-                # Iterate over articles on current page
-                for article in articles:
-                    # Appends image meta data to self.new_image_meta_data for every image with a caption in the article
-                    self.get_image_data(article)
-
-            # Append new data to dataset.
-            append_jsonl(self.new_data, self.data_path, keys_to_str=["file_name"])
-
-            # Log progess
-            # Most pages will contain 100 articles, but there are some exceptions.
-            # The log might therefore not be exactly correct, but should give a good indication of progress.
-            self.logger.info(
-                f"{self.current_page * self.max_per_page}/{self.total_articles}"
-            )
+    def process_page(self, articles: List[dict]) -> List[dict]:
+        """Gets image meta data for every new image with a caption on the current page.
+
+        Args:
+            articles (list of dict):
+                List of articles data.
+
+        Returns:
+            list of dict:
+                New data to append to dataset.
+        """
+        self.new_data: List[Dict] = []
+        self.new_downloads: List[Future] = []
+
+        # Iterate over articles on current page
+        for article in articles:
+            # Appends image meta data to self.new_data for every image with a caption in the article
+            self.get_image_data(article)
+        return self.new_data
+
+    def page_uuids(self, articles: List[dict]) -> List[str]:
+        """Gets the uuids of the images with a caption on the current page.
+
+        Args:
+            articles (list of dict):
+                List of articles data.
+
+        Returns:
+            list of str:
+                Uuids of the images.
+        """
+        return [
+            content["content"]["image_uuid"]
+            for article in articles
+            for content in article["content"]
+            if content["type"] == "Image"
+            and content["content"]["caption"] is not None
+            and len(content["content"]["caption"]) > 1
+        ]
 
-            self.page_increment()
+    def start_crawl(self) -> None:
+        """Starts the pool of workers downloading images."""
+        self.download_pool = DownloadPool(
+            download=self._download_job,
+            n_workers=self.cfg["image_downloads"]["n_workers"],
+            queue_size=self.cfg["image_downloads"]["queue_size"],
+        )
+
+    def finish_crawl(self) -> None:
+        """Waits for the remaining downloads, and writes the remaining pages."""
+        if self.download_pool is not None:
+            self.write_completed_pages(wait=True)
+            self.download_pool.close()
+            self.download_pool = None
+        super().finish_crawl()
+
+    def write_page(self, new_data: List[dict]) -> None:
+        """Appends the new image meta data from the current page to the dataset.
+
+        When images are downloaded by the download pool, the page is only written
+        once all of its images have been downloaded, so the dataset never refers to
+        an image that is not on disk. Pages are still written in page order.
+
+        Args:
+            new_data (list of dict):
+                New data to append to the dataset.
+        """
+        if self.download_pool is None:
+            super().write_page(new_data)
+            return
+
+        self.pending_pages.append((self.current_page, new_data, self.new_downloads))
+        self.write_completed_pages(wait=False)
 
-            self.sleep()
+    def write_completed_pages(self, wait: bool) -> None:
+        """Writes the pending pages whose images have all been downloaded.
+
+        Args:
+            wait (bool):
+                Whether to wait for the downloads of all pending pages.
+        """
+        current_page = self.current_page
+        while self.pending_pages:
+            page, new_data, downloads = self.pending_pages[0]
+            if not wait and not all(download.done() for download in downloads):
+                break
+            self.pending_pages.popleft()
+
+            downloaded_data = [
+                data
+                for data, download in zip(new_data, downloads)
+                if download.exception() is None and download.result()
+            ]
+
+            # Pages are committed under their own page number.
+            self.current_page = page
+            super().write_page(downloaded_data)
+        self.current_page = current_page
 
     def get_image_data(self, article: dict, download_images: bool = True) -> None:
         """Gets image meta data for every image with a caption in the article.
 
+        If the download pool is running, the images are queued for download instead
+        of being downloaded right away.
+
         Args:
             article (dict):
                 Article data.
@@ -109,12 +238,16 @@ class ImageCaptionDataSetBuilder(DataSetBuilder):
                 ):
                     data = self._get_image_meta_data(content, article)
                     self.seen_uuids.add(uuid)
+
+                    # Leave the download to the download pool, if it is running.
+                    if download_images and self.download_pool is not None:
+                        self.new_downloads.append(self.download_pool.submit(data))
+                        self.new_data.append(data)
+                        continue
+
                     image_downloaded = False
                     if download_images:
-                        image_downloaded = self.download_image(
-                            download_url=data["download_url"],
-                            file_name=data["file_name"],
-                        )
+                        image_downloaded = self._download_job(data)
                     if image_downloaded or self.testing:
                         self.new_data.append(data)
 
@@ -123,6 +256,7 @@ class ImageCaptionDataSetBuilder(DataSetBuilder):
 
         Extract image meta data.
         Page number is added to meta data, as it will be used to determine the current page when the script is run again.
+        The file name and hash of the image are added once it has been downloaded.
 
         Args:
             content (dict):
@@ -140,10 +274,7 @@ class ImageCaptionDataSetBuilder(DataSetBuilder):
         download_url = content["content"]["image"]["download_url"]
         caption = content["content"]["caption"]
 
-        file_name = self.image_folder / f"{len(self.seen_uuids) + 1}.jpg"
-
         image_meta_data = {
-            "file_name": file_name,
             "page": self.current_page,
             "canonical": canonical,
             "uuid": uuid,
@@ -152,35 +283,124 @@ class ImageCaptionDataSetBuilder(DataSetBuilder):
         }
         return image_meta_data
 
-    def download_image(self, download_url: str, file_name: str) -> bool:
-        """Downloads image.
+    def _download_job(self, data: dict) -> bool:
+        """Downloads the image of a download job, and adds its location to the meta data.
 
         Args:
-            download_url (str):
-                URL to image.
-            file_name (str):
-                Name of file to save image to.
+            data (dict):
+                Image meta data.
 
         Returns:
             bool:
                 Whether image was downloaded or not.
         """
-        response = self.send_request(
-            download_url, n_requests=self.cfg["n_requests_image"]
+        stored = self.download_image(
+            download_url=data["download_url"], uuid=data["uuid"]
         )
-        if not response.status_code:
+        if stored is None:
             return False
 
-        # Short sleep after every image request.
-        time.sleep(self.sleep_length["short"])
+        data["sha256"], data["file_name"] = stored
+        return True
+
+    def download_image(
+        self, download_url: str, uuid: str
+    ) -> Optional[Tuple[str, Path]]:
+        """Downloads image into the image store.
+
+        The image is streamed to a temporary `.part` file named after the image uuid,
+        which is only moved into the image store once it has the size given by the
+        `Content-Length` header. An interrupted download is resumed with an HTTP
+        Range request, also when the `.part` file was left behind by an earlier
+        crawl.
+
+        Args:
+            download_url (str):
+                URL to image.
+            uuid (str):
+                Uuid of image.
+
+        Returns:
+            pair of str and Path, or None:
+                Hash of the image and its path in the image store, or None if the
+                image could not be downloaded.
+        """
+        part_path = self.image_store.part_path(uuid)
+        for _ in range(self.cfg["n_requests_image"]):
+            offset = part_path.stat().st_size if part_path.exists() else 0
+
+            # Byte ranges refer to the unencoded body, so do not ask for compression.
+            headers = {"Accept-Encoding": "identity"}
+            if offset:
+                headers["Range"] = f"bytes={offset}-"
+
+            response = self.send_request(
+                download_url,
+                n_requests=self.cfg["n_requests_image"],
+                headers=headers,
+                stream=True,
+            )
+            if not response.status_code:
+                # The `.part` file might be complete or corrupt, so start over.
+                if offset:
+                    part_path.unlink()
+                    continue
+                return None
+
+            try:
+                complete = self._stream_to_file(response, part_path, offset)
+            except Exception as e:
+                self.logger.error(
+                    f"Error downloading image with download_url: {download_url}. Error: {e}"
+                )
+                continue
+            finally:
+                response.close()
+
+            if complete:
+                return self.image_store.put(part_path)
+        return None
+
+    def _stream_to_file(
+        self, response: requests.Response, part_path: Path, offset: int
+    ) -> bool:
+        """Streams the body of a response to a `.part` file.
+
+        Args:
+            response (requests.Response):
+                Streamed response.
+            part_path (Path):
+                Path to the `.part` file.
+            offset (int):
+                Number of bytes already in the `.part` file, which was requested to
+                be skipped with a Range request.
+
+        Returns:
+            bool:
+                Whether the `.part` file holds the complete image.
+        """
+        # The server might ignore the Range request and send the whole image.
+        if response.status_code != PARTIAL_CONTENT:
+            offset = 0
+
+        content_length = response.headers.get("Content-Length")
+        expected_size = offset + int(content_length) if content_length else None
+
+        with open(part_path, "ab" if offset else "wb") as f:
+            for chunk in response.iter_content(
+                chunk_size=self.cfg["image_downloads"]["chunk_size"]
+            ):
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
 
-        # Store image on disk
-        try:
-            with open(file_name, "wb") as f:
-                f.write(response.content)
-                return True
-        except Exception as e:
+        size = part_path.stat().st_size
+        if expected_size is not None and size != expected_size:
             self.logger.error(
-                f"Error downloading image with download_url: {download_url}. Error: {e}"
+                f"Downloaded {size} bytes to {part_path}, expected {expected_size}."
             )
+            # More bytes than expected means that the `.part` file is corrupt.
+            if size > expected_size:
+                part_path.unlink()
             return False
+        return True
@@ -0,0 +1,327 @@
+"""Perceptual hashing of images, for finding near-duplicate images."""
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Side of the grey scale thumbnail whose DCT is used by the pHash
+PHASH_SIZE = 32
+
+# Side of the block of lowest DCT frequencies, and of the dHash grid
+HASH_SIZE = 8
+
+
+def _dct_matrix(size: int) -> np.ndarray:
+    """Computes the orthonormal DCT-II matrix.
+
+    Args:
+        size (int):
+            Number of samples.
+
+    Returns:
+        NumPy array of float:
+            The DCT matrix, of shape (size, size).
+    """
+    k = np.arange(size)[:, None]
+    n = np.arange(size)[None, :]
+    matrix = np.cos(np.pi * (2 * n + 1) * k / (2 * size)) * np.sqrt(2 / size)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+DCT_MATRIX = _dct_matrix(PHASH_SIZE)
+
+
+def _grey_thumbnail(image: Image.Image, size: Tuple[int, int]) -> np.ndarray:
+    """Shrinks an image to a small grey scale thumbnail.
+
+    Args:
+        image (Image):
+            Image.
+        size (pair of int):
+            Width and height of the thumbnail.
+
+    Returns:
+        NumPy array of float:
+            Pixels of the thumbnail, of shape (height, width).
+    """
+    # Let the JPEG decoder downscale while decoding, which is much faster.
+    image.draft("L", (size[0] * 4, size[1] * 4))
+    image = ImageOps.exif_transpose(image).convert("L")
+    return np.asarray(image.resize(size, Image.Resampling.LANCZOS), dtype=np.float64)
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    """Packs an array of bits into an integer.
+
+    Args:
+        bits (NumPy array of bool):
+            Bits, most significant first.
+
+    Returns:
+        int:
+            The integer.
+    """
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def phash(image: Image.Image) -> int:
+    """Computes the 64 bit perceptual hash of an image.
+
+    The hash has a bit for each of the lowest 8x8 frequencies of the DCT of a 32x32
+    grey scale thumbnail, telling whether it is above their median. It is robust to
+    re-encoding, resizing and small changes to the colours.
+
+    Args:
+        image (Image):
+            Image.
+
+    Returns:
+        int:
+            The hash.
+    """
+    pixels = _grey_thumbnail(image, (PHASH_SIZE, PHASH_SIZE))
+    dct = DCT_MATRIX @ pixels @ DCT_MATRIX.T
+    low_frequencies = dct[:HASH_SIZE, :HASH_SIZE]
+    return _bits_to_int(low_frequencies > np.median(low_frequencies))
+
+
+def dhash(image: Image.Image) -> int:
+    """Computes the 64 bit difference hash of an image.
+
+    The hash has a bit for each pair of horizontally adjacent pixels of a 9x8 grey
+    scale thumbnail, telling whether the brightness increases. It is faster than the
+    perceptual hash, but less robust.
+
+    Args:
+        image (Image):
+            Image.
+
+    Returns:
+        int:
+            The hash.
+    """
+    pixels = _grey_thumbnail(image, (HASH_SIZE + 1, HASH_SIZE))
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+# Functions hashing an image, keyed by the name used in the config
+HASH_FUNCTIONS = {"phash": phash, "dhash": dhash}
+
+
+def hamming_distance(hash1: int, hash2: int) -> int:
+    """Counts the bits in which two hashes differ.
+
+    Args:
+        hash1 (int):
+            First hash.
+        hash2 (int):
+            Second hash.
+
+    Returns:
+        int:
+            Number of differing bits.
+
+    Examples:
+        >>> hamming_distance(0b1011, 0b0001)
+        2
+    """
+    return bin(hash1 ^ hash2).count("1")
+
+
+def hash_image(path: Path, method: str) -> Optional[int]:
+    """Computes the hash of an image file.
+
+    Args:
+        path (Path):
+            Path to the image.
+        method (str):
+            Hash function, either "phash" or "dhash".
+
+    Returns:
+        int or None:
+            The hash, or None if the image could not be read.
+    """
+    try:
+        with Image.open(path) as image:
+            return HASH_FUNCTIONS[method](image)
+    except Exception as e:
+        logger.error(f"Error hashing image {path}. Error: {e}")
+        return None
+
+
+def _hash_job(job: Tuple[Path, str]) -> Optional[int]:
+    """Computes the hash of an image file in a worker process.
+
+    Args:
+        job (pair):
+            Arguments to `hash_image`.
+
+    Returns:
+        int or None:
+            The hash, or None if the image could not be read.
+    """
+    return hash_image(*job)
+
+
+def hash_images(
+    paths: Iterable[Path], method: str, n_workers: int, chunksize: int
+) -> Dict[Path, int]:
+    """Computes the hashes of image files in a pool of worker processes.
+
+    Args:
+        paths (iterable of Path):
+            Paths to the images.
+        method (str):
+            Hash function, either "phash" or "dhash".
+        n_workers (int):
+            Number of worker processes.
+        chunksize (int):
+            Number of images sent to a worker at a time.
+
+    Returns:
+        dict of int:
+            Hash of every image that could be read, keyed by its path.
+    """
+    paths = list(paths)
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        hashes = executor.map(
+            _hash_job, ((path, method) for path in paths), chunksize=chunksize
+        )
+        return {
+            path: image_hash
+            for path, image_hash in zip(paths, hashes)
+            if image_hash is not None
+        }
+
+
+class BKTree:
+    """Burkhard-Keller tree of hashes, for finding hashes within a Hamming distance.
+
+    Every node stores the children at each distance from its hash, so by the
+    triangle inequality a search only visits the children whose distance is within
+    `max_distance` of the distance to the query. For small distances, only a small
+    part of the tree is visited.
+
+    Examples:
+        >>> tree = BKTree()
+        >>> tree.add(0b0000, "a")
+        >>> tree.add(0b0111, "b")
+        >>> tree.add(0b0001, "c")
+        >>> sorted(tree.search(0b0011, max_distance=1))
+        ['b', 'c']
+    """
+
+    def __init__(self) -> None:
+        # Nodes are lists of a hash, the items with the hash, and the children keyed
+        # by their distance.
+        self._root: Optional[list] = None
+
+    def add(self, image_hash: int, item: str) -> None:
+        """Adds an item with a hash to the tree.
+
+        Args:
+            image_hash (int):
+                Hash.
+            item (str):
+                Item.
+        """
+        if self._root is None:
+            self._root = [image_hash, [item], {}]
+            return
+
+        node = self._root
+        while True:
+            distance = hamming_distance(image_hash, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [image_hash, [item], {}]
+                return
+            node = child
+
+    def search(self, image_hash: int, max_distance: int) -> List[str]:
+        """Finds the items whose hash is within a Hamming distance of a hash.
+
+        Args:
+            image_hash (int):
+                Hash to search for.
+            max_distance (int):
+                Maximum Hamming distance.
+
+        Returns:
+            list of str:
+                The items.
+        """
+        if self._root is None:
+            return []
+
+        items: List[str] = []
+        nodes = [self._root]
+        while nodes:
+            node = nodes.pop()
+            distance = hamming_distance(image_hash, node[0])
+            if distance <= max_distance:
+                items.extend(node[1])
+            for child_distance, child in node[2].items():
+                if abs(child_distance - distance) <= max_distance:
+                    nodes.append(child)
+        return items
+
+
+def find_image_clusters(hashes: Dict[str, int], max_distance: int) -> Dict[str, str]:
+    """Clusters images whose hashes are within a Hamming distance of each other.
+
+    Every image is looked up in a BK-tree of the images before it, and joined to the
+    clusters of the images it is close to.
+
+    Args:
+        hashes (dict of int):
+            Hash of every image, keyed by its name, in the order of the images.
+        max_distance (int):
+            Maximum Hamming distance of near-duplicate images.
+
+    Returns:
+        dict of str:
+            Name of the first image of the cluster of every image that has a
+            near-duplicate, keyed by the name of the image.
+
+    Examples:
+        >>> hashes = {"a.jpg": 0b0000, "b.jpg": 0b1111, "c.jpg": 0b0001}
+        >>> find_image_clusters(hashes, max_distance=1)
+        {'a.jpg': 'a.jpg', 'c.jpg': 'a.jpg'}
+    """
+    names = list(hashes)
+    if not names:
+        return {}
+
+    index = {name: i for i, name in enumerate(names)}
+    parents = list(range(len(names)))
+
+    def find(i: int) -> int:
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    tree = BKTree()
+    for i, name in enumerate(names):
+        for other in tree.search(hashes[name], max_distance):
+            root_i, root_other = find(i), find(index[other])
+            # The cluster is named after its first image.
+            parents[max(root_i, root_other)] = min(root_i, root_other)
+        tree.add(hashes[name], name)
+
+    roots = [find(i) for i in range(len(names))]
+    cluster_sizes = np.bincount(roots, minlength=len(names))
+    return {
+        name: names[root] for name, root in zip(names, roots) if cluster_sizes[root] > 1
+    }
@@ -0,0 +1,338 @@
+"""Resizing and re-encoding of the downloaded images of the image caption dataset."""
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+from omegaconf import DictConfig
+from PIL import Image, ImageOps
+
+from .image_hashing import find_image_clusters, hash_images
+from .utils import JSONL_SUFFIXES, load_jsonl, write_jsonl
+
+logger = logging.getLogger(__name__)
+
+# File suffixes of the supported output formats
+SUFFIXES = {"JPEG": ".jpg", "WEBP": ".webp"}
+
+# File name of the list of near-duplicate images, in the near-duplicates folder
+NEAR_DUPLICATES_NAME = "near_duplicates.jsonl"
+
+
+def process_image(
+    src: Path, dst: Path, max_side: int, quality: int, image_format: str
+) -> bool:
+    """Resizes and re-encodes a single image.
+
+    The image is rotated according to its EXIF orientation, shrunk such that its
+    longest side is at most `max_side` pixels, and saved without any EXIF data. The
+    image is written to a temporary file, which is renamed to `dst` when done.
+
+    Args:
+        src (Path):
+            Path to the raw image.
+        dst (Path):
+            Path to the processed image.
+        max_side (int):
+            Maximum number of pixels of the longest side.
+        quality (int):
+            Quality of the encoding, between 1 and 100.
+        image_format (str):
+            Format of the processed image, either "JPEG" or "WEBP".
+
+    Returns:
+        bool:
+            Whether the image was processed or not.
+    """
+    tmp_path = dst.with_name(dst.name + ".tmp")
+    try:
+        with Image.open(src) as raw_image:
+            # Let the JPEG decoder downscale while decoding, which is much faster.
+            raw_image.draft("RGB", (max_side, max_side))
+            image: Image.Image = ImageOps.exif_transpose(raw_image).convert("RGB")
+            image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            image.save(tmp_path, format=image_format, quality=quality, optimize=True)
+        os.replace(tmp_path, dst)
+        return True
+    except Exception as e:
+        logger.error(f"Error processing image {src}. Error: {e}")
+        if tmp_path.exists():
+            tmp_path.unlink()
+        return False
+
+
+def _process_job(job: Tuple[Path, Path, int, int, str]) -> bool:
+    """Processes an image in a worker process.
+
+    Args:
+        job (tuple):
+            Arguments to `process_image`.
+
+    Returns:
+        bool:
+            Whether the image was processed or not.
+    """
+    return process_image(*job)
+
+
+def near_duplicates_folder(processed_folder: Path) -> Path:
+    """Gets the folder that near-duplicate images are moved to.
+
+    The folder is a sibling of the processed image folder, so the processed image
+    folder only holds the images in its `metadata.jsonl` file.
+
+    Args:
+        processed_folder (Path):
+            Processed image folder.
+
+    Returns:
+        Path:
+            Near-duplicates folder.
+
+    Examples:
+        >>> near_duplicates_folder(Path("data/processed/images/train")).as_posix()
+        'data/processed/images/train_near_duplicates'
+    """
+    return processed_folder.with_name(f"{processed_folder.name}_near_duplicates")
+
+
+def _place_near_duplicates(
+    file_names: Iterable[str], duplicates: Dict[str, str], processed_folder: Path
+) -> None:
+    """Moves the near-duplicate images out of the processed image folder.
+
+    Images that are no longer near-duplicates, such as when the near-duplicate mode
+    has been turned off, are moved back.
+
+    Args:
+        file_names (iterable of str):
+            Processed images, relative to the processed image folder.
+        duplicates (dict of str):
+            Kept image of every near-duplicate image.
+        processed_folder (Path):
+            Processed image folder.
+    """
+    duplicates_folder = near_duplicates_folder(processed_folder)
+    for file_name in file_names:
+        kept_path = processed_folder / file_name
+        moved_path = duplicates_folder / file_name
+        src, dst = (
+            (kept_path, moved_path)
+            if file_name in duplicates
+            else (moved_path, kept_path)
+        )
+        if src.exists():
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(src, dst)
+
+
+def process_image_dataset(cfg: DictConfig) -> Dict[str, int]:
+    """Processes all downloaded images of the image caption dataset.
+
+    Every image referred to by the raw image caption dataset is processed in a pool of
+    worker processes, and stored in the processed image folder with the same
+    relative path as in the raw image folder. Images that have already been processed
+    are skipped. The `metadata.jsonl` file of the processed image folder is rewritten
+    with the `file_name` and `caption` of every processed image, such that the folder
+    can be loaded as a HuggingFace `imagefolder` dataset. Near-duplicate images are
+    dropped or merged if `image_processing.near_duplicates.mode` is set, and moved
+    to the near-duplicates folder, where they are also skipped.
+
+    Args:
+        cfg (DictConfig):
+            Hydra config.
+
+    Returns:
+        dict of int:
+            Number of images processed, records whose image was already processed,
+            images that failed, and near-duplicate images left out.
+    """
+    processing_cfg = cfg["image_processing"]
+    raw_folder = Path(cfg["dirs"]["image_folder"])
+    processed_folder = Path(processing_cfg["processed_folder"])
+    image_format = processing_cfg["format"]
+    suffix = SUFFIXES[image_format]
+
+    raw_data_path = (
+        Path(cfg["dirs"]["data"])
+        / cfg["dirs"]["raw"]
+        / (
+            cfg["dataset_names"]["image_caption"]
+            + JSONL_SUFFIXES[cfg["storage"]["compression"]]
+        )
+    )
+    raw_data = load_jsonl(raw_data_path)
+    duplicates_folder = near_duplicates_folder(processed_folder)
+
+    # Several records can share an image, which is only processed once.
+    metadata: List[dict] = []
+    jobs: Dict[Path, Tuple[Path, Path, int, int, str]] = {}
+    n_skipped = 0
+    for data in raw_data:
+        src = Path(data["file_name"])
+        file_name = src.relative_to(raw_folder).with_suffix(suffix)
+        dst = processed_folder / file_name
+        metadata.append({"file_name": file_name.as_posix(), "caption": data["caption"]})
+        if dst.exists() or (duplicates_folder / file_name).exists():
+            n_skipped += 1
+        elif dst not in jobs:
+            jobs[dst] = (
+                src,
+                dst,
+                processing_cfg["max_side"],
+                processing_cfg["quality"],
+                image_format,
+            )
+
+    logger.info(f"Processing {len(jobs)} images, skipping {n_skipped}")
+    with ProcessPoolExecutor(max_workers=processing_cfg["n_workers"]) as executor:
+        results = list(
+            executor.map(
+                _process_job, jobs.values(), chunksize=processing_cfg["chunksize"]
+            )
+        )
+
+    # Only refer to images that exist in the processed folder.
+    failed = {dst for dst, processed in zip(jobs, results) if not processed}
+    metadata = [
+        data for data in metadata if processed_folder / data["file_name"] not in failed
+    ]
+    n_duplicates = 0
+    if processing_cfg["near_duplicates"]["mode"] is not None:
+        metadata, n_duplicates = handle_near_duplicate_images(
+            metadata, processed_folder, processing_cfg
+        )
+    elif duplicates_folder.exists():
+        _place_near_duplicates(
+            (data["file_name"] for data in metadata), {}, processed_folder
+        )
+
+    processed_folder.mkdir(parents=True, exist_ok=True)
+    write_jsonl(metadata, processed_folder / "metadata.jsonl")
+
+    n_processed = sum(results)
+    counts = {
+        "processed": n_processed,
+        "skipped": n_skipped,
+        "failed": len(results) - n_processed,
+        "near_duplicates": n_duplicates,
+    }
+    logger.info(f"Done processing images: {counts}")
+    return counts
+
+
+def handle_near_duplicate_images(
+    metadata: List[dict], processed_folder: Path, processing_cfg: DictConfig
+) -> Tuple[List[dict], int]:
+    """Drops or merges the near-duplicate processed images.
+
+    The processed images are hashed in a pool of worker processes, and clustered by
+    the Hamming distance of their hashes. Only the first image of every cluster is
+    kept. With the "drop" mode, the records of the other images are dropped. With
+    the "merge" mode, the records of every kept image are merged into one, whose
+    `caption` is the first caption and whose `captions` lists all of them, as an
+    `imagefolder` dataset has a single record per image.
+
+    The near-duplicate images are moved to the near-duplicates folder, so they are
+    not part of the `imagefolder` dataset, and they are listed in its
+    `near_duplicates.jsonl` file. The hashes are cached in the same folder, so only
+    new images are hashed.
+
+    Args:
+        metadata (list of dict):
+            The `file_name` and `caption` of every processed image.
+        processed_folder (Path):
+            Processed image folder.
+        processing_cfg (DictConfig):
+            The `image_processing` section of the Hydra config.
+
+    Returns:
+        pair of list of dict and int:
+            The metadata of the kept images, and the number of near-duplicate
+            images left out.
+    """
+    near_duplicates_cfg = processing_cfg["near_duplicates"]
+    mode = near_duplicates_cfg["mode"]
+    if mode not in ("drop", "merge"):
+        raise ValueError(f"Unknown near-duplicate mode: {mode}")
+
+    duplicates_folder = near_duplicates_folder(processed_folder)
+    duplicates_folder.mkdir(parents=True, exist_ok=True)
+    method = near_duplicates_cfg["method"]
+    hashes_path = duplicates_folder / f"image_hashes_{method}.jsonl"
+    cached_hashes = (
+        {data["file_name"]: data["hash"] for data in load_jsonl(hashes_path)}
+        if hashes_path.exists()
+        else {}
+    )
+
+    file_names = list(dict.fromkeys(data["file_name"] for data in metadata))
+    unhashed = {
+        folder / file_name: file_name
+        for file_name in file_names
+        if file_name not in cached_hashes
+        for folder in (processed_folder, duplicates_folder)
+        if (folder / file_name).exists()
+    }
+    logger.info(f"Hashing {len(unhashed)} images, {len(cached_hashes)} are cached")
+    if unhashed:
+        new_hashes = hash_images(
+            list(unhashed),
+            method=method,
+            n_workers=processing_cfg["n_workers"],
+            chunksize=processing_cfg["chunksize"],
+        )
+        for path, image_hash in new_hashes.items():
+            cached_hashes[unhashed[path]] = image_hash
+        write_jsonl(
+            [
+                {"file_name": file_name, "hash": image_hash}
+                for file_name, image_hash in cached_hashes.items()
+            ],
+            hashes_path,
+        )
+
+    clusters = find_image_clusters(
+        {
+            file_name: cached_hashes[file_name]
+            for file_name in file_names
+            if file_name in cached_hashes
+        },
+        max_distance=near_duplicates_cfg["max_distance"],
+    )
+    duplicates = {
+        file_name: first for file_name, first in clusters.items() if file_name != first
+    }
+    logger.info(
+        f"Found {len(set(clusters.values()))} clusters of near-duplicate images, "
+        f"with {len(clusters)} images"
+    )
+    _place_near_duplicates(file_names, duplicates, processed_folder)
+    write_jsonl(
+        [
+            {"file_name": file_name, "kept_file_name": first}
+            for file_name, first in duplicates.items()
+        ],
+        duplicates_folder / NEAR_DUPLICATES_NAME,
+    )
+
+    if mode == "drop":
+        metadata = [data for data in metadata if data["file_name"] not in duplicates]
+    else:
+        captions: Dict[str, List[str]] = {}
+        for data in metadata:
+            file_name = duplicates.get(data["file_name"], data["file_name"])
+            captions.setdefault(file_name, []).append(data["caption"])
+        metadata = [
+            {
+                "file_name": file_name,
+                "caption": image_captions[0],
+                "captions": image_captions,
+            }
+            for file_name, image_captions in captions.items()
+        ]
+    return metadata, len(duplicates)
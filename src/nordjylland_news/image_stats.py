@@ -0,0 +1,329 @@
+"""Image size statistics read from the image file headers, without decoding."""
+
+import csv
+import logging
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+
+from omegaconf import DictConfig
+
+from .utils import load_jsonl
+
+logger = logging.getLogger(__name__)
+
+# Columns of the image stats table
+STATS_FIELDS = ["file_name", "width", "height", "channels", "bytes"]
+
+# JPEG start of frame markers, which hold the image size. 0xC4, 0xC8 and 0xCC are
+# other markers in the same range.
+JPEG_SOF_MARKERS = {
+    0xC0,
+    0xC1,
+    0xC2,
+    0xC3,
+    0xC5,
+    0xC6,
+    0xC7,
+    0xC9,
+    0xCA,
+    0xCB,
+    0xCD,
+    0xCE,
+    0xCF,
+}
+
+# Number of channels of each PNG colour type
+PNG_CHANNELS = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}
+
+
+def read_image_size(path: Union[str, Path]) -> Tuple[int, int, int]:
+    """Reads the width, height and number of channels of an image from its header.
+
+    Only the first bytes of the file are read, so this is much faster than decoding
+    the image. JPEG, PNG and WebP images are supported.
+
+    Args:
+        path (str or Path):
+            Path to the image.
+
+    Returns:
+        triple of int:
+            Width, height and number of channels of the image.
+
+    Raises:
+        ValueError:
+            If the file is not a supported image, or its header is invalid.
+    """
+    with open(path, "rb") as f:
+        signature = f.read(12)
+        if signature.startswith(b"\xff\xd8"):
+            f.seek(2)
+            return _read_jpeg_size(f)
+        if signature.startswith(b"\x89PNG\r\n\x1a\n"):
+            f.seek(8)
+            return _read_png_size(f)
+        if signature.startswith(b"RIFF") and signature[8:12] == b"WEBP":
+            return _read_webp_size(f)
+    raise ValueError("Unsupported image format")
+
+
+def _read_jpeg_size(f: BinaryIO) -> Tuple[int, int, int]:
+    """Reads the image size from the start of frame segment of a JPEG file.
+
+    Args:
+        f (file object):
+            JPEG file, positioned right after the start of image marker.
+
+    Returns:
+        triple of int:
+            Width, height and number of channels of the image.
+    """
+    while True:
+        byte = f.read(1)
+        if not byte:
+            raise ValueError("JPEG file has no start of frame marker")
+        if byte != b"\xff":
+            continue
+
+        # Markers can be preceded by any number of 0xFF fill bytes.
+        marker = f.read(1)
+        while marker == b"\xff":
+            marker = f.read(1)
+        if not marker:
+            raise ValueError("JPEG file has no start of frame marker")
+
+        code = marker[0]
+        if code == 0x01 or 0xD0 <= code <= 0xD7:
+            # Standalone markers without a segment.
+            continue
+        if code in (0xD9, 0xDA):
+            raise ValueError("JPEG file has no start of frame marker")
+
+        (length,) = struct.unpack(">H", _read_exactly(f, 2))
+        if code in JPEG_SOF_MARKERS:
+            _, height, width, channels = struct.unpack(">BHHB", _read_exactly(f, 6))
+            return width, height, channels
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def _read_png_size(f: BinaryIO) -> Tuple[int, int, int]:
+    """Reads the image size from the IHDR chunk of a PNG file.
+
+    Args:
+        f (file object):
+            PNG file, positioned right after the signature.
+
+    Returns:
+        triple of int:
+            Width, height and number of channels of the image.
+    """
+    _, chunk_type, width, height, _, colour_type = struct.unpack(
+        ">I4sIIBB", _read_exactly(f, 18)
+    )
+    if chunk_type != b"IHDR" or colour_type not in PNG_CHANNELS:
+        raise ValueError("Invalid PNG header")
+    return width, height, PNG_CHANNELS[colour_type]
+
+
+def _read_webp_size(f: BinaryIO) -> Tuple[int, int, int]:
+    """Reads the image size from the first chunk of a WebP file.
+
+    Args:
+        f (file object):
+            WebP file, positioned right after the RIFF header.
+
+    Returns:
+        triple of int:
+            Width, height and number of channels of the image.
+    """
+    chunk = _read_exactly(f, 18)
+    chunk_type, data = chunk[:4], chunk[8:]
+    if chunk_type == b"VP8 ":
+        # Lossy: frame tag and start code, followed by 14 bit width and height.
+        width, height = struct.unpack("<HH", data[6:10])
+        return width & 0x3FFF, height & 0x3FFF, 3
+    if chunk_type == b"VP8L":
+        # Lossless: signature byte, followed by 14 bit width - 1, 14 bit height - 1
+        # and an alpha bit.
+        (bits,) = struct.unpack("<I", data[1:5])
+        width = (bits & 0x3FFF) + 1
+        height = ((bits >> 14) & 0x3FFF) + 1
+        return width, height, 4 if bits >> 28 & 1 else 3
+    if chunk_type == b"VP8X":
+        # Extended: flags, followed by 24 bit width - 1 and height - 1.
+        width = int.from_bytes(data[4:7], "little") + 1
+        height = int.from_bytes(data[7:10], "little") + 1
+        return width, height, 4 if data[0] & 0x10 else 3
+    raise ValueError("Invalid WebP header")
+
+
+def _read_exactly(f: BinaryIO, n_bytes: int) -> bytes:
+    """Reads an exact number of bytes from a file.
+
+    Args:
+        f (file object):
+            File to read from.
+        n_bytes (int):
+            Number of bytes to read.
+
+    Returns:
+        bytes:
+            The bytes read.
+
+    Raises:
+        ValueError:
+            If the file ends before `n_bytes` bytes have been read.
+    """
+    data = f.read(n_bytes)
+    if len(data) < n_bytes:
+        raise ValueError("Image header is truncated")
+    return data
+
+
+def scan_image(folder: Path, file_name: str) -> Optional[dict]:
+    """Reads the size statistics of a single image.
+
+    Args:
+        folder (Path):
+            Image folder.
+        file_name (str):
+            Path to the image, relative to the image folder.
+
+    Returns:
+        dict or None:
+            Size statistics of the image, or None if its header could not be read.
+    """
+    path = folder / file_name
+    try:
+        width, height, channels = read_image_size(path)
+        n_bytes = path.stat().st_size
+    except (OSError, ValueError, struct.error) as e:
+        logger.error(f"Error reading image {path}. Error: {e}")
+        return None
+    return {
+        "file_name": file_name,
+        "width": width,
+        "height": height,
+        "channels": channels,
+        "bytes": n_bytes,
+    }
+
+
+def scan_image_folder(folder: Union[str, Path], n_workers: int) -> List[dict]:
+    """Reads the size statistics of every image referred to by an image folder.
+
+    The images are listed in the `metadata.jsonl` file of the folder, and their
+    headers are read by a pool of worker threads.
+
+    Args:
+        folder (str or Path):
+            Image folder with a `metadata.jsonl` file.
+        n_workers (int):
+            Number of worker threads.
+
+    Returns:
+        list of dict:
+            Size statistics of every image whose header could be read.
+    """
+    folder = Path(folder)
+    metadata = load_jsonl(folder / "metadata.jsonl")
+    file_names = list(dict.fromkeys(data["file_name"] for data in metadata))
+
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        stats = executor.map(
+            lambda file_name: scan_image(folder, file_name), file_names
+        )
+        return [image_stats for image_stats in stats if image_stats is not None]
+
+
+def write_image_stats(stats: List[dict], file_name: Union[str, Path]) -> None:
+    """Writes image size statistics to a CSV table.
+
+    Args:
+        stats (list of dict):
+            Size statistics of the images.
+        file_name (str or Path):
+            Path to the CSV file.
+    """
+    with open(file_name, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=STATS_FIELDS)
+        writer.writeheader()
+        writer.writerows(stats)
+
+
+def load_image_stats(file_name: Union[str, Path]) -> List[dict]:
+    """Loads image size statistics from a CSV table.
+
+    Args:
+        file_name (str or Path):
+            Path to the CSV file.
+
+    Returns:
+        list of dict:
+            Size statistics of the images.
+    """
+    with open(file_name, "r", newline="") as f:
+        return [
+            {
+                key: value if key == "file_name" else int(value)
+                for key, value in row.items()
+            }
+            for row in csv.DictReader(f)
+        ]
+
+
+def summarise_image_stats(stats: List[dict]) -> Dict[str, Tuple[int, int]]:
+    """Computes the range of the size statistics of the images.
+
+    Args:
+        stats (list of dict):
+            Size statistics of the images.
+
+    Returns:
+        dict of pair of int:
+            Smallest and largest value of every numeric statistic.
+
+    Examples:
+        >>> stats = [
+        ...     {"file_name": "a.jpg", "width": 4, "height": 3, "channels": 3, "bytes": 10},
+        ...     {"file_name": "b.jpg", "width": 2, "height": 5, "channels": 1, "bytes": 7},
+        ... ]
+        >>> summarise_image_stats(stats)["width"]
+        (2, 4)
+    """
+    return {
+        key: (
+            min(image_stats[key] for image_stats in stats),
+            max(image_stats[key] for image_stats in stats),
+        )
+        for key in STATS_FIELDS[1:]
+    }
+
+
+def build_image_stats(cfg: DictConfig) -> List[dict]:
+    """Writes the size statistics table of the processed image folder.
+
+    The table is written next to the `metadata.jsonl` file of the folder, and the
+    range of every statistic is logged.
+
+    Args:
+        cfg (DictConfig):
+            Hydra config.
+
+    Returns:
+        list of dict:
+            Size statistics of the images.
+    """
+    stats_cfg = cfg["image_stats"]
+    folder = Path(stats_cfg["folder"])
+    stats = scan_image_folder(folder, n_workers=stats_cfg["n_workers"])
+    write_image_stats(stats, folder / stats_cfg["file_name"])
+
+    logger.info(f"Read the headers of {len(stats)} images")
+    if stats:
+        for key, (smallest, largest) in summarise_image_stats(stats).items():
+            logger.info(f"{key.capitalize()}: [{smallest}, {largest}]")
+    return stats
@@ -0,0 +1,122 @@
+"""Content-addressed store for the downloaded images."""
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Tuple, Union
+
+
+class ContentAddressedImageStore:
+    """Stores images under the SHA-256 hash of their content.
+
+    An image with hash `abcdef...` is stored as `root/ab/cd/abcdef....jpg`, so the
+    images are spread over many subdirectories, the same bytes are only stored once
+    and the file names do not depend on the order in which the images are crawled.
+
+    Args:
+        root (str or Path):
+            Root folder of the store.
+        shard_depth (int):
+            Number of levels of subdirectories.
+        shard_width (int):
+            Number of hash characters used for each level of subdirectories.
+        suffix (str):
+            Suffix of the stored files. Defaults to ".jpg".
+
+    Attributes:
+        root (Path):
+            Root folder of the store.
+    """
+
+    def __init__(
+        self,
+        root: Union[str, Path],
+        shard_depth: int,
+        shard_width: int,
+        suffix: str = ".jpg",
+    ) -> None:
+        self.root = Path(root)
+        self.shard_depth = shard_depth
+        self.shard_width = shard_width
+        self.suffix = suffix
+
+    def path_for(self, digest: str) -> Path:
+        """Gets the path of the image with the given hash.
+
+        Args:
+            digest (str):
+                Hex digest of the SHA-256 hash of the image.
+
+        Returns:
+            Path:
+                Path to the image.
+
+        Examples:
+            >>> store = ContentAddressedImageStore("images", shard_depth=2, shard_width=2)
+            >>> store.path_for("abcdef").as_posix()
+            'images/ab/cd/abcdef.jpg'
+        """
+        shards = [
+            digest[i * self.shard_width : (i + 1) * self.shard_width]
+            for i in range(self.shard_depth)
+        ]
+        return self.root.joinpath(*shards, f"{digest}{self.suffix}")
+
+    def part_path(self, key: str) -> Path:
+        """Gets the path of the temporary file an image is downloaded to.
+
+        Args:
+            key (str):
+                Stable key of the download, such as the image uuid, so an
+                interrupted download can be resumed.
+
+        Returns:
+            Path:
+                Path to the temporary file.
+        """
+        tmp_dir = self.root / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        return tmp_dir / f"{key}.part"
+
+    def put(self, part_path: Path) -> Tuple[str, Path]:
+        """Moves a downloaded image into the store.
+
+        If the store already holds an image with the same content, the downloaded
+        file is removed instead.
+
+        Args:
+            part_path (Path):
+                Path to the downloaded image.
+
+        Returns:
+            pair of str and Path:
+                Hex digest of the SHA-256 hash of the image, and its path in the store.
+        """
+        digest = file_digest(part_path)
+        path = self.path_for(digest)
+        if path.exists():
+            part_path.unlink()
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(part_path, path)
+        return digest, path
+
+
+def file_digest(path: Path, chunk_size: int = 1 << 20) -> str:
+    """Computes the SHA-256 hash of a file.
+
+    Args:
+        path (Path):
+            Path to the file.
+        chunk_size (int):
+            Number of bytes read at a time. Defaults to 1 MiB.
+
+    Returns:
+        str:
+            Hex digest of the hash.
+    """
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
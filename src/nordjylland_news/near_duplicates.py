@@ -0,0 +1,208 @@
+"""Near-duplicate detection of articles with MinHash signatures and LSH banding."""
+
+from typing import Dict, List
+
+import numpy as np
+
+# Number of bytes of a shingle, which is read as a single 64 bit integer
+SHINGLE_SIZE = 8
+
+# Maximum number of shingles hashed at a time, bounding the memory of a batch
+MAX_BATCH_SHINGLES = 1 << 18
+
+# Number of permutations hashed at a time
+PERMUTATION_CHUNK_SIZE = 16
+
+
+def shingles(text: str) -> np.ndarray:
+    """Computes the overlapping 8 byte shingles of a text.
+
+    The text is lowercased and its whitespace collapsed, and every run of 8 bytes of
+    its UTF-8 encoding is read as a 64 bit integer, without copying the text.
+
+    Args:
+        text (str):
+            Text.
+
+    Returns:
+        NumPy array of uint64:
+            The shingles, of which there is at least one.
+
+    Examples:
+        >>> len(shingles("Aalborg  Havn")), len(shingles("Aalborg"))
+        (5, 1)
+    """
+    data = " ".join(text.lower().split()).encode("utf-8")
+    data = data.ljust(SHINGLE_SIZE)
+    return np.ndarray(
+        shape=(len(data) - SHINGLE_SIZE + 1,),
+        dtype="<u8",
+        buffer=data,
+        strides=(1,),
+    )
+
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    """Scrambles 64 bit integers with the SplitMix64 finaliser.
+
+    Args:
+        x (NumPy array of uint64):
+            Integers.
+
+    Returns:
+        NumPy array of uint64:
+            Scrambled integers.
+    """
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+class MinHasher:
+    """Computes MinHash signatures of texts, a batch at a time.
+
+    Every permutation multiplies the scrambled shingles by a random odd number,
+    modulo 2**64, which is a multiply-shift hash. The shingles of a batch of texts
+    are concatenated, so the minimum of every permutation over every text is
+    computed by a few vectorised NumPy operations, written into a preallocated
+    buffer.
+
+    Args:
+        n_permutations (int):
+            Number of permutations, which is the length of the signatures.
+        seed (int):
+            Seed of the permutations.
+
+    Attributes:
+        n_permutations (int):
+            Number of permutations.
+    """
+
+    def __init__(self, n_permutations: int, seed: int) -> None:
+        self.n_permutations = n_permutations
+        rng = np.random.default_rng(seed)
+        max_value = np.iinfo(np.uint64).max
+        self._a = rng.integers(1, max_value, size=n_permutations, dtype=np.uint64)
+        self._a |= np.uint64(1)
+
+    def signatures(self, texts: List[str]) -> np.ndarray:
+        """Computes the MinHash signatures of texts.
+
+        Args:
+            texts (list of str):
+                Texts.
+
+        Returns:
+            NumPy array of uint32:
+                Signature of every text, of shape (len(texts), n_permutations).
+        """
+        result = np.empty((len(texts), self.n_permutations), dtype=np.uint32)
+        batch: List[np.ndarray] = []
+        n_batch_shingles = 0
+        start = 0
+        for i, text in enumerate(texts):
+            text_shingles = shingles(text)
+            batch.append(text_shingles)
+            n_batch_shingles += len(text_shingles)
+            if n_batch_shingles >= MAX_BATCH_SHINGLES:
+                result[start : i + 1] = self._batch_signatures(batch)
+                batch, n_batch_shingles, start = [], 0, i + 1
+        if batch:
+            result[start:] = self._batch_signatures(batch)
+        return result
+
+    def _batch_signatures(self, batch: List[np.ndarray]) -> np.ndarray:
+        """Computes the MinHash signatures of a batch of shingled texts.
+
+        Args:
+            batch (list of NumPy array of uint64):
+                Shingles of every text.
+
+        Returns:
+            NumPy array of uint32:
+                Signature of every text, of shape (len(batch), n_permutations).
+        """
+        x = _mix(np.concatenate(batch))
+        offsets = np.cumsum([0] + [len(text_shingles) for text_shingles in batch[:-1]])
+        signatures = np.empty((len(batch), self.n_permutations), dtype=np.uint64)
+        hashes = np.empty((PERMUTATION_CHUNK_SIZE, len(x)), dtype=np.uint64)
+        for first in range(0, self.n_permutations, PERMUTATION_CHUNK_SIZE):
+            last = min(first + PERMUTATION_CHUNK_SIZE, self.n_permutations)
+            chunk_hashes = hashes[: last - first]
+            np.multiply(self._a[first:last, None], x, out=chunk_hashes)
+            signatures[:, first:last] = np.minimum.reduceat(
+                chunk_hashes, offsets, axis=1
+            ).T
+
+        # The high bits of a product modulo 2**64 are the well mixed ones.
+        return (signatures >> np.uint64(32)).astype(np.uint32)
+
+
+def find_clusters(
+    signatures: np.ndarray, n_bands: int, threshold: float, seed: int = 0
+) -> np.ndarray:
+    """Clusters texts whose MinHash signatures are similar, with LSH banding.
+
+    The signatures are cut into `n_bands` bands. Texts sharing a band are candidate
+    near-duplicates, which are joined if the fraction of equal signature values, an
+    estimate of the Jaccard similarity of their shingles, is at least `threshold`.
+    Every text is only compared to the first text of each of its buckets, so the
+    running time is linear in the number of texts.
+
+    Args:
+        signatures (NumPy array of uint32):
+            MinHash signatures, of shape (n_texts, n_permutations).
+        n_bands (int):
+            Number of bands, which must divide the number of permutations.
+        threshold (float):
+            Minimum estimated Jaccard similarity of near-duplicates.
+        seed (int):
+            Seed of the hashes of the bands. Defaults to 0.
+
+    Returns:
+        NumPy array of int:
+            Cluster of every text, given by the index of its first text.
+
+    Examples:
+        >>> signatures = np.array([[1, 2, 3, 4], [1, 2, 3, 5], [6, 7, 8, 9]])
+        >>> find_clusters(signatures, n_bands=2, threshold=0.7).tolist()
+        [0, 0, 2]
+    """
+    n_texts, n_permutations = signatures.shape
+    if n_permutations % n_bands:
+        raise ValueError(
+            f"The number of bands ({n_bands}) must divide the number of "
+            f"permutations ({n_permutations})"
+        )
+
+    rows = n_permutations // n_bands
+    coefficients = np.random.default_rng(seed).integers(
+        1, np.iinfo(np.uint64).max, size=rows, dtype=np.uint64
+    )
+    parents = list(range(n_texts))
+
+    def find(i: int) -> int:
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    for band in range(n_bands):
+        band_signatures = signatures[:, band * rows : (band + 1) * rows]
+        band_hashes = (band_signatures.astype(np.uint64) * coefficients).sum(axis=1)
+        buckets: Dict[int, int] = {}
+        for i, band_hash in enumerate(band_hashes.tolist()):
+            first = buckets.setdefault(band_hash, i)
+            if first == i:
+                continue
+            root_i, root_first = find(i), find(first)
+            if root_i == root_first:
+                continue
+            similarity = np.mean(signatures[i] == signatures[first])
+            if similarity >= threshold:
+                # The cluster is named after its first text.
+                parents[max(root_i, root_first)] = min(root_i, root_first)
+
+    return np.array([find(i) for i in range(n_texts)])
@@ -0,0 +1,245 @@
+"""Columnar Parquet copy of the datasets, for fast loading of selected columns."""
+
+import os
+from itertools import groupby, islice
+from pathlib import Path, PurePath
+from types import ModuleType
+from typing import Iterator, List, Optional, Tuple, Union
+
+from .utils import iter_jsonl
+
+# Typed columns of the summarisation dataset
+SUMMARY_FIELDS = [
+    ("uuid", "string"),
+    ("canonical", "string"),
+    ("page", "int32"),
+    ("text_content", "string"),
+    ("summary", "string"),
+]
+
+# Typed columns of the image caption dataset. The file name and hash are only set
+# for images that have been downloaded.
+IMAGE_CAPTION_FIELDS = [
+    ("uuid", "string"),
+    ("canonical", "string"),
+    ("page", "int32"),
+    ("file_name", "string"),
+    ("caption", "string"),
+    ("download_url", "string"),
+    ("sha256", "string"),
+]
+
+
+def _pyarrow() -> Tuple[ModuleType, ModuleType]:
+    """Imports pyarrow, which is only needed for the Parquet copy of the datasets.
+
+    Returns:
+        pair of module:
+            The pyarrow and pyarrow.parquet modules.
+
+    Raises:
+        ImportError:
+            If pyarrow is not installed.
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError(
+            "The Parquet copy of the datasets requires the `pyarrow` package. "
+            "Install it with `pip install nordjylland_news[parquet]`."
+        ) from e
+    return pyarrow, pyarrow.parquet
+
+
+def build_schema(fields: List[Tuple[str, str]]):
+    """Builds the Arrow schema of a dataset.
+
+    Args:
+        fields (list of pair of str):
+            Name and Arrow type of every column.
+
+    Returns:
+        pyarrow.Schema:
+            The schema.
+    """
+    pa, _ = _pyarrow()
+    return pa.schema(
+        [(name, pa.type_for_alias(type_name)) for name, type_name in fields]
+    )
+
+
+def parquet_parts(folder: Union[str, Path]) -> List[Path]:
+    """Lists the part files of a Parquet dataset, in record order.
+
+    Args:
+        folder (str or Path):
+            Folder of the Parquet dataset.
+
+    Returns:
+        list of Path:
+            The part files.
+    """
+    return sorted(Path(folder).glob("part-*.parquet"))
+
+
+class ParquetDatasetWriter:
+    """Writes the records of a dataset to Parquet part files, a few pages at a time.
+
+    The records of `pages_per_row_group` pages are buffered, and then written as a
+    part file with a single row group. Part files are named after the index of
+    their first record, so they sort in record order, and written to a temporary
+    file first, so a crash never leaves a partial part file behind.
+
+    Args:
+        folder (str or Path):
+            Folder of the Parquet dataset.
+        fields (list of pair of str):
+            Name and Arrow type of every column. Other keys of the records are
+            dropped, and missing keys are null.
+        pages_per_row_group (int):
+            Number of pages in each row group.
+
+    Attributes:
+        folder (Path):
+            Folder of the Parquet dataset.
+        pages_per_row_group (int):
+            Number of pages in each row group.
+        schema (pyarrow.Schema):
+            Schema of the dataset.
+        n_records (int):
+            Number of records written to the part files.
+    """
+
+    def __init__(
+        self,
+        folder: Union[str, Path],
+        fields: List[Tuple[str, str]],
+        pages_per_row_group: int,
+    ) -> None:
+        self.folder = Path(folder)
+        self.pages_per_row_group = pages_per_row_group
+        self.schema = build_schema(fields)
+        self.folder.mkdir(parents=True, exist_ok=True)
+
+        _, pq = _pyarrow()
+        self.n_records = sum(
+            pq.read_metadata(part).num_rows for part in parquet_parts(self.folder)
+        )
+        self._records: List[dict] = []
+        self._n_pages = 0
+
+    def add_page(self, records: List[dict]) -> None:
+        """Adds the records of a page, writing a part file every few pages.
+
+        Args:
+            records (list of dict):
+                Records of the page.
+        """
+        # Paths, such as the file names of the images, are stored as strings.
+        self._records.extend(
+            {
+                key: str(value) if isinstance(value, PurePath) else value
+                for key, value in record.items()
+            }
+            for record in records
+        )
+        self._n_pages += 1
+        if self._n_pages >= self.pages_per_row_group:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes the buffered records to a new part file."""
+        self._n_pages = 0
+        if not self._records:
+            return
+
+        pa, pq = _pyarrow()
+        table = pa.Table.from_pylist(self._records, schema=self.schema)
+        part_path = self.folder / f"part-{self.n_records:010d}.parquet"
+
+        # Files starting with a dot are ignored by Parquet readers.
+        tmp_path = self.folder / f".{part_path.name}.tmp"
+        pq.write_table(table, tmp_path, row_group_size=len(self._records))
+        os.replace(tmp_path, part_path)
+
+        self.n_records += len(self._records)
+        self._records = []
+
+    def sync(self, data_path: Union[str, Path], n_records: int) -> None:
+        """Brings the part files up to date with the first records of a JSONL file.
+
+        Records that are missing from the part files, such as those of a dataset
+        built before the Parquet copy was enabled, or buffered when a crawl crashed,
+        are copied from the JSONL file. If the part files hold more records, they
+        are written again.
+
+        Args:
+            data_path (str or Path):
+                Path to the JSONL dataset file.
+            n_records (int):
+                Number of committed records in the JSONL dataset file.
+        """
+        self._records = []
+        self._n_pages = 0
+        if self.n_records > n_records:
+            for part in parquet_parts(self.folder):
+                part.unlink()
+            self.n_records = 0
+        if self.n_records == n_records:
+            return
+
+        records = islice(iter_jsonl(str(data_path)), self.n_records, n_records)
+        for _, page_records in groupby(records, key=lambda record: record["page"]):
+            self.add_page(list(page_records))
+        self.flush()
+
+
+def load_parquet_dataset(folder: Union[str, Path], columns: Optional[List[str]] = None):
+    """Loads a Parquet dataset as an Arrow table.
+
+    Only the selected columns are read from disk. The table can be turned into a
+    Hugging Face dataset with `datasets.Dataset(table)`, or into a pandas data frame
+    with `table.to_pandas()`.
+
+    Args:
+        folder (str or Path):
+            Folder of the Parquet dataset.
+        columns (list of str, optional):
+            Columns to load. If None, all columns are loaded. Defaults to None.
+
+    Returns:
+        pyarrow.Table:
+            The dataset.
+    """
+    pa, pq = _pyarrow()
+    tables = [pq.read_table(part, columns=columns) for part in parquet_parts(folder)]
+    if not tables:
+        raise FileNotFoundError(f"No Parquet part files in {folder}")
+    return pa.concat_tables(tables)
+
+
+def iter_parquet_records(
+    folder: Union[str, Path],
+    columns: Optional[List[str]] = None,
+    batch_size: int = 1024,
+) -> Iterator[dict]:
+    """Iterates over the records of a Parquet dataset, a batch at a time.
+
+    Args:
+        folder (str or Path):
+            Folder of the Parquet dataset.
+        columns (list of str, optional):
+            Columns to read. If None, all columns are read. Defaults to None.
+        batch_size (int):
+            Number of records read at a time. Defaults to 1024.
+
+    Yields:
+        dict:
+            Record, with the selected columns.
+    """
+    _, pq = _pyarrow()
+    for part in parquet_parts(folder):
+        parquet_file = pq.ParquetFile(part)
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+            yield from batch.to_pylist()
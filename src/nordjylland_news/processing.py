@@ -0,0 +1,606 @@
+"""Streaming pipeline turning the raw summary dataset into train, val and test splits."""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, Optional, Set, Union
+
+import numpy as np
+from omegaconf import DictConfig
+
+from .near_duplicates import MinHasher, find_clusters
+from .utils import (
+    JSONL_SUFFIXES,
+    WRITE_BUFFER_SIZE,
+    dumps_jsonl,
+    iter_jsonl,
+    write_jsonl,
+)
+
+logger = logging.getLogger(__name__)
+
+# Names of the splits
+SPLITS = ["train", "val", "test"]
+
+# File name of the manifest of the splits
+MANIFEST_NAME = "manifest.json"
+
+# File name of the clusters of near-duplicate records
+NEAR_DUPLICATES_NAME = "near_duplicates.jsonl"
+
+
+class StageStats:
+    """Number of records seen and dropped by a pipeline stage, and its running time.
+
+    Args:
+        name (str):
+            Name of the stage.
+
+    Attributes:
+        name (str):
+            Name of the stage.
+        n_in (int):
+            Number of records passed to the stage.
+        n_out (int):
+            Number of records passed on by the stage.
+        seconds (float):
+            Time spent in the stage.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.n_in = 0
+        self.n_out = 0
+        self.seconds = 0.0
+
+    @property
+    def n_dropped(self) -> int:
+        """Gets the number of records dropped by the stage.
+
+        Returns:
+            int:
+                Number of dropped records.
+        """
+        return self.n_in - self.n_out
+
+    @property
+    def records_per_second(self) -> float:
+        """Gets the throughput of the stage.
+
+        Returns:
+            float:
+                Number of records processed per second.
+        """
+        return self.n_in / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name}: {self.n_in} in, {self.n_dropped} dropped, "
+            f"{self.records_per_second:,.0f} records/s"
+        )
+
+
+class Stage(ABC):
+    """Pipeline stage, processing one record at a time.
+
+    Attributes:
+        stats (StageStats):
+            Statistics of the stage.
+    """
+
+    name = "stage"
+
+    def __init__(self) -> None:
+        self.stats = StageStats(self.name)
+
+    @abstractmethod
+    def process(self, record: dict) -> Optional[dict]:
+        """Processes a record.
+
+        Args:
+            record (dict):
+                Record.
+
+        Returns:
+            dict or None:
+                The record to pass on, or None to drop it.
+        """
+
+    def close(self) -> None:
+        """Finishes the stage, once every record has been processed."""
+        pass
+
+
+class FilterStage(Stage):
+    """Drops articles with a short text or summary, or a blacklisted summary.
+
+    Args:
+        min_length (int):
+            Minimum number of characters of the text and the summary.
+        blacklist_summaries (iterable of str):
+            Placeholder summaries, such as "Opdateres...".
+
+    Attributes:
+        min_length (int):
+            Minimum number of characters of the text and the summary.
+        blacklist_summaries (set of str):
+            Placeholder summaries.
+    """
+
+    name = "filter"
+
+    def __init__(self, min_length: int, blacklist_summaries: Iterable[str]) -> None:
+        super().__init__()
+        self.min_length = min_length
+        self.blacklist_summaries = set(blacklist_summaries)
+
+    def process(self, record: dict) -> Optional[dict]:
+        text = record["text_content"]
+        summary = record["summary"]
+        if (
+            len(text) < self.min_length
+            or len(summary) < self.min_length
+            or summary in self.blacklist_summaries
+        ):
+            return None
+        return record
+
+
+class DedupStage(Stage):
+    """Drops records that are exact duplicates of an earlier record.
+
+    Only a 16 byte hash of the compared fields of every record passed on is kept, so
+    the memory use is bounded by the number of output records.
+
+    Args:
+        keys (list of str):
+            Fields compared to find duplicates.
+
+    Attributes:
+        keys (list of str):
+            Fields compared to find duplicates.
+    """
+
+    name = "dedup"
+
+    def __init__(self, keys: List[str]) -> None:
+        super().__init__()
+        self.keys = keys
+        self._digests: Set[bytes] = set()
+
+    def process(self, record: dict) -> Optional[dict]:
+        digest = hashlib.blake2b(digest_size=16)
+        for key in self.keys:
+            value = record[key].encode("utf-8")
+            digest.update(len(value).to_bytes(8, "little"))
+            digest.update(value)
+
+        key_digest = digest.digest()
+        if key_digest in self._digests:
+            return None
+        self._digests.add(key_digest)
+        return record
+
+
+class NearDuplicateStage(Stage):
+    """Collects the MinHash signatures of the records passing through.
+
+    The stage does not drop any records. Once every record has passed, `clusters`
+    gives the clusters of near-duplicate records, so they can be kept in the same
+    split.
+
+    Args:
+        fields (list of str):
+            Fields of the records whose text is compared.
+        n_permutations (int):
+            Number of MinHash permutations.
+        n_bands (int):
+            Number of LSH bands.
+        threshold (float):
+            Minimum estimated Jaccard similarity of near-duplicates.
+        batch_size (int):
+            Number of records whose signatures are computed at a time.
+        seed (int):
+            Seed of the MinHash permutations.
+
+    Attributes:
+        fields (list of str):
+            Fields of the records whose text is compared.
+        n_bands (int):
+            Number of LSH bands.
+        threshold (float):
+            Minimum estimated Jaccard similarity of near-duplicates.
+        batch_size (int):
+            Number of records whose signatures are computed at a time.
+    """
+
+    name = "near_duplicates"
+
+    def __init__(
+        self,
+        fields: List[str],
+        n_permutations: int,
+        n_bands: int,
+        threshold: float,
+        batch_size: int,
+        seed: int,
+    ) -> None:
+        super().__init__()
+        self.fields = fields
+        self.n_bands = n_bands
+        self.threshold = threshold
+        self.batch_size = batch_size
+        self._min_hasher = MinHasher(n_permutations=n_permutations, seed=seed)
+        self._uuids: List[str] = []
+        self._texts: List[str] = []
+        self._signatures: List[np.ndarray] = []
+
+    def process(self, record: dict) -> Optional[dict]:
+        self._uuids.append(record["uuid"])
+        self._texts.append("\n".join(record[field] for field in self.fields))
+        if len(self._texts) >= self.batch_size:
+            self._signatures.append(self._min_hasher.signatures(self._texts))
+            self._texts = []
+        return record
+
+    def close(self) -> None:
+        if self._texts:
+            self._signatures.append(self._min_hasher.signatures(self._texts))
+            self._texts = []
+
+    def clusters(self) -> Dict[str, str]:
+        """Clusters the records that have passed through the stage.
+
+        Returns:
+            dict of str:
+                Uuid of the first record of the cluster of every record that has a
+                near-duplicate, keyed by the uuid of the record.
+        """
+        if not self._signatures:
+            return {}
+
+        roots = find_clusters(
+            np.concatenate(self._signatures),
+            n_bands=self.n_bands,
+            threshold=self.threshold,
+        )
+        cluster_sizes = np.bincount(roots, minlength=len(roots))
+        return {
+            uuid: self._uuids[root]
+            for uuid, root in zip(self._uuids, roots.tolist())
+            if cluster_sizes[root] > 1
+        }
+
+
+class ClusterStage(Stage):
+    """Sets the `cluster` of every record to the uuid of its cluster.
+
+    Records without near-duplicates form a cluster of their own, named after their
+    uuid.
+
+    Args:
+        clusters (dict of str):
+            Cluster of every record that has a near-duplicate, keyed by its uuid.
+    """
+
+    name = "cluster"
+
+    def __init__(self, clusters: Dict[str, str]) -> None:
+        super().__init__()
+        self._clusters = clusters
+
+    def process(self, record: dict) -> Optional[dict]:
+        record["cluster"] = self._clusters.get(record["uuid"], record["uuid"])
+        return record
+
+
+def split_draw(uuid: str) -> float:
+    """Maps a uuid to a number in [0, 1), which decides the split of its record.
+
+    Args:
+        uuid (str):
+            Uuid of the record.
+
+    Returns:
+        float:
+            Number in [0, 1), which is the same in every run.
+
+    Examples:
+        >>> 0 <= split_draw("4b1f3a7e-93f4-4a55-8c43-1d3a0c1f9e2b") < 1
+        True
+    """
+    digest = hashlib.blake2b(uuid.encode("utf-8"), digest_size=8, person=b"split")
+    return int.from_bytes(digest.digest(), "big") / 2**64
+
+
+class SplitWriter(Stage):
+    """Writes every record to a split decided by its uuid, in the format of the splits.
+
+    The split of a record only depends on the hash of its uuid, so a record ends up
+    in the same split in every run. As the raw dataset is only appended to,
+    processing it again after a crawl gives the same split files, with the new
+    records appended at their ends.
+
+    Records with a `cluster` of near-duplicates are split by the hash of their
+    cluster instead. This keeps near-duplicates out of different splits, but a new
+    record joining two clusters can move records that were split before, which is
+    why clustering is disabled by default.
+
+    The splits are written to temporary files, which replace the split files when
+    the stage is closed, together with a manifest of the split sizes.
+
+    Args:
+        folder (str or Path):
+            Folder of the split files.
+        val_fraction (float):
+            Expected fraction of the records in the validation split.
+        test_fraction (float):
+            Expected fraction of the records in the test split.
+
+    Attributes:
+        folder (Path):
+            Folder of the split files.
+        val_fraction (float):
+            Expected fraction of the records in the validation split.
+        test_fraction (float):
+            Expected fraction of the records in the test split.
+        counts (dict of int):
+            Number of records written to each split.
+    """
+
+    name = "split"
+
+    def __init__(
+        self,
+        folder: Union[str, Path],
+        val_fraction: float,
+        test_fraction: float,
+    ) -> None:
+        super().__init__()
+        self.folder = Path(folder)
+        self.val_fraction = val_fraction
+        self.test_fraction = test_fraction
+        self.counts = {split: 0 for split in SPLITS}
+
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self._files: Dict[str, BinaryIO] = {
+            split: open(self._tmp_path(split), "wb", buffering=WRITE_BUFFER_SIZE)
+            for split in SPLITS
+        }
+
+    def split_path(self, split: str) -> Path:
+        """Gets the path to a split file.
+
+        Args:
+            split (str):
+                Name of the split.
+
+        Returns:
+            Path:
+                Split path.
+        """
+        return self.folder / f"{split}.jsonl"
+
+    @property
+    def manifest_path(self) -> Path:
+        """Gets the path to the manifest of the splits.
+
+        Returns:
+            Path:
+                Manifest path.
+        """
+        return self.folder / MANIFEST_NAME
+
+    def _tmp_path(self, split: str) -> Path:
+        """Gets the path to the temporary file of a split.
+
+        Args:
+            split (str):
+                Name of the split.
+
+        Returns:
+            Path:
+                Temporary split path.
+        """
+        return self.folder / f"{split}.jsonl.tmp"
+
+    def choose_split(self, record: dict) -> str:
+        """Chooses the split of a record from the hash of its uuid.
+
+        Records with a `cluster` of near-duplicates are split by the hash of the
+        cluster instead, so the whole cluster ends up in the same split.
+
+        Args:
+            record (dict):
+                Record.
+
+        Returns:
+            str:
+                Name of the split.
+        """
+        draw = split_draw(record.get("cluster", record["uuid"]))
+        if draw < self.val_fraction:
+            return "val"
+        if draw < self.val_fraction + self.test_fraction:
+            return "test"
+        return "train"
+
+    def process(self, record: dict) -> Optional[dict]:
+        text = record["text_content"]
+        summary = record["summary"]
+        split = self.choose_split(record)
+        self._files[split].write(
+            dumps_jsonl(
+                [
+                    {
+                        "text": text,
+                        "summary": summary,
+                        "text_len": len(text),
+                        "summary_len": len(summary),
+                    }
+                ]
+            )
+        )
+        self.counts[split] += 1
+        return record
+
+    def close(self) -> None:
+        for split, f in self._files.items():
+            f.close()
+            os.replace(self._tmp_path(split), self.split_path(split))
+
+        manifest = {
+            "val_fraction": self.val_fraction,
+            "test_fraction": self.test_fraction,
+            "splits": {
+                split: {
+                    "file_name": self.split_path(split).name,
+                    "n_records": self.counts[split],
+                    "n_bytes": self.split_path(split).stat().st_size,
+                }
+                for split in SPLITS
+            },
+        }
+        tmp_path = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        with open(tmp_path, "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+
+def load_split_manifest(folder: Union[str, Path]) -> dict:
+    """Loads the manifest of the splits in a folder.
+
+    Args:
+        folder (str or Path):
+            Folder of the split files.
+
+    Returns:
+        dict:
+            The manifest, with the file name, number of records and size in bytes of
+            every split.
+    """
+    with open(Path(folder) / MANIFEST_NAME, "r") as f:
+        return json.load(f)
+
+
+def run_pipeline(records: Iterable[dict], stages: List[Stage]) -> List[StageStats]:
+    """Streams records through the stages of a pipeline, one record at a time.
+
+    Args:
+        records (iterable of dict):
+            Input records.
+        stages (list of Stage):
+            Stages, in the order the records pass through them.
+
+    Returns:
+        list of StageStats:
+            Statistics of the stages.
+    """
+    clock = time.perf_counter
+    stats = [stage.stats for stage in stages]
+    for record in records:
+        for stage, stage_stats in zip(stages, stats):
+            start = clock()
+            processed = stage.process(record)
+            stage_stats.seconds += clock() - start
+            stage_stats.n_in += 1
+            if processed is None:
+                break
+            record = processed
+            stage_stats.n_out += 1
+
+    for stage, stage_stats in zip(stages, stats):
+        start = clock()
+        stage.close()
+        stage_stats.seconds += clock() - start
+    return stats
+
+
+def process_summary_dataset(cfg: DictConfig) -> Dict[str, int]:
+    """Filters, deduplicates and splits the raw summary dataset.
+
+    The raw dataset is streamed, so only the hashes used to find duplicates, and the
+    MinHash signatures used to find near-duplicates, are held in memory. The
+    clusters of near-duplicates are written next to the splits, and the statistics
+    of every stage are logged.
+
+    Args:
+        cfg (DictConfig):
+            Hydra config.
+
+    Returns:
+        dict of int:
+            Number of records in each split.
+    """
+    processing_cfg = cfg["processing"]
+    raw_data_path = (
+        Path(cfg["dirs"]["data"])
+        / cfg["dirs"]["raw"]
+        / (
+            cfg["dataset_names"]["summary"]
+            + JSONL_SUFFIXES[cfg["storage"]["compression"]]
+        )
+    )
+
+    def filter_stages() -> List[Stage]:
+        return [
+            FilterStage(
+                min_length=processing_cfg["min_length"],
+                blacklist_summaries=processing_cfg["blacklist_summaries"],
+            ),
+            DedupStage(keys=list(processing_cfg["dedup_keys"])),
+        ]
+
+    start = time.perf_counter()
+
+    # Near-duplicates are found in a first pass over the dataset, so the clusters
+    # are known when the records are split in the second pass.
+    near_duplicates_cfg = processing_cfg["near_duplicates"]
+    cluster_stages: List[Stage] = []
+    if near_duplicates_cfg["enabled"]:
+        near_duplicate_stage = NearDuplicateStage(
+            fields=list(near_duplicates_cfg["fields"]),
+            n_permutations=near_duplicates_cfg["n_permutations"],
+            n_bands=near_duplicates_cfg["n_bands"],
+            threshold=near_duplicates_cfg["threshold"],
+            batch_size=near_duplicates_cfg["batch_size"],
+            seed=near_duplicates_cfg["seed"],
+        )
+        stats = run_pipeline(
+            iter_jsonl(str(raw_data_path)), filter_stages() + [near_duplicate_stage]
+        )
+        logger.info(stats[-1])
+
+        clusters = near_duplicate_stage.clusters()
+        logger.info(
+            f"Found {len(set(clusters.values()))} clusters of near-duplicates, "
+            f"with {len(clusters)} records"
+        )
+        processed_folder = Path(processing_cfg["processed_folder"])
+        processed_folder.mkdir(parents=True, exist_ok=True)
+        write_jsonl(
+            [{"uuid": uuid, "cluster": cluster} for uuid, cluster in clusters.items()],
+            processed_folder / NEAR_DUPLICATES_NAME,
+        )
+        cluster_stages.append(ClusterStage(clusters))
+
+    split_writer = SplitWriter(
+        folder=processing_cfg["processed_folder"],
+        val_fraction=processing_cfg["val_fraction"],
+        test_fraction=processing_cfg["test_fraction"],
+    )
+    stats = run_pipeline(
+        iter_jsonl(str(raw_data_path)),
+        filter_stages() + cluster_stages + [split_writer],
+    )
+    seconds = time.perf_counter() - start
+
+    for stage_stats in stats:
+        logger.info(stage_stats)
+    logger.info(f"Processed {stats[0].n_in} records in {seconds:.1f} s")
+    logger.info(f"Split sizes: {split_writer.counts}")
+    return split_writer.counts
@@ -0,0 +1,210 @@
+"""Adaptive rate limiter shared by all requests to the TV2 Nord API."""
+
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Deque, Dict, Optional
+
+from omegaconf import DictConfig
+
+
+class AdaptiveRateLimiter:
+    """Token bucket whose refill rate is adapted with AIMD.
+
+    The rate is increased additively after every successful response, and decreased
+    multiplicatively whenever the server signals that it is overloaded. A
+    `Retry-After` header from the server pauses all requests for the given time.
+
+    The limiter is thread safe, so the same instance can be shared by page and image
+    requests, also when pages are fetched concurrently.
+
+    Args:
+        initial_rate (float):
+            Initial number of requests per second.
+        min_rate (float):
+            Minimum number of requests per second.
+        max_rate (float):
+            Maximum number of requests per second.
+        additive_increase (float):
+            Requests per second added to the rate after every successful response.
+        multiplicative_decrease (float):
+            Factor the rate is multiplied with when the server is overloaded.
+        burst (int):
+            Maximum number of tokens in the bucket.
+        window (float):
+            Length in seconds of the window used to measure the effective rate.
+
+    Attributes:
+        rate (float):
+            Current number of requests per second.
+        tokens (float):
+            Number of tokens in the bucket.
+        paused_until (float):
+            Monotonic time until which all requests are paused.
+        n_requests (int):
+            Number of requests let through.
+        n_throttled (int):
+            Number of responses telling us to slow down.
+    """
+
+    def __init__(
+        self,
+        initial_rate: float,
+        min_rate: float,
+        max_rate: float,
+        additive_increase: float,
+        multiplicative_decrease: float,
+        burst: int,
+        window: float = 60.0,
+    ) -> None:
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.additive_increase = additive_increase
+        self.multiplicative_decrease = multiplicative_decrease
+        self.burst = burst
+        self.window = window
+
+        self.rate = initial_rate
+        self.tokens = float(burst)
+        self.paused_until = 0.0
+        self.n_requests = 0
+        self.n_throttled = 0
+
+        self._last_refill = time.monotonic()
+        self._request_times: Deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Blocks until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    self.n_requests += 1
+                    self._request_times.append(now)
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+    def on_success(self) -> None:
+        """Increases the rate additively after a successful response."""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.additive_increase)
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        """Decreases the rate multiplicatively after the server asked us to slow down.
+
+        Args:
+            retry_after (float, optional):
+                Seconds the server asked us to wait before the next request. If None,
+                only the rate is decreased. Defaults to None.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.n_throttled += 1
+            self.rate = max(self.min_rate, self.rate * self.multiplicative_decrease)
+
+            # Do not let the requests queued up while waiting be sent as one burst.
+            self.tokens = min(self.tokens, 1.0)
+
+            if retry_after is not None:
+                self.paused_until = max(self.paused_until, now + retry_after)
+
+    @property
+    def state(self) -> Dict[str, float]:
+        """State of the rate limiter.
+
+        Returns:
+            dict of float:
+                The target rate, the effective rate measured over the last `window`
+                seconds (both in requests per second), the number of seconds left of
+                a pause, and the number of requests and throttled responses.
+        """
+        with self._lock:
+            now = time.monotonic()
+            while self._request_times and self._request_times[0] < now - self.window:
+                self._request_times.popleft()
+            return {
+                "rate": self.rate,
+                "effective_rate": len(self._request_times) / self.window,
+                "paused_for": max(0.0, self.paused_until - now),
+                "n_requests": self.n_requests,
+                "n_throttled": self.n_throttled,
+            }
+
+    def _refill(self, now: float) -> None:
+        """Adds the tokens earned since the last refill to the bucket.
+
+        Args:
+            now (float):
+                Current monotonic time.
+        """
+        elapsed = now - self._last_refill
+        self.tokens = min(float(self.burst), self.tokens + elapsed * self.rate)
+        self._last_refill = now
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parses the value of a `Retry-After` header.
+
+    Args:
+        value (str, optional):
+            Value of the header, either a number of seconds or an HTTP date.
+
+    Returns:
+        float or None:
+            Number of seconds to wait, or None if the value is missing or invalid.
+
+    Examples:
+        >>> parse_retry_after("120")
+        120.0
+        >>> parse_retry_after(None) is None
+        True
+        >>> parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT")
+        0.0
+    """
+    if value is None:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def build_rate_limiter(cfg: DictConfig) -> AdaptiveRateLimiter:
+    """Builds the rate limiter described in the `rate_limit` block of the config.
+
+    Args:
+        cfg (DictConfig):
+            The `rate_limit` block of the Hydra config.
+
+    Returns:
+        AdaptiveRateLimiter:
+            Rate limiter.
+    """
+    return AdaptiveRateLimiter(
+        initial_rate=cfg["initial_rate"],
+        min_rate=cfg["min_rate"],
+        max_rate=cfg["max_rate"],
+        additive_increase=cfg["additive_increase"],
+        multiplicative_decrease=cfg["multiplicative_decrease"],
+        burst=cfg["burst"],
+    )
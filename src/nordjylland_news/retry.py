@@ -0,0 +1,236 @@
+"""Retry policies, retry budget and circuit breaker used when sending requests."""
+
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+from omegaconf import DictConfig
+
+from .exceptions import InternalServerErrorException, ServiceUnavailableException
+
+# Exceptions that indicate that the host is down, as opposed to the host refusing a
+# single request.
+HOST_DOWN_EXCEPTIONS = (
+    requests.RequestException,
+    InternalServerErrorException,
+    ServiceUnavailableException,
+)
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for one class of errors.
+
+    Args:
+        max_attempts (int):
+            Maximum number of attempts, including the first one.
+        base_delay (float):
+            Delay in seconds before the first retry, before jitter is applied.
+        max_delay (float):
+            Maximum delay in seconds between two attempts.
+    """
+
+    def __init__(self, max_attempts: int, base_delay: float, max_delay: float) -> None:
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        """Gets the delay before the next attempt.
+
+        The delay is drawn uniformly between zero and an exponentially growing cap,
+        so that clients retrying at the same time spread out.
+
+        Args:
+            attempt (int):
+                Number of attempts made so far.
+
+        Returns:
+            float:
+                Delay in seconds.
+        """
+        cap = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, cap)
+
+
+class RetryBudget:
+    """Global budget limiting the number of retries to a fraction of the requests.
+
+    When the API is failing, every request would otherwise retry up to its maximum
+    number of attempts, multiplying the load. With the budget, at most
+    `min_retries + ratio * n_requests` retries are made in total.
+
+    Args:
+        ratio (float):
+            Number of retries allowed per request.
+        min_retries (int):
+            Number of retries that are always allowed.
+
+    Attributes:
+        n_requests (int):
+            Number of requests made.
+        n_retries (int):
+            Number of retries made.
+    """
+
+    def __init__(self, ratio: float, min_retries: int) -> None:
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.n_requests = 0
+        self.n_retries = 0
+        self._lock = threading.Lock()
+
+    def record_request(self) -> None:
+        """Records a new request, which adds to the budget."""
+        with self._lock:
+            self.n_requests += 1
+
+    def try_retry(self) -> bool:
+        """Withdraws a retry from the budget.
+
+        Returns:
+            bool:
+                True if the retry is allowed, False if the budget is spent.
+        """
+        with self._lock:
+            if self.n_retries >= self.min_retries + self.ratio * self.n_requests:
+                return False
+            self.n_retries += 1
+            return True
+
+
+class CircuitBreaker:
+    """Per-host circuit breaker that sheds load when a host is down.
+
+    After `failure_threshold` consecutive failures for a host, the circuit for that
+    host opens and requests to it fail immediately. After `reset_timeout` seconds a
+    single probe request is let through. If it succeeds the circuit closes again,
+    and otherwise it stays open for another `reset_timeout` seconds.
+
+    Args:
+        failure_threshold (int):
+            Number of consecutive failures before the circuit opens.
+        reset_timeout (float):
+            Seconds the circuit stays open before a probe request is let through.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures: Dict[str, int] = {}
+        self._opened_at: Dict[str, float] = {}
+        self._probing: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+
+    def allow_request(self, host: str) -> bool:
+        """Checks whether a request to the host may be sent.
+
+        Args:
+            host (str):
+                Host to send the request to.
+
+        Returns:
+            bool:
+                True if the request may be sent, False otherwise.
+        """
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return True
+
+            # Half-open: let a single probe through once the timeout has passed.
+            if time.monotonic() - opened_at >= self.reset_timeout and not (
+                self._probing.get(host)
+            ):
+                self._probing[host] = True
+                return True
+            return False
+
+    def record_success(self, host: str) -> None:
+        """Records that the host responded, which closes its circuit.
+
+        Args:
+            host (str):
+                Host that responded.
+        """
+        with self._lock:
+            self._failures[host] = 0
+            self._opened_at.pop(host, None)
+            self._probing[host] = False
+
+    def record_failure(self, host: str) -> None:
+        """Records that the host is failing, which may open its circuit.
+
+        Args:
+            host (str):
+                Host that failed.
+        """
+        with self._lock:
+            self._failures[host] = self._failures.get(host, 0) + 1
+            if self._probing.get(host) or (
+                self._failures[host] >= self.failure_threshold
+            ):
+                self._opened_at[host] = time.monotonic()
+                self._probing[host] = False
+
+    def is_open(self, host: str) -> bool:
+        """Checks whether the circuit for the host is open.
+
+        Args:
+            host (str):
+                Host to check.
+
+        Returns:
+            bool:
+                True if the circuit is open, False otherwise.
+        """
+        with self._lock:
+            return host in self._opened_at
+
+
+def build_retry_policies(cfg: DictConfig) -> Dict[str, RetryPolicy]:
+    """Builds the retry policies described in the `retry.policies` block of the config.
+
+    Args:
+        cfg (DictConfig):
+            The `retry.policies` block of the Hydra config, mapping exception class
+            names to policies.
+
+    Returns:
+        dict of RetryPolicy:
+            Retry policies, keyed by exception class name.
+    """
+    # DictConfig keys can be other types than strings, but these are class names.
+    return {
+        str(name): RetryPolicy(
+            max_attempts=policy["max_attempts"],
+            base_delay=policy["base_delay"],
+            max_delay=policy["max_delay"],
+        )
+        for name, policy in cfg.items()
+    }
+
+
+def get_retry_policy(
+    policies: Dict[str, RetryPolicy], exception: Exception
+) -> Optional[RetryPolicy]:
+    """Gets the retry policy for an exception.
+
+    The policy of the closest base class is used, so for example a
+    `requests.ConnectionError` uses the `RequestException` policy.
+
+    Args:
+        policies (dict of RetryPolicy):
+            Retry policies, keyed by exception class name.
+        exception (Exception):
+            Exception to get the policy for.
+
+    Returns:
+        RetryPolicy or None:
+            The retry policy, or None if no policy covers the exception.
+    """
+    for exception_class in type(exception).__mro__:
+        if exception_class.__name__ in policies:
+            return policies[exception_class.__name__]
+    return None
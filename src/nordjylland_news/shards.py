@@ -0,0 +1,360 @@
+"""WebDataset style tar shards of the image caption dataset."""
+
+import io
+import json
+import logging
+import os
+import tarfile
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional, Union
+
+from omegaconf import DictConfig
+
+from .utils import load_jsonl, write_jsonl
+
+logger = logging.getLogger(__name__)
+
+# File name of the index of the samples in the shards
+INDEX_NAME = "index.jsonl"
+
+# Size of the buffer used when reading and writing shards
+SHARD_BUFFER_SIZE = 1 << 20
+
+
+class ShardWriter:
+    """Writes samples to numbered tar shards of a maximum size.
+
+    Every sample is stored as the members `<key>.<image suffix>`, `<key>.txt` and
+    `<key>.json`, holding the image, the caption and the metadata of the sample, as
+    in the WebDataset format. A new shard is started when the next sample would make
+    the current shard larger than `max_shard_size`, counting the padding added when
+    the shard is closed. Shards are written to a temporary file first, which is
+    renamed when the shard is complete. Used as a context manager, the writer is
+    closed when done, and the incomplete shard is removed on an error.
+
+    Args:
+        folder (str or Path):
+            Folder of the shards.
+        max_shard_size (int):
+            Maximum size in bytes of a shard, unless it holds a single sample.
+
+    Attributes:
+        folder (Path):
+            Folder of the shards.
+        max_shard_size (int):
+            Maximum size in bytes of a shard.
+        index (list of dict):
+            Shard, key and location of the image of every written sample.
+        shard_names (list of str):
+            Names of the complete shards.
+    """
+
+    def __init__(self, folder: Union[str, Path], max_shard_size: int) -> None:
+        self.folder = Path(folder)
+        self.max_shard_size = max_shard_size
+        self.index: List[dict] = []
+        self.shard_names: List[str] = []
+        self._file: Optional[BinaryIO] = None
+        self._tar: Optional[tarfile.TarFile] = None
+        self._shard_name = ""
+        self._n_samples = 0
+        self.folder.mkdir(parents=True, exist_ok=True)
+
+    def write(
+        self, key: str, image_path: Union[str, Path], caption: str, metadata: dict
+    ) -> None:
+        """Writes a sample to the current shard.
+
+        Args:
+            key (str):
+                Key of the sample, which is the base name of its members.
+            image_path (str or Path):
+                Path to the image.
+            caption (str):
+                Caption of the image.
+            metadata (dict):
+                Metadata of the sample.
+        """
+        image_path = Path(image_path)
+        caption_data = caption.encode("utf-8")
+        metadata_data = json.dumps(metadata, ensure_ascii=False).encode("utf-8")
+
+        # Every member takes a header block, and its data is padded to whole blocks.
+        sample_size = sum(
+            tarfile.BLOCKSIZE + _padded_size(size)
+            for size in [
+                image_path.stat().st_size,
+                len(caption_data),
+                len(metadata_data),
+            ]
+        )
+        if self._tar is None or (
+            self._n_samples
+            and _closed_size(self._tar.offset + sample_size) > self.max_shard_size
+        ):
+            self._start_shard()
+        assert self._tar is not None
+
+        image_info = self._tar.gettarinfo(
+            image_path, arcname=f"{key}{image_path.suffix.lower()}"
+        )
+        _normalise(image_info)
+        with open(image_path, "rb") as f:
+            self._tar.addfile(image_info, f)
+
+        # The data of the image ends where the tar file is now, before its padding.
+        image_offset = self._tar.offset - _padded_size(image_info.size)
+        self._add_bytes(f"{key}.txt", caption_data)
+        self._add_bytes(f"{key}.json", metadata_data)
+
+        self.index.append(
+            {
+                "key": key,
+                "shard": self._shard_name,
+                "image_member": image_info.name,
+                "offset": image_offset,
+                "size": image_info.size,
+            }
+        )
+        self._n_samples += 1
+
+    def close(self) -> None:
+        """Completes the current shard, and writes the index of the samples."""
+        self._finish_shard()
+        write_jsonl(self.index, self.folder / INDEX_NAME)
+
+    def abort(self) -> None:
+        """Removes the current incomplete shard, without writing the index."""
+        if self._tar is None or self._file is None:
+            return
+        self._tar.close()
+        self._file.close()
+        self._tmp_path(self._shard_name).unlink()
+        self._tar = None
+        self._file = None
+
+    def __enter__(self) -> "ShardWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _add_bytes(self, name: str, data: bytes) -> None:
+        """Adds a member holding some bytes to the current shard.
+
+        Args:
+            name (str):
+                Name of the member.
+            data (bytes):
+                Content of the member.
+        """
+        assert self._tar is not None
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        _normalise(info)
+        self._tar.addfile(info, io.BytesIO(data))
+
+    def _start_shard(self) -> None:
+        """Completes the current shard, if any, and starts a new one."""
+        self._finish_shard()
+        self._shard_name = f"shard-{len(self.shard_names):06d}.tar"
+        self._file = open(
+            self._tmp_path(self._shard_name), "wb", buffering=SHARD_BUFFER_SIZE
+        )
+        self._tar = tarfile.open(
+            fileobj=self._file, mode="w", format=tarfile.PAX_FORMAT
+        )
+        self._n_samples = 0
+
+    def _finish_shard(self) -> None:
+        """Completes the current shard, renaming it to its final name."""
+        if self._tar is None or self._file is None:
+            return
+        self._tar.close()
+        self._file.close()
+        os.replace(self._tmp_path(self._shard_name), self.folder / self._shard_name)
+        self.shard_names.append(self._shard_name)
+        self._tar = None
+        self._file = None
+
+    def _tmp_path(self, shard_name: str) -> Path:
+        """Gets the path to the temporary file of a shard.
+
+        Args:
+            shard_name (str):
+                Name of the shard.
+
+        Returns:
+            Path:
+                Temporary shard path.
+        """
+        return self.folder / f"{shard_name}.tmp"
+
+
+def _padded_size(size: int) -> int:
+    """Rounds the size of the data of a tar member up to whole blocks.
+
+    Args:
+        size (int):
+            Size in bytes.
+
+    Returns:
+        int:
+            Padded size in bytes.
+
+    Examples:
+        >>> _padded_size(1), _padded_size(512), _padded_size(513)
+        (512, 512, 1024)
+    """
+    return -(-size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+
+
+def _closed_size(size: int) -> int:
+    """Gets the size of a tar file once it is closed.
+
+    Closing a tar file adds two empty blocks marking the end of the archive, and pads
+    the file to whole records.
+
+    Args:
+        size (int):
+            Size in bytes of the members of the tar file.
+
+    Returns:
+        int:
+            Size in bytes of the closed tar file.
+
+    Examples:
+        >>> _closed_size(512), _closed_size(9216), _closed_size(9217)
+        (10240, 10240, 20480)
+    """
+    size += 2 * tarfile.BLOCKSIZE
+    return -(-size // tarfile.RECORDSIZE) * tarfile.RECORDSIZE
+
+
+def _normalise(info: tarfile.TarInfo) -> None:
+    """Clears the owner and time of a tar member, so shards are reproducible.
+
+    Args:
+        info (TarInfo):
+            Tar member.
+    """
+    info.mtime = 0
+    info.uid = info.gid = 0
+    info.uname = info.gname = ""
+    info.mode = 0o644
+
+
+def list_shards(folder: Union[str, Path]) -> List[Path]:
+    """Lists the shards in a folder, in order.
+
+    Args:
+        folder (str or Path):
+            Folder of the shards.
+
+    Returns:
+        list of Path:
+            The shards.
+    """
+    return sorted(Path(folder).glob("shard-*.tar"))
+
+
+def iter_shard_samples(shards: List[Union[str, Path]]) -> Iterator[dict]:
+    """Streams the samples of tar shards, reading every shard sequentially.
+
+    The shards can be divided between several readers, such as the workers of a
+    data loader, which each read their own shards.
+
+    Args:
+        shards (list of str or Path):
+            Paths to the shards.
+
+    Yields:
+        dict:
+            Sample, with its `key`, the bytes of its `image`, its `caption` and its
+            `metadata`.
+    """
+    for shard in shards:
+        with open(shard, "rb", buffering=SHARD_BUFFER_SIZE) as f, tarfile.open(
+            fileobj=f, mode="r|"
+        ) as tar:
+            sample: dict = {}
+            for info in tar:
+                if not info.isfile():
+                    continue
+                key, _, extension = info.name.partition(".")
+                if sample and sample["key"] != key:
+                    yield sample
+                    sample = {}
+                sample["key"] = key
+
+                member = tar.extractfile(info)
+                assert member is not None
+                data = member.read()
+                if extension == "txt":
+                    sample["caption"] = data.decode("utf-8")
+                elif extension == "json":
+                    sample["metadata"] = json.loads(data)
+                else:
+                    sample["image"] = data
+            if sample:
+                yield sample
+
+
+def read_image(folder: Union[str, Path], entry: dict) -> bytes:
+    """Reads the image of a single sample, using its entry in the shard index.
+
+    Args:
+        folder (str or Path):
+            Folder of the shards.
+        entry (dict):
+            Entry of the sample in the shard index.
+
+    Returns:
+        bytes:
+            The image.
+    """
+    with open(Path(folder) / entry["shard"], "rb") as f:
+        f.seek(entry["offset"])
+        return f.read(entry["size"])
+
+
+def build_image_shards(cfg: DictConfig) -> List[str]:
+    """Packs the processed image caption dataset into tar shards.
+
+    The samples are the records of the `metadata.jsonl` file of the processed image
+    folder, in order, and the index of the samples is written next to the shards.
+
+    Args:
+        cfg (DictConfig):
+            Hydra config.
+
+    Returns:
+        list of str:
+            Names of the shards.
+    """
+    shards_cfg = cfg["image_shards"]
+    image_folder = Path(shards_cfg["image_folder"])
+    shard_folder = Path(shards_cfg["shard_folder"])
+    old_files = [*list_shards(shard_folder), *shard_folder.glob("shard-*.tar.tmp")]
+    for path in old_files + [shard_folder / INDEX_NAME]:
+        path.unlink(missing_ok=True)
+
+    metadata = load_jsonl(image_folder / "metadata.jsonl")
+    with ShardWriter(
+        shard_folder, max_shard_size=shards_cfg["max_shard_size"]
+    ) as writer:
+        for i, data in enumerate(metadata):
+            writer.write(
+                key=f"{i:09d}",
+                image_path=image_folder / data["file_name"],
+                caption=data["caption"],
+                metadata=data,
+            )
+
+    logger.info(
+        f"Wrote {len(writer.index)} samples to {len(writer.shard_names)} shards"
+    )
+    return writer.shard_names
@@ -1,12 +1,14 @@
 """Class that builds and contains the summarisation dataset."""
 
 
-from typing import Dict, List
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, List, Optional
 
 from omegaconf import DictConfig
 
 from .base_dataset_class import DataSetBuilder
-from .utils import append_jsonl, html_to_text
+from .parquet_store import SUMMARY_FIELDS
+from .text_cache import build_text_cache
 
 
 class SummaryDataSetBuilder(DataSetBuilder):
@@ -31,24 +33,63 @@ class SummaryDataSetBuilder(DataSetBuilder):
             Maximum number of articles per page.
         articles_api_url (str):
             URL to articles API.
-        dataset (list of dict):
-            Dataset.
-        seen_uuids (set of str):
+        uuid_index (UUIDIndex):
+            Persistent index of the uuids in the dataset file.
+        seen_uuids (CompactUUIDSet):
             Set of seen uuids.
         current_page (int):
             Current page to scrape.
-        sleep_length (dict of int):
-            Length of sleep in seconds.
+        checkpoint (CrawlCheckpoint):
+            Manifest of the pages committed to the dataset file.
+        fsync_every_n_pages (int):
+            Number of pages after which the dataset file is synced to disk and the
+            checkpoint persisted. If 0, this is only done when a crawl finishes.
+        n_unsynced_pages (int):
+            Number of pages committed since the dataset file was last synced.
+        compression (str or None):
+            Compression of the dataset file, either "gzip", "zstd" or None.
+        parquet_writer (ParquetDatasetWriter or None):
+            Writer of the Parquet copy of the dataset, or None if it is disabled.
+        n_pages_without_new_data (int):
+            Number of consecutive pages already in the dataset.
+        incremental (bool):
+            Whether to only fetch articles published since the last crawl.
+        stop_after_seen_pages (int):
+            Number of consecutive pages without new data after which an incremental
+            crawl stops.
+        max_in_flight (int):
+            Maximum number of pages fetched concurrently when crawling asynchronously.
+        transport (HTTPTransport or HTTP2Transport):
+            Transport used to send requests.
+        owns_transport (bool):
+            Whether the builder closes the transport when a crawl finishes.
+        rate_limiter (AdaptiveRateLimiter):
+            Rate limiter shared by all requests of the builder.
+        retry_policies (dict of RetryPolicy):
+            Retry policies, keyed by exception class name.
+        retry_budget (RetryBudget):
+            Global budget for retries.
+        circuit_breaker (CircuitBreaker):
+            Per-host circuit breaker.
         dataset_length (int):
             Number of articles in dataset.
+        text_cache (HTMLTextCache):
+            Cache of the text extracted from the html of the articles.
+        extraction_pool (ProcessPoolExecutor or None):
+            Pool of worker processes extracting the text of the articles, or None if
+            it has not been started yet or the text is extracted in the main process.
     """
 
+    parquet_fields = SUMMARY_FIELDS
+
     def __init__(self, cfg: DictConfig) -> None:
         dataset_name = cfg["dataset_names"]["summary"]
         super().__init__(dataset_name=dataset_name, cfg=cfg)
 
         # Number of articles in dataset
         self.dataset_length = len(self.seen_uuids)
+        self.text_cache = build_text_cache(cfg["text_extraction"])
+        self.extraction_pool: Optional[ProcessPoolExecutor] = None
 
     def build_dataset(self) -> None:
         """Builds article text content to article summary dataset.
@@ -57,37 +98,116 @@ class SummaryDataSetBuilder(DataSetBuilder):
         the method stops and returns None.
         """
         self.logger.info("Building summarisation dataset")
+        super().build_dataset()
+
+    def finish_crawl(self) -> None:
+        """Stops the text extraction pool and persists the html text cache."""
+        if self.extraction_pool is not None:
+            self.extraction_pool.shutdown()
+            self.extraction_pool = None
+        self.text_cache.save()
+        self.logger.info(f"Html text cache: {self.text_cache.state}")
+        super().finish_crawl()
+
+    def process_page(self, articles: List[dict]) -> List[dict]:
+        """Gets text content and summary of the new articles on the current page.
+
+        Args:
+            articles (list of dict):
+                List of articles data.
+
+        Returns:
+            new_data (list of dict):
+                New data to append to dataset.
+        """
+        new_articles = []
+
+        # Iterate over articles on current page
+        for article in articles:
+            uuid = article["uuid"]
 
-        # Iterate over pages until a page with no articles is visited.
-        while True:
-            new_data: List[Dict] = []
-            articles = self.get_page_with_articles(page=self.current_page)
+            # If article is not seen before and has a summary, add it to dataset.
+            if uuid not in self.seen_uuids and article["summary"] is not None:
+                self.seen_uuids.add(uuid)
+                self.dataset_length += 1
+                new_articles.append(article)
 
-            if self.dataset_done(articles):
-                self.logger.info("Dataset done.")
-                return
-            else:
-                # Iterate over articles on current page
-                for article in articles:
-                    uuid = article["uuid"]
+        new_data = self.extract_articles(new_articles)
+        return new_data
 
-                    # If article is not seen before and has a summary, add it to dataset.
-                    if uuid not in self.seen_uuids and article["summary"] is not None:
-                        self.seen_uuids.add(uuid)
-                        self.dataset_length += 1
+    def page_uuids(self, articles: List[dict]) -> List[str]:
+        """Gets the uuids of the articles with a summary on the current page.
 
-                        data = self.get_article_data(article)
-                        new_data.append(data)
+        Args:
+            articles (list of dict):
+                List of articles data.
 
-            # Append new data to dataset.
-            append_jsonl(new_data, self.data_path)
+        Returns:
+            list of str:
+                Uuids of the articles.
+        """
+        return [
+            article["uuid"] for article in articles if article["summary"] is not None
+        ]
 
-            # Log progress
-            self.logger.info(f"{self.dataset_length}/{self.total_articles}")
+    def log_progress(self) -> None:
+        """Logs progress of the crawl."""
+        self.logger.info(
+            f"{self.dataset_length}/{self.total_articles} "
+            f"({self.rate_limiter.state['effective_rate']:.2f} requests/s)"
+        )
 
-            self.page_increment()
+    def extract_articles(
+        self, articles: List[dict], executor: Optional[Executor] = None
+    ) -> List[Dict]:
+        """Gets text content and summary of a batch of articles.
 
-            self.sleep()
+        The html of the text blocks of all the articles is converted in one batch,
+        and only the html that is not in the html text cache is converted. The html
+        is spread over the given executor, or else the text extraction pool, which is
+        started on first use if `text_extraction.n_workers` is positive, and kept
+        for the following batches until `finish_crawl` is called.
+
+        Args:
+            articles (list of dict):
+                List of articles data.
+            executor (Executor, optional):
+                Executor converting the html. If None, the text extraction pool is
+                used. Defaults to None.
+
+        Returns:
+            list of dict:
+                Article text content and summary + meta data, in the same order as
+                the articles.
+        """
+        if executor is None and articles:
+            executor = self._get_extraction_pool()
+
+        all_html = [get_text_html(article) for article in articles]
+        texts = iter(
+            self.text_cache.html_to_texts(
+                [html for article_html in all_html for html in article_html],
+                executor=executor,
+                chunksize=self.cfg["text_extraction"]["chunksize"],
+            )
+        )
+        return [
+            self._article_data(article, join_text([next(texts) for _ in article_html]))
+            for article, article_html in zip(articles, all_html)
+        ]
+
+    def _get_extraction_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Gets the text extraction pool, starting it on first use.
+
+        Returns:
+            ProcessPoolExecutor or None:
+                The text extraction pool, or None if `text_extraction.n_workers` is
+                not positive, in which case the text is extracted in the main process.
+        """
+        n_workers = self.cfg["text_extraction"]["n_workers"]
+        if self.extraction_pool is None and n_workers > 0:
+            self.extraction_pool = ProcessPoolExecutor(max_workers=n_workers)
+        return self.extraction_pool
 
     def get_article_data(self, article: dict) -> Dict:
         """Gets article text content and summary.
@@ -102,6 +222,21 @@ class SummaryDataSetBuilder(DataSetBuilder):
 
         """
         text_content = self._get_text_content(article)
+        return self._article_data(article, text_content)
+
+    def _article_data(self, article: dict, text_content: str) -> Dict:
+        """Puts together the data of an article.
+
+        Args:
+            article (dict):
+                Article data.
+            text_content (str):
+                Article text content.
+
+        Returns:
+            data (dict):
+                Article text content and summary + meta data.
+        """
         summary = article["summary"]
         uuid = article["uuid"]
         canonical = article["canonical"]
@@ -114,8 +249,7 @@ class SummaryDataSetBuilder(DataSetBuilder):
         }
         return data
 
-    @staticmethod
-    def _get_text_content(article: dict) -> str:
+    def _get_text_content(self, article: dict) -> str:
         """Gets text content from article.
 
         Args:
@@ -126,12 +260,38 @@ class SummaryDataSetBuilder(DataSetBuilder):
             str:
                 Article text content.
         """
-        text_bits = []
-        all_content = article["content"]
-        for content in all_content:
-            if content["type"] == "Text":
-                html = content["content"]["html"]
-                text = html_to_text(html)
-                text_bits.append(text)
-        text = " ".join(text_bits)
-        return text.strip()
+        text_bits = self.text_cache.html_to_texts(get_text_html(article))
+        return join_text(text_bits)
+
+
+def get_text_html(article: dict) -> List[str]:
+    """Gets the html of the text blocks of an article.
+
+    Args:
+        article (dict):
+            Article data.
+
+    Returns:
+        list of str:
+            Html of each text block.
+    """
+    return [
+        content["content"]["html"]
+        for content in article["content"]
+        if content["type"] == "Text"
+    ]
+
+
+def join_text(text_bits: List[str]) -> str:
+    """Joins the text of the text blocks of an article.
+
+    Args:
+        text_bits (list of str):
+            Text of each text block.
+
+    Returns:
+        str:
+            Article text content.
+    """
+    text = " ".join(text_bits)
+    return text.strip()
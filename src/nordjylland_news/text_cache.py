@@ -0,0 +1,200 @@
+"""Memoizing cache of the text extracted from html fragments."""
+
+import hashlib
+import os
+from collections import OrderedDict
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
+
+from omegaconf import DictConfig
+
+from .utils import HTML_TO_TEXT_BACKENDS, load_jsonl, write_jsonl
+
+
+class HTMLTextCache:
+    """Bounded LRU cache in front of an html to text backend.
+
+    Many articles share the same boilerplate text blocks, such as sign-offs,
+    placeholders and fact boxes, so the text of every html fragment is cached under
+    the BLAKE2b hash of the fragment. When the cache holds `max_size` fragments, the
+    least recently used fragment is evicted. The cache can be saved to a JSONL file
+    and loaded again, so a later crawl reuses the earlier extractions.
+
+    Args:
+        backend (str):
+            Backend used to convert html to text, as in `utils.html_to_text`.
+        max_size (int):
+            Maximum number of cached fragments.
+        path (str or Path, optional):
+            Path to the file the cache is persisted to. If None, the cache only
+            lives in memory. Defaults to None.
+
+    Attributes:
+        backend (str):
+            Backend used to convert html to text.
+        max_size (int):
+            Maximum number of cached fragments.
+        path (Path or None):
+            Path to the file the cache is persisted to.
+        n_hits (int):
+            Number of lookups found in the cache.
+        n_misses (int):
+            Number of lookups not found in the cache.
+    """
+
+    def __init__(
+        self, backend: str, max_size: int, path: Optional[Union[str, Path]] = None
+    ) -> None:
+        self.backend = backend
+        self.max_size = max_size
+        self.path = Path(path) if path is not None else None
+        self.n_hits = 0
+        self.n_misses = 0
+        self._html_to_text = HTML_TO_TEXT_BACKENDS[backend]
+        self._texts: "OrderedDict[str, str]" = OrderedDict()
+
+    def key(self, html: str) -> str:
+        """Computes the cache key of an html fragment.
+
+        The backend is part of the key, so a persisted cache is not reused with
+        another backend.
+
+        Args:
+            html (str):
+                Html fragment.
+
+        Returns:
+            str:
+                Hex digest of the hash of the fragment.
+        """
+        return hashlib.blake2b(
+            html.encode("utf-8"), digest_size=16, person=self.backend.encode("utf-8")
+        ).hexdigest()
+
+    def html_to_text(self, html: str) -> str:
+        """Converts html to text, using the cached text if there is one.
+
+        Args:
+            html (str):
+                Html to convert.
+
+        Returns:
+            str:
+                Text from html.
+        """
+        return self.html_to_texts([html])[0]
+
+    def html_to_texts(
+        self,
+        htmls: List[str],
+        executor: Optional[Executor] = None,
+        chunksize: int = 1,
+    ) -> List[str]:
+        """Converts a batch of html fragments to text, using the cached texts.
+
+        Every fragment that is not cached is converted once, in the executor if one
+        is given, and the texts are returned in the same order as the fragments.
+
+        Args:
+            htmls (list of str):
+                Html fragments to convert.
+            executor (Executor, optional):
+                Executor, such as a process pool, converting the fragments that are
+                not cached. If None, they are converted in the calling thread.
+                Defaults to None.
+            chunksize (int):
+                Number of fragments sent to a worker of the executor at a time.
+                Defaults to 1.
+
+        Returns:
+            list of str:
+                Text from each html fragment.
+        """
+        keys = [self.key(html) for html in htmls]
+        texts: Dict[str, str] = {}
+        missing: Dict[str, str] = {}
+        for key, html in zip(keys, htmls):
+            if key in texts or key in missing:
+                self.n_hits += 1
+            elif key in self._texts:
+                self.n_hits += 1
+                self._texts.move_to_end(key)
+                texts[key] = self._texts[key]
+            else:
+                self.n_misses += 1
+                missing[key] = html
+
+        new_texts: Iterator[str]
+        if executor is None:
+            new_texts = map(self._html_to_text, missing.values())
+        else:
+            new_texts = executor.map(
+                self._html_to_text, missing.values(), chunksize=chunksize
+            )
+        for key, text in zip(missing, new_texts):
+            texts[key] = text
+            self._texts[key] = text
+            if len(self._texts) > self.max_size:
+                self._texts.popitem(last=False)
+
+        return [texts[key] for key in keys]
+
+    @property
+    def state(self) -> Dict[str, float]:
+        """State of the cache.
+
+        Returns:
+            dict of float:
+                The number of cached fragments, hits and misses, and the fraction of
+                lookups that were hits.
+        """
+        n_lookups = self.n_hits + self.n_misses
+        return {
+            "size": len(self._texts),
+            "n_hits": self.n_hits,
+            "n_misses": self.n_misses,
+            "hit_rate": self.n_hits / n_lookups if n_lookups else 0.0,
+        }
+
+    def load(self) -> None:
+        """Loads the persisted cache, if there is one."""
+        if self.path is None or not self.path.exists():
+            return
+
+        entries = load_jsonl(str(self.path))
+        for entry in entries[max(len(entries) - self.max_size, 0) :]:
+            self._texts[entry["key"]] = entry["text"]
+
+    def save(self) -> None:
+        """Atomically persists the cache, from least to most recently used."""
+        if self.path is None:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        write_jsonl(
+            [{"key": key, "text": text} for key, text in self._texts.items()],
+            str(tmp_path),
+        )
+        os.replace(tmp_path, self.path)
+
+
+def build_text_cache(cfg: DictConfig) -> HTMLTextCache:
+    """Builds the html text cache from the config, loading any persisted entries.
+
+    Args:
+        cfg (DictConfig):
+            The `text_extraction` section of the Hydra config.
+
+    Returns:
+        HTMLTextCache:
+            The cache.
+    """
+    cache = HTMLTextCache(
+        backend=cfg["backend"],
+        max_size=cfg["cache"]["max_size"],
+        path=cfg["cache"]["path"],
+    )
+    cache.load()
+    return cache
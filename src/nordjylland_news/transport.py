@@ -0,0 +1,234 @@
+"""HTTP transports used by the dataset builders to talk to the TV2 Nord API."""
+
+from typing import Dict, Iterator, Optional
+
+import requests
+from omegaconf import DictConfig
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+
+from .constants import HEADERS
+
+
+class HTTPTransport:
+    """Pooled keep-alive HTTP/1.1 transport based on `requests.Session`.
+
+    Connections are kept alive and reused between requests, so the TCP and TLS
+    handshakes are only paid once per connection instead of once per request.
+
+    Args:
+        max_hosts (int):
+            Number of hosts to keep connection pools for.
+        max_connections_per_host (int):
+            Maximum number of open connections to a single host.
+        headers (dict of str, optional):
+            Headers sent with every request. Defaults to `HEADERS`.
+
+    Attributes:
+        session (requests.Session):
+            Session holding the connection pools.
+    """
+
+    def __init__(
+        self,
+        max_hosts: int,
+        max_connections_per_host: int,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.session = requests.Session()
+        self.session.headers.update(default_headers(headers))
+
+        # Block instead of opening extra connections when a host pool is exhausted.
+        adapter = HTTPAdapter(
+            pool_connections=max_hosts,
+            pool_maxsize=max_connections_per_host,
+            pool_block=True,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(
+        self,
+        url: str,
+        timeout: float,
+        headers: Optional[Dict[str, str]] = None,
+        stream: bool = False,
+    ) -> requests.Response:
+        """Sends a GET request.
+
+        Args:
+            url (str):
+                Url to send request to.
+            timeout (float):
+                Timeout in seconds.
+            headers (dict of str, optional):
+                Extra headers for this request. Defaults to None.
+            stream (bool):
+                Whether to stream the response body. Defaults to False.
+
+        Returns:
+            requests.Response:
+                Response object.
+        """
+        return self.session.get(url, headers=headers, timeout=timeout, stream=stream)
+
+    def close(self) -> None:
+        """Closes all pooled connections."""
+        self.session.close()
+
+
+class HTTP2Transport:
+    """HTTP/2 transport based on `httpx`, multiplexing requests over one connection.
+
+    Requires `httpx` to be installed with HTTP/2 support (`pip install nordjylland_news[http2]`).
+
+    Args:
+        max_hosts (int):
+            Number of hosts to keep connections to.
+        max_connections_per_host (int):
+            Maximum number of open connections to a single host.
+        headers (dict of str, optional):
+            Headers sent with every request. Defaults to `HEADERS`.
+
+    Attributes:
+        client (httpx.Client):
+            Client holding the connections.
+    """
+
+    def __init__(
+        self,
+        max_hosts: int,
+        max_connections_per_host: int,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError(
+                "HTTP/2 requires httpx. Install it with `pip install nordjylland_news[http2]`."
+            )
+        self._httpx = httpx
+
+        limits = httpx.Limits(
+            max_connections=max_hosts * max_connections_per_host,
+            max_keepalive_connections=max_hosts * max_connections_per_host,
+        )
+        self.client = httpx.Client(
+            http2=True, limits=limits, headers=default_headers(headers)
+        )
+
+    def get(
+        self,
+        url: str,
+        timeout: float,
+        headers: Optional[Dict[str, str]] = None,
+        stream: bool = False,
+    ) -> "HTTPXResponse":
+        """Sends a GET request.
+
+        Transport errors are raised as `requests.ConnectionError`, so callers can
+        handle both transports in the same way.
+
+        Args:
+            url (str):
+                Url to send request to.
+            timeout (float):
+                Timeout in seconds.
+            headers (dict of str, optional):
+                Extra headers for this request. Defaults to None.
+            stream (bool):
+                Whether to stream the response body. Defaults to False.
+
+        Returns:
+            HTTPXResponse:
+                Response object with the same interface as `requests.Response`.
+        """
+        try:
+            request = self.client.build_request(
+                "GET", url, headers=headers, timeout=timeout
+            )
+            response = self.client.send(request, stream=stream)
+        except self._httpx.HTTPError as e:
+            raise requests.ConnectionError(str(e))
+        return HTTPXResponse(response)
+
+    def close(self) -> None:
+        """Closes all connections."""
+        self.client.close()
+
+
+class HTTPXResponse:
+    """Wraps a `httpx.Response` in the parts of the `requests.Response` interface we use.
+
+    Args:
+        response (httpx.Response):
+            Response to wrap.
+    """
+
+    def __init__(self, response) -> None:
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+
+    @property
+    def content(self) -> bytes:
+        """Body of the response."""
+        return self._response.read()
+
+    def json(self):
+        """Decodes the body of the response as JSON."""
+        return self._response.json()
+
+    def iter_content(self, chunk_size: int) -> Iterator[bytes]:
+        """Iterates over the body of a streamed response.
+
+        Args:
+            chunk_size (int):
+                Size of the chunks in bytes.
+
+        Yields:
+            bytes:
+                Chunk of the body.
+        """
+        yield from self._response.iter_bytes(chunk_size)
+
+    def close(self) -> None:
+        """Releases the connection of a streamed response."""
+        self._response.close()
+
+
+def default_headers(headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Gets the headers sent with every request.
+
+    Compressed responses are negotiated for every encoding the installed urllib3 can
+    decode (gzip and deflate, plus brotli if it is installed).
+
+    Args:
+        headers (dict of str, optional):
+            Headers to send. Defaults to `HEADERS`.
+
+    Returns:
+        dict of str:
+            Headers including `Accept-Encoding`.
+    """
+    all_headers = make_headers(accept_encoding=True)
+    all_headers.update(HEADERS if headers is None else headers)
+    return all_headers
+
+
+def build_transport(cfg: DictConfig):
+    """Builds the transport described in the `transport` block of the config.
+
+    Args:
+        cfg (DictConfig):
+            The `transport` block of the Hydra config.
+
+    Returns:
+        HTTPTransport or HTTP2Transport:
+            Transport.
+    """
+    transport_class = HTTP2Transport if cfg["http2"] else HTTPTransport
+    return transport_class(
+        max_hosts=cfg["max_hosts"],
+        max_connections_per_host=cfg["max_connections_per_host"],
+    )
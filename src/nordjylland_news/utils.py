@@ -1,49 +1,389 @@
 """Utility functions and classes to be used throughout the project."""
 
-from typing import List
+import gzip
+import importlib
+import io
+import json
+import zlib
+from pathlib import PurePath
+from types import ModuleType
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
 
-import jsonlines
 from bs4 import BeautifulSoup
 
+from .html_text import stream_html_to_text
 
-def init_jsonl(file_name: str) -> None:
+orjson: Optional[ModuleType]
+try:
+    orjson = importlib.import_module("orjson")
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# Size of the write buffer of the JSONL files
+WRITE_BUFFER_SIZE = 1 << 20
+
+# Size of the chunks read from compressed JSONL files
+READ_BUFFER_SIZE = 1 << 16
+
+# Suffix of the JSONL files with each compression, as set in the config
+JSONL_SUFFIXES: Dict[Optional[str], str] = {
+    None: ".jsonl",
+    "gzip": ".jsonl.gz",
+    "zstd": ".jsonl.zst",
+}
+
+
+def _to_json_default(obj: Any) -> Any:
+    """Converts objects that JSON does not support, such as paths.
+
+    Args:
+        obj:
+            Object to convert.
+
+    Returns:
+        str:
+            The path as a string.
+
+    Raises:
+        TypeError:
+            If the object cannot be converted.
+    """
+    if isinstance(obj, PurePath):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_jsonl(data: Iterable[dict]) -> bytes:
+    """Serialises records as JSON lines.
+
+    Uses orjson when it is installed, and the standard library otherwise. Paths are
+    written as strings.
+
+    Args:
+        data (iterable of dict):
+            Records to serialise.
+
+    Returns:
+        bytes:
+            One line of UTF-8 encoded JSON per record.
+
+    Examples:
+        >>> from pathlib import Path
+        >>> dumps_jsonl([{"file_name": Path("images") / "a.jpg"}]).decode().strip()
+        '{"file_name":"images/a.jpg"}'
+    """
+    if orjson is not None:
+        return b"".join(
+            orjson.dumps(d, default=_to_json_default, option=orjson.OPT_APPEND_NEWLINE)
+            for d in data
+        )
+    return "".join(
+        json.dumps(
+            d, default=_to_json_default, ensure_ascii=False, separators=(",", ":")
+        )
+        + "\n"
+        for d in data
+    ).encode("utf-8")
+
+
+def loads_json(line: Union[bytes, str]) -> Any:
+    """Parses a line of JSON.
+
+    Args:
+        line (bytes or str):
+            JSON to parse.
+
+    Returns:
+        The parsed JSON.
+    """
+    if orjson is not None:
+        return orjson.loads(line)
+    return json.loads(line)
+
+
+def jsonl_compression(file_name: Union[str, PurePath]) -> Optional[str]:
+    """Gets the compression of a jsonl file from its suffix.
+
+    Args:
+        file_name (str or Path):
+            File name.
+
+    Returns:
+        str or None:
+            "gzip" for `.jsonl.gz` files, "zstd" for `.jsonl.zst` files, and None for
+            uncompressed files.
+
+    Examples:
+        >>> jsonl_compression("summary.jsonl.zst"), jsonl_compression("summary.jsonl")
+        ('zstd', None)
+    """
+    name = str(file_name)
+    for compression, suffix in JSONL_SUFFIXES.items():
+        if compression is not None and name.endswith(suffix):
+            return compression
+    return None
+
+
+def _zstandard() -> ModuleType:
+    """Imports zstandard, which is only needed for `.jsonl.zst` files.
+
+    Returns:
+        module:
+            The zstandard module.
+
+    Raises:
+        ImportError:
+            If zstandard is not installed.
+    """
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError(
+            "Reading and writing `.jsonl.zst` files requires the `zstandard` "
+            "package. Install it with `pip install nordjylland_news[zstd]`."
+        ) from e
+    return zstandard
+
+
+def _compress(data: bytes, compression: Optional[str]) -> bytes:
+    """Compresses data into a single self-contained frame.
+
+    Frames can be concatenated, so a compressed file can be appended to by writing
+    new frames at its end, and truncated at the end of any frame.
+
+    Args:
+        data (bytes):
+            Data to compress.
+        compression (str or None):
+            Compression, as returned by `jsonl_compression`.
+
+    Returns:
+        bytes:
+            The compressed frame, or the data itself if there is no compression.
+    """
+    if compression == "gzip":
+        return gzip.compress(data)
+    if compression == "zstd":
+        return _zstandard().ZstdCompressor().compress(data)
+    return data
+
+
+def _open_jsonl_reader(file_name: Union[str, PurePath]) -> io.BufferedIOBase:
+    """Opens a jsonl file for reading, decompressing it while it is read.
+
+    Args:
+        file_name (str or Path):
+            File name to read.
+
+    Returns:
+        file object:
+            Binary file with the uncompressed content, which can be iterated over
+            line by line.
+    """
+    compression = jsonl_compression(file_name)
+    if compression == "gzip":
+        return gzip.open(file_name, "rb")
+    if compression == "zstd":
+        reader = (
+            _zstandard()
+            .ZstdDecompressor()
+            .stream_reader(open(file_name, "rb"), read_across_frames=True)
+        )
+        return io.BufferedReader(reader, buffer_size=READ_BUFFER_SIZE)
+    return open(file_name, "rb")
+
+
+def _new_decompressor(compression: str) -> Any:
+    """Creates a decompressor of a single compressed frame.
+
+    The decompressor stops at the end of the frame, and keeps the data after it as
+    its `unused_data`.
+
+    Args:
+        compression (str):
+            Compression, as returned by `jsonl_compression`.
+
+    Returns:
+        Decompressor object, with `decompress`, `eof` and `unused_data`.
+    """
+    if compression == "gzip":
+        return zlib.decompressobj(wbits=31)
+    return _zstandard().ZstdDecompressor().decompressobj()
+
+
+def init_jsonl(file_name: Union[str, PurePath]) -> None:
     """Initializes jsonl file.
 
     The function is used in the DataSetBuilder class to initialize
-    the dataset file, if it does not already exist.
+    the dataset file, if it does not already exist. An empty file is also a valid
+    compressed file, holding no frames.
 
     Args:
-        file_name (str):
+        file_name (str or Path):
             File name to initialize.
     """
     with open(file_name, "w") as _:
         pass
 
 
-def append_jsonl(data: list, file_name: str, keys_to_str: list = []) -> None:
+def append_jsonl(data: list, file_name: Union[str, PurePath]) -> None:
     """Appends data to jsonl file.
 
+    The records are serialised up front and appended with a single buffered write.
+    The records are not modified. The records of a compressed file are appended as
+    a new frame, which is why a compressed file should be appended to in batches,
+    such as a page at a time.
+
     Args:
         data (list):
             Data to append.
-        file_name (str):
-            The name of the JSONL file where the data should be appended.
-        keys_to_str (list):
-            List of keys to convert to string (for example PosixPath objects)
+        file_name (str or Path):
+            The name of the JSONL file where the data should be appended, which is
+            compressed if it ends with `.jsonl.gz` or `.jsonl.zst`.
     """
+    payload = dumps_jsonl(data)
+    if not payload:
+        return
+    with open(file_name, "ab", buffering=WRITE_BUFFER_SIZE) as f:
+        f.write(_compress(payload, jsonl_compression(file_name)))
+
+
+def write_jsonl(data: Iterable[dict], file_name: Union[str, PurePath]) -> None:
+    """Writes data to jsonl file, replacing any existing content.
 
-    with jsonlines.open(file_name, mode="a") as writer:
+    The records are written in batches of about `WRITE_BUFFER_SIZE` bytes, each of
+    which is a frame of a compressed file.
+
+    Args:
+        data (iterable of dict):
+            Data to write.
+        file_name (str or Path):
+            The name of the JSONL file to write, which is compressed if it ends with
+            `.jsonl.gz` or `.jsonl.zst`.
+    """
+    compression = jsonl_compression(file_name)
+    with open(file_name, "wb", buffering=WRITE_BUFFER_SIZE) as f:
+        batch: List[bytes] = []
+        batch_size = 0
         for d in data:
-            for key in keys_to_str:
-                d[key] = str(d[key])
-            writer.write(d)
+            line = dumps_jsonl([d])
+            batch.append(line)
+            batch_size += len(line)
+            if batch_size >= WRITE_BUFFER_SIZE:
+                f.write(_compress(b"".join(batch), compression))
+                batch, batch_size = [], 0
+        if batch:
+            f.write(_compress(b"".join(batch), compression))
+
+
+def iter_jsonl(file_name: Union[str, PurePath]) -> Iterator[dict]:
+    """Iterates over the records of a jsonl file, without loading the whole file.
+
+    Compressed files are decompressed while they are read.
+
+    Args:
+        file_name (str or Path):
+            File name to read.
+
+    Yields:
+        dict:
+            Record from file.
+    """
+    with _open_jsonl_reader(file_name) as f:
+        for line in f:
+            if line.strip():
+                yield loads_json(line)
+
+
+def iter_jsonl_frames(
+    file_name: Union[str, PurePath]
+) -> Iterator[Tuple[int, List[dict]]]:
+    """Iterates over the complete frames of a jsonl file.
+
+    A frame of an uncompressed file is a line, and a frame of a compressed file is a
+    batch of records appended together. The iteration stops at the first frame that
+    is truncated or invalid, such as one that was being written during a crash.
 
+    Args:
+        file_name (str or Path):
+            File name to read.
+
+    Yields:
+        pair of int and list of dict:
+            Offset in bytes of the end of the frame in the file, and the records of
+            the frame.
+    """
+    compression = jsonl_compression(file_name)
+    with open(file_name, "rb") as f:
+        if compression is None:
+            offset = 0
+            for line in f:
+                if not line.endswith(b"\n"):
+                    return
+                try:
+                    record = loads_json(line)
+                except ValueError:
+                    return
+                offset += len(line)
+                yield offset, [record]
+            return
 
-def load_jsonl(file_name: str) -> List[dict]:
+        errors: Tuple[Type[Exception], ...] = (
+            (zlib.error,) if compression == "gzip" else (_zstandard().ZstdError,)
+        )
+
+        # Every frame is decompressed by a new decompressor, which stops at the end
+        # of the frame and keeps the data after it as unused data.
+        start = 0
+        n_consumed = 0
+        decompressor = _new_decompressor(compression)
+        content: List[bytes] = []
+        chunk = b""
+        while True:
+            chunk = chunk or f.read(READ_BUFFER_SIZE)
+            if not chunk:
+                return
+            try:
+                content.append(decompressor.decompress(chunk))
+            except errors:
+                return
+            if not decompressor.eof:
+                n_consumed += len(chunk)
+                chunk = b""
+                continue
+
+            end = start + n_consumed + len(chunk) - len(decompressor.unused_data)
+            chunk = decompressor.unused_data
+            try:
+                records = [
+                    loads_json(line)
+                    for line in b"".join(content).splitlines()
+                    if line.strip()
+                ]
+            except ValueError:
+                return
+            yield end, records
+            start, n_consumed, content = end, 0, []
+            decompressor = _new_decompressor(compression)
+
+
+def load_jsonl(file_name: Union[str, PurePath]) -> List[dict]:
     """Loads jsonl file.
 
     Args:
-        file_name (str):
+        file_name (str or Path):
             File name to load.
 
     Returns:
@@ -51,15 +391,11 @@ def load_jsonl(file_name: str) -> List[dict]:
             Data from file.
 
     """
-    dataset = []
-    with jsonlines.open(file_name, mode="r") as reader:
-        for obj in reader:
-            dataset.append(obj)
-    return dataset
+    return list(iter_jsonl(file_name))
 
 
-def html_to_text(html: str) -> str:
-    """Converts html to text.
+def soup_html_to_text(html: str) -> str:
+    """Converts html to text by building a BeautifulSoup tree.
 
     Args:
         html (str):
@@ -73,3 +409,28 @@ def html_to_text(html: str) -> str:
     soup = BeautifulSoup(html, "html.parser")
     text = soup.get_text(separator=" ", strip=True)
     return text
+
+
+# Functions converting html to text, keyed by the name used in the config
+HTML_TO_TEXT_BACKENDS: Dict[str, Callable[[str], str]] = {
+    "bs4": soup_html_to_text,
+    "stream": stream_html_to_text,
+}
+
+
+def html_to_text(html: str, backend: str = "bs4") -> str:
+    """Converts html to text.
+
+    Args:
+        html (str):
+            Html to convert.
+        backend (str):
+            Backend used for the conversion, either "bs4", which builds a
+            BeautifulSoup tree, or "stream", which gives the same text with a
+            streaming tokenizer and is several times faster. Defaults to "bs4".
+
+    Returns:
+        str:
+            Text from html.
+    """
+    return HTML_TO_TEXT_BACKENDS[backend](html)
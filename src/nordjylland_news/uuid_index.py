@@ -0,0 +1,158 @@
+"""Persistent index of the uuids in a dataset file."""
+
+import sqlite3
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Union
+
+from .utils import iter_jsonl
+
+
+class UUIDIndex:
+    """SQLite sidecar holding the uuids of the records in a JSONL dataset file.
+
+    The index is updated every time a page is appended to the dataset file, so the
+    dataset builders can find the uuids that have been seen without reading the
+    dataset file. Next to the uuids, the index records the number of records it
+    covers and the last page added, so it can be checked against the checkpoint of
+    the dataset, and rebuilt from the dataset file when they disagree.
+
+    Args:
+        path (str or Path):
+            Path to the SQLite database, or ":memory:" for an index that is not
+            persisted.
+
+    Attributes:
+        path (str or Path):
+            Path to the SQLite database.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = path
+        self._connection = sqlite3.connect(str(path))
+        with self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS uuids (uuid TEXT PRIMARY KEY) WITHOUT ROWID"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)"
+            )
+
+    def __contains__(self, uuid: str) -> bool:
+        row = self._connection.execute(
+            "SELECT 1 FROM uuids WHERE uuid = ?", (uuid,)
+        ).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM uuids").fetchone()[0]
+
+    def uuids(self) -> Iterator[str]:
+        """Iterates over the uuids in the index.
+
+        Yields:
+            str:
+                Uuid.
+        """
+        for (uuid,) in self._connection.execute("SELECT uuid FROM uuids"):
+            yield uuid
+
+    @property
+    def n_records(self) -> int:
+        """Gets the number of records of the dataset file the index covers.
+
+        Returns:
+            int:
+                Number of records.
+        """
+        return self._get_meta("n_records") or 0
+
+    @property
+    def last_page(self) -> Optional[int]:
+        """Gets the last page added to the index.
+
+        Returns:
+            int or None:
+                The last page, or None if no page has been added.
+        """
+        return self._get_meta("last_page")
+
+    def add_page(self, page: int, uuids: Iterable[str], n_new_records: int) -> None:
+        """Adds the uuids of a page that has been appended to the dataset file.
+
+        Args:
+            page (int):
+                Page number.
+            uuids (iterable of str):
+                Uuids of the records of the page.
+            n_new_records (int):
+                Number of records appended for the page.
+        """
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO uuids VALUES (?)", ((uuid,) for uuid in uuids)
+            )
+            self._set_meta("n_records", self.n_records + n_new_records)
+            self._set_meta("last_page", page)
+
+    def rebuild(self, data_path: Union[str, Path], n_records: int) -> None:
+        """Rebuilds the index from the first records of a dataset file.
+
+        The dataset file is streamed, so it is never held in memory.
+
+        Args:
+            data_path (str or Path):
+                Path to the dataset file.
+            n_records (int):
+                Number of records to index.
+        """
+        with self._connection:
+            self._connection.execute("DELETE FROM uuids")
+            self._connection.execute("DELETE FROM meta")
+            if n_records == 0:
+                return
+
+            last_page = None
+            n_indexed = 0
+            for record in islice(iter_jsonl(data_path), n_records):
+                self._connection.execute(
+                    "INSERT OR IGNORE INTO uuids VALUES (?)", (record["uuid"],)
+                )
+                last_page = record["page"]
+                n_indexed += 1
+            self._set_meta("n_records", n_indexed)
+            self._set_meta("last_page", last_page)
+
+    def close(self) -> None:
+        """Closes the database connection."""
+        self._connection.close()
+
+    def _get_meta(self, key: str) -> Optional[int]:
+        """Gets a value from the meta table.
+
+        Args:
+            key (str):
+                Key of the value.
+
+        Returns:
+            int or None:
+                The value, or None if it has not been set.
+        """
+        row = self._connection.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def _set_meta(self, key: str, value: Optional[int]) -> None:
+        """Sets a value in the meta table.
+
+        Args:
+            key (str):
+                Key of the value.
+            value (int or None):
+                The value.
+        """
+        self._connection.execute(
+            "INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value)
+        )
@@ -0,0 +1,280 @@
+"""Memory efficient set of uuids."""
+
+import bisect
+import math
+import re
+import uuid as uuid_lib
+from typing import Iterable, Iterator, List, Optional, Set
+
+from omegaconf import DictConfig
+
+# Canonical form of a uuid, which is stored as 16 bytes
+UUID_PATTERN = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+)
+
+# Number of bytes of a uuid
+UUID_SIZE = 16
+
+
+class _SortedRecords:
+    """Sequence view of the 16 byte records of a sorted bytearray, for `bisect`.
+
+    Args:
+        data (bytearray):
+            Concatenated records.
+    """
+
+    def __init__(self, data: bytearray) -> None:
+        self.data = data
+
+    def __len__(self) -> int:
+        return len(self.data) // UUID_SIZE
+
+    def __getitem__(self, i: int) -> bytes:
+        return bytes(self.data[i * UUID_SIZE : (i + 1) * UUID_SIZE])
+
+
+class BloomFilter:
+    """Bloom filter over byte strings, answering "maybe" or "definitely not".
+
+    Args:
+        capacity (int):
+            Number of items the filter is sized for.
+        false_positive_rate (float):
+            False positive rate when the filter holds `capacity` items.
+
+    Attributes:
+        capacity (int):
+            Number of items the filter is sized for.
+        false_positive_rate (float):
+            False positive rate when the filter holds `capacity` items.
+        n_bits (int):
+            Number of bits of the filter.
+        n_hashes (int):
+            Number of bits set for each item.
+    """
+
+    def __init__(self, capacity: int, false_positive_rate: float) -> None:
+        self.capacity = max(capacity, 1)
+        self.false_positive_rate = false_positive_rate
+        self.n_bits = math.ceil(
+            -self.capacity * math.log(false_positive_rate) / math.log(2) ** 2
+        )
+        self.n_hashes = max(1, round(self.n_bits / self.capacity * math.log(2)))
+        self._bits = bytearray((self.n_bits + 7) // 8)
+
+    def _positions(self, item: bytes) -> List[int]:
+        """Computes the bit positions of an item, by double hashing.
+
+        The filter only lives in memory, so Python's own (salted) hash is used.
+
+        Args:
+            item (bytes):
+                Item.
+
+        Returns:
+            list of int:
+                Bit positions.
+        """
+        h1 = hash(item)
+        h2 = hash(item + b"\x00") | 1
+        return [(h1 + i * h2) % self.n_bits for i in range(self.n_hashes)]
+
+    def add(self, item: bytes) -> None:
+        """Adds an item to the filter.
+
+        Args:
+            item (bytes):
+                Item.
+        """
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: bytes) -> bool:
+        for position in self._positions(item):
+            if not self._bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class CompactUUIDSet:
+    """Set of uuid strings, storing each uuid in 16 bytes.
+
+    A drop-in replacement for a `set` of uuid strings, supporting `in`, `add`,
+    `len` and iteration. Uuids in canonical form are stored as 16 byte records in a
+    sorted bytearray and looked up by binary search. New uuids are kept in a small
+    pending set, which is merged into the sorted array once it holds
+    `merge_threshold` uuids. Strings that are not canonical uuids are kept in a
+    plain set. An optional Bloom filter answers most lookups of unseen uuids
+    without a binary search.
+
+    Args:
+        uuids (iterable of str):
+            Initial uuids. Defaults to no uuids.
+        merge_threshold (int):
+            Number of pending uuids after which they are merged into the sorted
+            array. Defaults to 4096.
+        bloom_false_positive_rate (float, optional):
+            False positive rate of the Bloom filter in front of the set, or None to
+            not use a Bloom filter. Defaults to None.
+
+    Attributes:
+        merge_threshold (int):
+            Number of pending uuids after which they are merged into the sorted
+            array.
+        bloom_false_positive_rate (float or None):
+            False positive rate of the Bloom filter in front of the set.
+
+    Examples:
+        >>> uuids = CompactUUIDSet(["4b1f3a7e-93f4-4a55-8c43-1d3a0c1f9e2b"])
+        >>> uuids.add("not-a-uuid")
+        >>> "4b1f3a7e-93f4-4a55-8c43-1d3a0c1f9e2b" in uuids, "not-a-uuid" in uuids
+        (True, True)
+        >>> "00000000-0000-0000-0000-000000000000" in uuids, len(uuids)
+        (False, 2)
+    """
+
+    def __init__(
+        self,
+        uuids: Iterable[str] = (),
+        merge_threshold: int = 4096,
+        bloom_false_positive_rate: Optional[float] = None,
+    ) -> None:
+        self.merge_threshold = merge_threshold
+        self.bloom_false_positive_rate = bloom_false_positive_rate
+        self._sorted = bytearray()
+        self._pending: Set[bytes] = set()
+        self._other: Set[str] = set()
+        self._bloom: Optional[BloomFilter] = None
+
+        for uuid in uuids:
+            key = self._to_key(uuid)
+            if key is None:
+                self._other.add(uuid)
+            else:
+                self._pending.add(key)
+        self._merge()
+
+    @staticmethod
+    def _to_key(uuid: str) -> Optional[bytes]:
+        """Converts a uuid to its 16 byte form.
+
+        Args:
+            uuid (str):
+                Uuid.
+
+        Returns:
+            bytes or None:
+                The uuid as 16 bytes, or None if it is not a canonical uuid.
+        """
+        if len(uuid) != 36 or UUID_PATTERN.fullmatch(uuid) is None:
+            return None
+        return bytes.fromhex(uuid.replace("-", ""))
+
+    def __contains__(self, uuid: object) -> bool:
+        if not isinstance(uuid, str):
+            return False
+        key = self._to_key(uuid)
+        if key is None:
+            return uuid in self._other
+        if key in self._pending:
+            return True
+        if self._bloom is not None and key not in self._bloom:
+            return False
+        return self._in_sorted(key)
+
+    def _in_sorted(self, key: bytes) -> bool:
+        """Checks whether a key is in the sorted array.
+
+        Args:
+            key (bytes):
+                Uuid as 16 bytes.
+
+        Returns:
+            bool:
+                True if the key is in the sorted array, False otherwise.
+        """
+        records = _SortedRecords(self._sorted)
+        i = bisect.bisect_left(records, key)
+        return i < len(records) and records[i] == key
+
+    def add(self, uuid: str) -> None:
+        """Adds a uuid to the set.
+
+        Args:
+            uuid (str):
+                Uuid.
+        """
+        key = self._to_key(uuid)
+        if key is None:
+            self._other.add(uuid)
+        elif key not in self._pending and not self._in_sorted(key):
+            self._pending.add(key)
+            if self._bloom is not None:
+                self._bloom.add(key)
+            if len(self._pending) >= self.merge_threshold:
+                self._merge()
+
+    def _merge(self) -> None:
+        """Merges the pending uuids into the sorted array."""
+        if self._pending:
+            # Copy the runs of the sorted array between the insertion points of the
+            # sorted pending uuids.
+            records = _SortedRecords(self._sorted)
+            merged = bytearray()
+            start = 0
+            for key in sorted(self._pending):
+                end = bisect.bisect_left(records, key)
+                merged += self._sorted[start * UUID_SIZE : end * UUID_SIZE]
+                merged += key
+                start = end
+            merged += self._sorted[start * UUID_SIZE :]
+            self._sorted = merged
+            self._pending = set()
+
+        # Resize the Bloom filter when it holds more uuids than it was sized for.
+        n_keys = len(self._sorted) // UUID_SIZE
+        if self.bloom_false_positive_rate is not None and (
+            self._bloom is None or n_keys > self._bloom.capacity
+        ):
+            self._bloom = BloomFilter(
+                capacity=max(2 * n_keys, self.merge_threshold),
+                false_positive_rate=self.bloom_false_positive_rate,
+            )
+            records = _SortedRecords(self._sorted)
+            for i in range(len(records)):
+                self._bloom.add(records[i])
+
+    def __len__(self) -> int:
+        return len(self._sorted) // UUID_SIZE + len(self._pending) + len(self._other)
+
+    def __iter__(self) -> Iterator[str]:
+        records = _SortedRecords(self._sorted)
+        for i in range(len(records)):
+            yield str(uuid_lib.UUID(bytes=records[i]))
+        for key in self._pending:
+            yield str(uuid_lib.UUID(bytes=key))
+        yield from self._other
+
+
+def build_uuid_set(cfg: DictConfig, uuids: Iterable[str]) -> CompactUUIDSet:
+    """Builds the set of seen uuids from the config.
+
+    Args:
+        cfg (DictConfig):
+            The `seen_uuids` section of the Hydra config.
+        uuids (iterable of str):
+            Initial uuids.
+
+    Returns:
+        CompactUUIDSet:
+            The set of seen uuids.
+    """
+    return CompactUUIDSet(
+        uuids,
+        merge_threshold=cfg["merge_threshold"],
+        bloom_false_positive_rate=(
+            cfg["bloom_false_positive_rate"] if cfg["bloom_filter"] else None
+        ),
+    )
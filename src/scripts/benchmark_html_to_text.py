@@ -0,0 +1,64 @@
+"""Script that compares the speed and output of the html to text backends.
+
+The html of the text blocks of the articles on the first pages of the API is
+converted to text with every backend, and the best time of each backend is logged
+together with the number of text blocks where the backends disagree.
+
+Usage:
+    >>> python src/scripts/benchmark_html_to_text.py
+
+    Benchmark on more pages with:
+    >>> python src/scripts/benchmark_html_to_text.py html_benchmark.n_pages=20
+"""
+
+import logging
+import timeit
+from typing import List
+
+import hydra
+from omegaconf import DictConfig
+
+from nordjylland_news.summary_dataset import SummaryDataSetBuilder
+from nordjylland_news.utils import HTML_TO_TEXT_BACKENDS
+
+
+@hydra.main(config_path="../../config", config_name="config.yaml")
+def main(cfg: DictConfig) -> None:
+    logger = logging.getLogger("benchmark")
+    builder = SummaryDataSetBuilder(cfg=cfg)
+
+    html_blocks: List[str] = []
+    for page in range(1, cfg["html_benchmark"]["n_pages"] + 1):
+        for article in builder.get_page_with_articles(page) or []:
+            html_blocks.extend(
+                content["content"]["html"]
+                for content in article["content"]
+                if content["type"] == "Text"
+            )
+    logger.info(f"Benchmarking on {len(html_blocks)} text blocks")
+
+    texts = {}
+    timings = {}
+    for backend, html_to_text in HTML_TO_TEXT_BACKENDS.items():
+        texts[backend] = [html_to_text(html) for html in html_blocks]
+        timer = timeit.Timer(lambda: [html_to_text(html) for html in html_blocks])
+        timings[backend] = min(
+            timer.repeat(repeat=cfg["html_benchmark"]["repeat"], number=1)
+        )
+
+    for backend, timing in timings.items():
+        logger.info(
+            f"{backend}: {timing:.3f}s "
+            f"({timings['bs4'] / timing:.1f}x the speed of bs4)"
+        )
+
+    n_mismatches = sum(
+        text != reference
+        for backend_texts in texts.values()
+        for text, reference in zip(backend_texts, texts["bs4"])
+    )
+    logger.info(f"Text blocks where the backends disagree: {n_mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Script that compares the memory use and lookup speed of the seen uuid sets.
+
+A plain `set` of uuid strings and a `CompactUUIDSet` configured as in the
+`seen_uuids` section of the config are filled with the same random uuids, and
+their memory use and lookup times are logged.
+
+Usage:
+    >>> python src/scripts/benchmark_uuid_set.py
+
+    Benchmark with more uuids and a Bloom filter with:
+    >>> python src/scripts/benchmark_uuid_set.py uuid_benchmark.n_uuids=1000000 \
+            seen_uuids.bloom_filter=True
+"""
+
+import logging
+import time
+import tracemalloc
+import uuid
+from typing import Callable, Container, List
+
+import hydra
+from omegaconf import DictConfig
+
+from nordjylland_news.uuid_set import build_uuid_set
+
+
+def measure(build: Callable[[], Container[str]], lookups: List[str]) -> dict:
+    """Measures the memory use and lookup time of a uuid set.
+
+    Args:
+        build (callable):
+            Function building the uuid set.
+        lookups (list of str):
+            Uuids to look up.
+
+    Returns:
+        dict:
+            Memory use in bytes, and the mean lookup time in microseconds.
+    """
+    tracemalloc.start()
+    uuids = build()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for uuid_str in lookups:
+        uuid_str in uuids
+    lookup_time = (time.perf_counter() - start) / len(lookups) * 1e6
+    return {"memory": memory, "lookup_time": lookup_time}
+
+
+@hydra.main(config_path="../../config", config_name="config.yaml")
+def main(cfg: DictConfig) -> None:
+    logger = logging.getLogger("benchmark")
+    n_uuids = cfg["uuid_benchmark"]["n_uuids"]
+
+    # The uuid strings are created by `build`, so they count towards its memory.
+    def uuid_strings():
+        return (str(uuid.UUID(int=i * 7919 + 1)) for i in range(n_uuids))
+
+    # Half of the lookups are seen uuids, and half are new.
+    lookups = [str(uuid.uuid4()) for _ in range(10_000)]
+    lookups += [str(uuid.UUID(int=i * 7919 + 1)) for i in range(0, n_uuids, 10)][
+        :10_000
+    ]
+
+    results = {
+        "set": measure(lambda: set(uuid_strings()), lookups),
+        "CompactUUIDSet": measure(
+            lambda: build_uuid_set(cfg["seen_uuids"], uuid_strings()), lookups
+        ),
+    }
+    for name, result in results.items():
+        logger.info(
+            f"{name}: {result['memory'] / 2**20:.1f} MiB "
+            f"({result['memory'] / n_uuids:.0f} bytes per uuid), "
+            f"{result['lookup_time']:.2f} µs per lookup"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""Script that builds the summarisation and image caption datasets in a single pass.
+
+Every page of articles is only fetched once, and used for both datasets.
+
+Usage:
+    >>> python src/scripts/build_combined_dataset.py
+
+    Fetch several pages at a time with:
+    >>> python src/scripts/build_combined_dataset.py crawler.asynchronous=True
+
+    Only fetch articles published since the last run with:
+    >>> python src/scripts/build_combined_dataset.py crawler.incremental=True
+"""
+
+import hydra
+from omegaconf import DictConfig
+
+from nordjylland_news.combined_dataset import CombinedDataSetBuilder
+from nordjylland_news.image_caption_dataset import ImageCaptionDataSetBuilder
+from nordjylland_news.summary_dataset import SummaryDataSetBuilder
+
+
+@hydra.main(config_path="../../config", config_name="config.yaml")
+def main(cfg: DictConfig) -> None:
+    builder = CombinedDataSetBuilder(
+        cfg=cfg,
+        builders=[SummaryDataSetBuilder(cfg=cfg), ImageCaptionDataSetBuilder(cfg=cfg)],
+    )
+    builder.build_dataset()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,12 @@
 
 Usage:
     >>> python src/scripts/build_image_caption_dataset.py
+
+    Fetch several pages at a time with:
+    >>> python src/scripts/build_image_caption_dataset.py crawler.asynchronous=True
+
+    Only fetch articles published since the last run with:
+    >>> python src/scripts/build_image_caption_dataset.py crawler.incremental=True
 """
 
 import hydra
@@ -0,0 +1,22 @@
+"""Script that packs the processed image caption dataset into tar shards.
+
+Usage:
+    >>> python src/scripts/build_image_shards.py
+
+    Change the size of the shards with:
+    >>> python src/scripts/build_image_shards.py image_shards.max_shard_size=1073741824
+"""
+
+import hydra
+from omegaconf import DictConfig
+
+from nordjylland_news.shards import build_image_shards
+
+
+@hydra.main(config_path="../../config", config_name="config.yaml")
+def main(cfg: DictConfig) -> None:
+    build_image_shards(cfg=cfg)
+
+
+if __name__ == "__main__":
+    main()
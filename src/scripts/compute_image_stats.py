@@ -0,0 +1,22 @@
+"""Script that writes the size statistics table of the processed images.
+
+Usage:
+    >>> python src/scripts/compute_image_stats.py
+
+    Scan another folder of processed images, with a `metadata.jsonl` file, with:
+    >>> python src/scripts/compute_image_stats.py image_stats.folder=data/processed/images/train
+"""
+
+import hydra
+from omegaconf import DictConfig
+
+from nordjylland_news.image_stats import build_image_stats
+
+
+@hydra.main(config_path="../../config", config_name="config.yaml")
+def main(cfg: DictConfig) -> None:
+    build_image_stats(cfg=cfg)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""Script that resizes and re-encodes the images of the image caption dataset.
+
+Usage:
+    >>> python src/scripts/process_image_caption_dataset.py
+
+    Change the size and format of the processed images with:
+    >>> python src/scripts/process_image_caption_dataset.py \
+            image_processing.max_side=768 image_processing.format=WEBP
+"""
+
+import hydra
+from omegaconf import DictConfig
+
+from nordjylland_news.image_processing import process_image_dataset
+
+
+@hydra.main(config_path="../../config", config_name="config.yaml")
+def main(cfg: DictConfig) -> None:
+    process_image_dataset(cfg=cfg)
+
+
+if __name__ == "__main__":
+    main()
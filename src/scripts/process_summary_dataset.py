@@ -0,0 +1,23 @@
+"""Script that filters, deduplicates and splits the summarisation dataset.
+
+Usage:
+    >>> python src/scripts/process_summary_dataset.py
+
+    Change the filters and the split sizes with:
+    >>> python src/scripts/process_summary_dataset.py \
+            processing.min_length=20 processing.val_fraction=0.1
+"""
+
+import hydra
+from omegaconf import DictConfig
+
+from nordjylland_news.processing import process_summary_dataset
+
+
+@hydra.main(config_path="../../config", config_name="config.yaml")
+def main(cfg: DictConfig) -> None:
+    process_summary_dataset(cfg=cfg)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,26 +7,24 @@ Usage:
 
 from datasets import load_dataset
 
-# Number of samples for each split are from notebooks/process_summary_data.ipynb
-TRAIN_LENGTH = 75219
-VAL_LENGTH = 4178
-TEST_LENGTH = 4178
+from nordjylland_news.processing import load_split_manifest
 
 DATASET_FOLDER_PATH = "/mnt/data_6tb/oliver/NordjyllandNews/data/processed/summary"
 DATASET_HF_PATH = "alexandrainst/nordjylland-news-summarization"
 
 
 def main() -> None:
-    data_files = dict(
-        train=DATASET_FOLDER_PATH + "/train.jsonl",
-        val=DATASET_FOLDER_PATH + "/val.jsonl",
-        test=DATASET_FOLDER_PATH + "/test.jsonl",
-    )
+    # Number of samples for each split are from src/scripts/process_summary_dataset.py
+    manifest = load_split_manifest(DATASET_FOLDER_PATH)
+
+    data_files = {
+        split: DATASET_FOLDER_PATH + "/" + split_info["file_name"]
+        for split, split_info in manifest["splits"].items()
+    }
     dataset = load_dataset("json", data_files=data_files)
 
-    assert len(dataset["train"]) == 75219
-    assert len(dataset["val"]) == 4178
-    assert len(dataset["test"]) == 4178
+    for split, split_info in manifest["splits"].items():
+        assert len(dataset[split]) == split_info["n_records"]
 
     dataset.push_to_hub(DATASET_HF_PATH, private=False)
 
@@ -0,0 +1,83 @@
+"""Unit tests for the `async_crawler` module."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from nordjylland_news.async_crawler import crawl_pages_async
+
+
+@pytest.mark.parametrize("max_in_flight", [1, 3, 8])
+def test_crawl_pages_async_handles_pages_in_order(max_in_flight):
+    last_page = 10
+    lock = threading.Lock()
+    in_flight = 0
+    max_seen_in_flight = 0
+    handled_pages = []
+
+    def fetch_page(page):
+        nonlocal in_flight, max_seen_in_flight
+        with lock:
+            in_flight += 1
+            max_seen_in_flight = max(max_seen_in_flight, in_flight)
+
+        # Later pages finish first, to check that the order is restored.
+        time.sleep(0.01 * (page % 3))
+
+        with lock:
+            in_flight -= 1
+        return [{"uuid": str(page)}] if page <= last_page else []
+
+    def handle_page(page, articles):
+        if not articles:
+            return False
+        handled_pages.append(page)
+        return True
+
+    stopped_at = asyncio.run(
+        crawl_pages_async(
+            fetch_page=fetch_page,
+            handle_page=handle_page,
+            start_page=1,
+            max_in_flight=max_in_flight,
+        )
+    )
+
+    assert handled_pages == list(range(1, last_page + 1))
+    assert stopped_at == last_page + 1
+    assert max_seen_in_flight <= max_in_flight
+
+
+def test_crawl_pages_async_waits_for_fetches_in_flight():
+    lock = threading.Lock()
+    running = 0
+    finished_after_return = []
+    returned = threading.Event()
+
+    def fetch_page(page):
+        nonlocal running
+        with lock:
+            running += 1
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+        if returned.is_set():
+            finished_after_return.append(page)
+        return [{"uuid": str(page)}]
+
+    stopped_at = asyncio.run(
+        crawl_pages_async(
+            fetch_page=fetch_page,
+            handle_page=lambda page, articles: page < 2,
+            start_page=1,
+            max_in_flight=4,
+        )
+    )
+    returned.set()
+
+    assert stopped_at == 2
+    assert running == 0
+    time.sleep(0.1)
+    assert finished_after_return == []
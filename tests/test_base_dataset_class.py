@@ -0,0 +1,103 @@
+"""Unit tests for the `base_dataset_class` module."""
+
+import copy
+
+import pytest
+import requests
+
+from nordjylland_news.retry import RetryPolicy
+from nordjylland_news.summary_dataset import SummaryDataSetBuilder
+
+
+class FakeResponse:
+    """Response with a fixed status code, recording whether it was closed."""
+
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeTransport:
+    """Transport returning given responses, or raising given errors, in order."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.closed = False
+
+    def get(self, url, timeout, headers=None, stream=False):
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def builder(config):
+    cfg = copy.deepcopy(config)
+    # Nothing listens on the discard port, so the builder does not reach the API.
+    cfg["api_info"]["url"] = "http://127.0.0.1:9/v1/articles"
+    cfg["retry"]["policies"]["RequestException"]["max_attempts"] = 1
+    builder = SummaryDataSetBuilder(cfg)
+
+    # Retry quickly in the tests.
+    builder.retry_policies = {
+        name: RetryPolicy(max_attempts=3, base_delay=0.01, max_delay=0.01)
+        for name in builder.retry_policies
+    }
+    yield builder
+    builder.transport.close()
+
+
+def test_transport_errors_do_not_throttle(builder):
+    rate = builder.rate_limiter.state["rate"]
+    builder.transport = FakeTransport([requests.ConnectionError("reset")] * 3)
+
+    response = builder.send_request("https://example.com/article")
+
+    assert not response.status_code
+    assert builder.rate_limiter.state["rate"] == rate
+    assert builder.rate_limiter.state["n_throttled"] == 0
+
+
+def test_error_responses_are_closed(builder):
+    responses = [FakeResponse(500), FakeResponse(404), FakeResponse(200)]
+    builder.transport = FakeTransport(responses)
+
+    response = builder.send_request("https://example.com/article")
+
+    assert response is responses[-1]
+    assert [response.closed for response in responses] == [True, True, False]
+
+
+@pytest.mark.parametrize("owns_transport", [True, False])
+def test_finish_crawl_closes_transport(builder, owns_transport):
+    builder.transport.close()
+    builder.transport = FakeTransport([])
+    builder.owns_transport = owns_transport
+
+    builder.start_crawl()
+    builder.finish_crawl()
+
+    assert builder.transport.closed == owns_transport
+
+
+def test_incremental_crawl_stops_on_seen_pages(builder, monkeypatch):
+    monkeypatch.setattr(builder, "write_page", lambda new_data: None)
+    builder.incremental = True
+    builder.stop_after_seen_pages = 2
+    builder.seen_uuids.add("00000000-0000-0000-0000-000000000001")
+    seen_page = [{"uuid": "00000000-0000-0000-0000-000000000001", "summary": "A."}]
+    # New articles without a summary give no new data, but have not been seen.
+    new_page = [{"uuid": "00000000-0000-0000-0000-000000000002", "summary": None}]
+
+    assert builder.handle_page(1, new_page)
+    assert builder.handle_page(2, new_page)
+    assert builder.handle_page(3, seen_page)
+    assert not builder.handle_page(4, seen_page)
@@ -0,0 +1,104 @@
+"""Unit tests for the `checkpoint` module."""
+
+import json
+
+import pytest
+
+from nordjylland_news.checkpoint import CrawlCheckpoint
+from nordjylland_news.utils import append_jsonl
+
+
+@pytest.fixture
+def data_path(tmp_path):
+    return tmp_path / "dataset.jsonl"
+
+
+@pytest.fixture
+def checkpoint_path(tmp_path):
+    return tmp_path / "dataset_checkpoint.json"
+
+
+def append_page(data_path, page, n_records):
+    with open(data_path, "a") as f:
+        for i in range(n_records):
+            f.write(json.dumps({"page": page, "uuid": f"{page}-{i}"}) + "\n")
+
+
+def test_commit_and_load(data_path, checkpoint_path):
+    checkpoint = CrawlCheckpoint(checkpoint_path)
+    for page in [1, 2, 4, 3]:
+        append_page(data_path, page, n_records=2)
+        checkpoint.commit(page=page, data_path=data_path, n_new_records=2)
+
+    loaded = CrawlCheckpoint.load(checkpoint_path)
+    assert loaded.completed_pages == [[1, 4]]
+    assert loaded.last_page == 4
+    assert loaded.n_records == 8
+    assert loaded.offset == data_path.stat().st_size
+    assert not checkpoint_path.with_name(checkpoint_path.name + ".tmp").exists()
+
+
+def test_group_commit(data_path, checkpoint_path):
+    checkpoint = CrawlCheckpoint(checkpoint_path)
+    append_page(data_path, 1, n_records=2)
+    checkpoint.commit(page=1, data_path=data_path, n_new_records=2, durable=False)
+    assert not checkpoint_path.exists()
+
+    append_page(data_path, 2, n_records=3)
+    checkpoint.commit(page=2, data_path=data_path, n_new_records=3, durable=False)
+    checkpoint.persist(data_path)
+
+    loaded = CrawlCheckpoint.load(checkpoint_path)
+    assert loaded.completed_pages == [[1, 2]]
+    assert loaded.n_records == 5
+    assert loaded.offset == data_path.stat().st_size
+
+
+def test_recover_truncates_uncommitted_data(data_path, checkpoint_path):
+    checkpoint = CrawlCheckpoint(checkpoint_path)
+    append_page(data_path, 1, n_records=3)
+    checkpoint.commit(page=1, data_path=data_path, n_new_records=3)
+    committed = data_path.read_bytes()
+
+    # Simulate a crash in the middle of writing page 2.
+    append_page(data_path, 2, n_records=2)
+    with open(data_path, "a") as f:
+        f.write('{"page": 2, "uu')
+
+    loaded = CrawlCheckpoint.load(checkpoint_path)
+    assert loaded.recover(data_path) > 0
+    assert data_path.read_bytes() == committed
+    assert loaded.is_completed(1)
+    assert not loaded.is_completed(2)
+
+
+def test_from_dataset(data_path, checkpoint_path):
+    append_page(data_path, 1, n_records=2)
+    append_page(data_path, 2, n_records=2)
+    complete_size = data_path.stat().st_size
+    with open(data_path, "a") as f:
+        f.write('{"page": 2, "uu')
+
+    checkpoint = CrawlCheckpoint.from_dataset(checkpoint_path, data_path)
+
+    # The last page might be incomplete, so it is crawled again.
+    assert checkpoint.completed_pages == [[1, 1]]
+    assert checkpoint.n_records == 4
+    assert checkpoint.offset == complete_size
+
+
+def test_from_compressed_dataset(tmp_path, checkpoint_path):
+    data_path = tmp_path / "dataset.jsonl.zst"
+    for page in [1, 2, 3]:
+        append_jsonl(
+            [{"page": page, "uuid": f"{page}-{i}"} for i in range(2)], data_path
+        )
+    complete_size = data_path.stat().st_size
+    with open(data_path, "ab") as f:
+        f.write(b"\x28\xb5\x2f\xfd")
+
+    checkpoint = CrawlCheckpoint.from_dataset(checkpoint_path, data_path)
+    assert checkpoint.completed_pages == [[1, 2]]
+    assert checkpoint.n_records == 6
+    assert checkpoint.offset == complete_size
+    assert checkpoint.recover(data_path) == 4
@@ -0,0 +1,37 @@
+"""Unit tests for the `combined_dataset` module."""
+
+from nordjylland_news.combined_dataset import CombinedDataSetBuilder
+
+
+class FakeTransport:
+    def close(self):
+        pass
+
+
+class FakeBuilder:
+    """Builder that is done after a given page."""
+
+    def __init__(self, last_page):
+        self.last_page = last_page
+        self.current_page = 1
+        self.transport = FakeTransport()
+        self.owns_transport = True
+        self.rate_limiter = self.retry_budget = self.circuit_breaker = None
+        self.handled_pages = []
+
+    def handle_page(self, page, articles):
+        self.handled_pages.append(page)
+        return page < self.last_page
+
+
+def test_finished_builders_receive_no_more_pages(config):
+    early, late = FakeBuilder(last_page=2), FakeBuilder(last_page=5)
+    combined = CombinedDataSetBuilder(config, builders=[early, late])
+    assert late.transport is early.transport
+    assert not late.owns_transport
+
+    keep_going = [combined.handle_page(page, []) for page in range(1, 6)]
+
+    assert early.handled_pages == [1, 2]
+    assert late.handled_pages == [1, 2, 3, 4, 5]
+    assert keep_going == [True, True, True, True, False]
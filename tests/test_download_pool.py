@@ -0,0 +1,38 @@
+"""Unit tests for the `download_pool` module."""
+
+import threading
+import time
+
+import pytest
+
+from nordjylland_news.download_pool import DownloadPool
+
+
+@pytest.mark.parametrize("n_workers", [1, 4])
+def test_download_pool(n_workers):
+    lock = threading.Lock()
+    active = 0
+    max_active = 0
+
+    def download(job):
+        nonlocal active, max_active
+        with lock:
+            active += 1
+            max_active = max(max_active, active)
+        time.sleep(0.01)
+        with lock:
+            active -= 1
+        if job == 3:
+            raise ValueError("Download failed")
+        return job * 2
+
+    pool = DownloadPool(download=download, n_workers=n_workers, queue_size=2)
+    futures = [pool.submit(job) for job in range(10)]
+    pool.close()
+
+    assert all(future.done() for future in futures)
+    assert isinstance(futures[3].exception(), ValueError)
+    assert [f.result() for i, f in enumerate(futures) if i != 3] == [
+        job * 2 for job in range(10) if job != 3
+    ]
+    assert max_active <= n_workers
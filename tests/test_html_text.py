@@ -0,0 +1,65 @@
+"""Unit tests for the `html_text` module."""
+
+import random
+
+import pytest
+from bs4 import BeautifulSoup
+
+from nordjylland_news.html_text import stream_html_to_text
+
+# Text blocks in the style of the article html returned by the TV2 Nord API
+ARTICLE_HTML = [
+    "<p>Det var en travl nat for Nordjyllands Politi.</p>",
+    "<p>Opdateres...</p>",
+    "<p>&nbsp;</p>",
+    "",
+    "Tekst uden tags",
+    "<p>Branden brød ud ved 22-tiden i et parcelhus i Aalborg&nbsp;Øst, oplyser "
+    "vagtchef Lars Andersen.</p><p>- Vi fik hurtigt styr på det, siger han.</p>",
+    '<p>Læs også: <a href="https://www.tv2nord.dk/aalborg/artikel?a=1&amp;b=2" '
+    'target="_blank">Storbrand i Aalborg</a></p>',
+    "<h2>Fakta</h2><ul><li>Aalborg&nbsp;Kommune har 220.000 indbyggere</li>"
+    "<li>Det er Danmarks <strong>tredjestørste</strong> kommune</li></ul>",
+    "<p>Kampen endte 2&ndash;1 til AaB, der &quot;fortjent&quot; vandt.</p>",
+    "<p>Tal: 5 &lt; 7 &gt; 3 &amp; 10&#8211;12&#x2019;&aelig;&oslash;&aring;</p>",
+    "<p>Linje et<br>linje to<br/>linje tre</p>",
+    "<p><em>Artiklen er opdateret kl. 14.32</em></p>\n<p></p>",
+    "<blockquote><p>Det er en stor dag for Skagen.</p></blockquote>",
+    '<div class="fact-box"><h3>Sådan gør du</h3><ol><li>Ring 112</li></ol></div>',
+    '<p>Video:</p><script async src="https://example.com/embed.js"></script>',
+    "<p>Se mere</p><style>.x { color: red; }</style><!-- annonce -->",
+    '<figure><img src="https://example.com/billede.jpg" alt="Billede">'
+    "<figcaption>Foto: Henrik Bo</figcaption></figure>",
+    "<p>Temperaturen falder til -5&#176;C i nat.</p>",
+    "<p> Ekstra mellemrum  </p>   <p>  </p>",
+    "<p>Uafsluttet <b>fed tekst",
+    "<table><tr><td>Hold</td><td>Point</td></tr><tr><td>AaB</td><td>42</td></tr>"
+    "</table>",
+]
+
+
+@pytest.mark.parametrize("html", ARTICLE_HTML)
+def test_stream_html_to_text_article_html(html):
+    expected = BeautifulSoup(html, "html.parser").get_text(separator=" ", strip=True)
+    assert stream_html_to_text(html) == expected
+
+
+HTML_PIECES = [
+    "<p>", "</p>", "<b>", "</b>", "<br>", "<br/>", "</br>", "<P CLASS=x>", "<p/>",
+    "<script>", "</script>", "<style>", "</style>", "<template>", "</template>",
+    "<rt>", "</rt>", "<!-- c -->", "<!DOCTYPE html>", "<![CDATA[cd]]>", "<?pi x?>",
+    "&nbsp;", "&amp;", "&ampx", "&unknown;", "&#8211;", "&#x2019;", "&#150;",
+    "&#0;", "&#12ab;", "&aelig;", "&", "<", "x<y", "a > b", " ", "\n", "\xa0",
+    "tekst", "Ærø ", '<a href="https://x.dk?a=1&b=2">', "</a>", "<ul><li>",
+    "</li>", "</ul>", '<img src="x.jpg"/>', "<div>", "</div>",
+]  # fmt: skip
+
+
+def test_stream_html_to_text_random_html():
+    rng = random.Random(4242)
+    for _ in range(2000):
+        html = "".join(rng.choices(HTML_PIECES, k=rng.randint(0, 30)))
+        expected = BeautifulSoup(html, "html.parser").get_text(
+            separator=" ", strip=True
+        )
+        assert stream_html_to_text(html) == expected, html
@@ -1,11 +1,14 @@
 """Unit tests for the `image_caption_dataset` module."""
 
-from pathlib import Path
+import copy
+import hashlib
 
 import pytest
 
 from nordjylland_news.image_caption_dataset import ImageCaptionDataSetBuilder
 
+IMAGE = b"\xff\xd8\xff" + bytes(range(256)) * 4
+
 
 @pytest.fixture(scope="module")
 def image_caption_builder(config):
@@ -119,7 +122,6 @@ def test_article_content_image_keys(article_content, key):
                 "uuid": "456",
                 "download_url": "https://example.com/image.jpg",
                 "caption": "An example image",
-                "file_name": Path("data/raw/images/train/1.jpg"),
             },
         ),
     ],
@@ -157,7 +159,6 @@ def test_get_image_meta_data(image_caption_builder, article, expected_data):
                     "uuid": "456",
                     "download_url": "https://example.com/image.jpg",
                     "caption": "An example image",
-                    "file_name": Path("data/raw/images/train/1.jpg"),
                 }
             ],
         ),
@@ -168,3 +169,105 @@ def test_get_image_data(image_caption_builder, article, expected_data):
     image_caption_builder.get_image_data(article, download_images=False)
 
     assert image_caption_builder.new_data == expected_data
+
+
+class FakeResponse:
+    """Streamed response with a fixed status code and body."""
+
+    def __init__(self, status_code, body, content_length=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = {}
+        if content_length is not None:
+            self.headers["Content-Length"] = str(content_length)
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start : start + chunk_size]
+
+    def close(self):
+        pass
+
+
+class FakeTransport:
+    """Transport returning given responses in order, recording the headers sent."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.sent_headers = []
+
+    def get(self, url, timeout, headers=None, stream=False):
+        self.sent_headers.append(headers)
+        return self.responses.pop(0)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def download_builder(config, tmp_path):
+    cfg = copy.deepcopy(config)
+    # Nothing listens on the discard port, so the builder does not reach the API.
+    cfg["api_info"]["url"] = "http://127.0.0.1:9/v1/articles"
+    cfg["retry"]["policies"]["RequestException"]["max_attempts"] = 1
+    cfg["dirs"]["image_folder"] = str(tmp_path / "images")
+    cfg["n_requests_image"] = 1
+    cfg["image_downloads"]["chunk_size"] = 100
+    builder = ImageCaptionDataSetBuilder(cfg)
+    yield builder
+    builder.transport.close()
+
+
+def download(builder, responses, part=b""):
+    """Downloads the image through a fake transport, with a given `.part` file."""
+    part_path = builder.image_store.part_path("uuid")
+    if part:
+        part_path.parent.mkdir(parents=True, exist_ok=True)
+        part_path.write_bytes(part)
+    builder.transport = FakeTransport(responses)
+    stored = builder.download_image("https://example.com/image.jpg", uuid="uuid")
+    return stored, part_path, builder.transport.sent_headers
+
+
+def test_download_image_resumes_part_file(download_builder):
+    rest = IMAGE[400:]
+    stored, part_path, sent_headers = download(
+        download_builder, [FakeResponse(206, rest, len(rest))], part=IMAGE[:400]
+    )
+    assert sent_headers[0]["Range"] == "bytes=400-"
+    assert stored is not None
+    assert stored[0] == hashlib.sha256(IMAGE).hexdigest()
+    assert stored[1].read_bytes() == IMAGE
+    assert not part_path.exists()
+
+
+def test_download_image_truncates_when_range_is_ignored(download_builder):
+    stored, _, sent_headers = download(
+        download_builder, [FakeResponse(200, IMAGE, len(IMAGE))], part=b"stale"
+    )
+    assert sent_headers[0]["Range"] == "bytes=5-"
+    assert stored is not None
+    assert stored[1].read_bytes() == IMAGE
+
+
+def test_download_image_content_length_mismatch(download_builder):
+    stored, part_path, _ = download(
+        download_builder, [FakeResponse(200, IMAGE[:100], len(IMAGE))]
+    )
+    assert stored is None
+    # A short `.part` file is kept, so the download can be resumed.
+    assert part_path.read_bytes() == IMAGE[:100]
+
+    stored, part_path, _ = download(
+        download_builder, [FakeResponse(200, IMAGE, 100)], part=b""
+    )
+    assert stored is None
+    assert not part_path.exists()
+
+
+def test_download_image_failed_resume_removes_part_file(download_builder):
+    stored, part_path, _ = download(
+        download_builder, [FakeResponse(404, b"")], part=IMAGE[:400]
+    )
+    assert stored is None
+    assert not part_path.exists()
@@ -0,0 +1,43 @@
+"""Unit tests for the `image_hashing` module."""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from nordjylland_news.image_hashing import (
+    dhash,
+    find_image_clusters,
+    hamming_distance,
+    phash,
+)
+
+
+def make_image(seed, size=(320, 240)):
+    rng = np.random.default_rng(seed)
+    blocks = rng.integers(0, 256, size=(6, 8, 3), dtype=np.uint8)
+    return Image.fromarray(blocks).resize(size, Image.Resampling.BILINEAR)
+
+
+@pytest.mark.parametrize("hash_function", [phash, dhash])
+def test_hash_is_robust_to_reencoding_and_resizing(tmp_path, hash_function):
+    image = make_image(seed=0)
+    image.resize((160, 120)).save(tmp_path / "small.jpg", quality=40)
+
+    with Image.open(tmp_path / "small.jpg") as reencoded:
+        near_distance = hamming_distance(hash_function(image), hash_function(reencoded))
+    far_distance = hamming_distance(hash_function(image), hash_function(make_image(1)))
+    assert near_distance <= 6 < far_distance
+
+
+def test_find_image_clusters():
+    images = [make_image(seed) for seed in range(10)]
+    images.append(images[4].crop((4, 3, 316, 237)))
+    images.append(images[7].convert("L").convert("RGB"))
+    hashes = {f"{i}.jpg": phash(image) for i, image in enumerate(images)}
+
+    assert find_image_clusters(hashes, max_distance=6) == {
+        "4.jpg": "4.jpg",
+        "7.jpg": "7.jpg",
+        "10.jpg": "4.jpg",
+        "11.jpg": "7.jpg",
+    }
@@ -0,0 +1,132 @@
+"""Unit tests for the `image_processing` module."""
+
+import copy
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from nordjylland_news import image_processing
+from nordjylland_news.image_processing import process_image, process_image_dataset
+from nordjylland_news.utils import load_jsonl, write_jsonl
+
+
+def test_process_image(tmp_path):
+    src = tmp_path / "raw.jpg"
+    dst = tmp_path / "processed" / "image.jpg"
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Rotated 90 degrees clockwise
+    Image.new("RGB", (400, 200), color="red").save(src, exif=exif)
+
+    assert process_image(src, dst, max_side=100, quality=85, image_format="JPEG")
+    with Image.open(dst) as image:
+        assert image.size == (50, 100)
+        assert not image.getexif()
+    assert list(dst.parent.iterdir()) == [dst]
+
+
+def test_process_image_fails(tmp_path):
+    src = tmp_path / "raw.jpg"
+    src.write_bytes(b"not an image")
+    dst = tmp_path / "image.jpg"
+
+    assert not process_image(src, dst, max_side=100, quality=85, image_format="JPEG")
+    assert not dst.exists()
+    assert list(tmp_path.iterdir()) == [src]
+
+
+@pytest.fixture
+def image_dataset_config(config, tmp_path):
+    """Config of a raw image caption dataset, whose last image is a near-duplicate."""
+    cfg = copy.deepcopy(config)
+    cfg["dirs"]["data"] = str(tmp_path / "data")
+    cfg["dirs"]["image_folder"] = str(tmp_path / "data" / "raw" / "images")
+    cfg["image_processing"]["processed_folder"] = str(tmp_path / "processed")
+    cfg["image_processing"]["n_workers"] = 2
+
+    raw_folder = tmp_path / "data" / "raw" / "images"
+    raw_folder.mkdir(parents=True)
+    rng = np.random.default_rng(0)
+    images = [
+        Image.fromarray(rng.integers(0, 256, size=(6, 8, 3), dtype=np.uint8))
+        for _ in range(3)
+    ]
+    images.append(images[0].copy())
+    raw_data = []
+    for i, image in enumerate(images):
+        image.resize((320, 240), Image.Resampling.BILINEAR).save(
+            raw_folder / f"{i}.jpg", quality=50 if i == 3 else 90
+        )
+        raw_data.append({"file_name": str(raw_folder / f"{i}.jpg"), "caption": f"{i}"})
+    write_jsonl(raw_data, tmp_path / "data" / "raw" / "image_caption.jsonl")
+    return cfg
+
+
+def test_second_run_does_no_work(image_dataset_config, tmp_path, monkeypatch):
+    cfg = image_dataset_config
+    cfg["image_processing"]["near_duplicates"]["mode"] = "drop"
+
+    hashed = []
+
+    def hash_images(paths, **kwargs):
+        hashed.extend(paths)
+        return original_hash_images(paths, **kwargs)
+
+    original_hash_images = image_processing.hash_images
+    monkeypatch.setattr(image_processing, "hash_images", hash_images)
+
+    processed_folder = tmp_path / "processed"
+    duplicates_folder = tmp_path / "processed_near_duplicates"
+    first_counts = process_image_dataset(cfg)
+    assert first_counts["processed"] == 4
+    assert first_counts["near_duplicates"] == 1
+    assert len(hashed) == 4
+    metadata = load_jsonl(processed_folder / "metadata.jsonl")
+    assert [data["caption"] for data in metadata] == ["0", "1", "2"]
+
+    # The processed folder only holds the images in the metadata.
+    assert sorted(path.name for path in processed_folder.iterdir()) == [
+        "0.jpg",
+        "1.jpg",
+        "2.jpg",
+        "metadata.jsonl",
+    ]
+    assert (duplicates_folder / "3.jpg").exists()
+    assert load_jsonl(duplicates_folder / "near_duplicates.jsonl") == [
+        {"file_name": "3.jpg", "kept_file_name": "0.jpg"}
+    ]
+
+    mtimes = {path: path.stat().st_mtime_ns for path in processed_folder.iterdir()}
+    second_counts = process_image_dataset(cfg)
+    assert second_counts == {
+        "processed": 0,
+        "skipped": 4,
+        "failed": 0,
+        "near_duplicates": 1,
+    }
+    assert len(hashed) == 4
+    assert load_jsonl(processed_folder / "metadata.jsonl") == metadata
+    for path, mtime in mtimes.items():
+        if path.suffix == ".jpg":
+            assert path.stat().st_mtime_ns == mtime
+
+
+def test_merge_near_duplicates(image_dataset_config, tmp_path):
+    cfg = image_dataset_config
+    cfg["image_processing"]["near_duplicates"]["mode"] = "merge"
+    process_image_dataset(cfg)
+
+    processed_folder = tmp_path / "processed"
+    assert load_jsonl(processed_folder / "metadata.jsonl") == [
+        {"file_name": "0.jpg", "caption": "0", "captions": ["0", "3"]},
+        {"file_name": "1.jpg", "caption": "1", "captions": ["1"]},
+        {"file_name": "2.jpg", "caption": "2", "captions": ["2"]},
+    ]
+    assert not (processed_folder / "3.jpg").exists()
+
+    # Turning the near-duplicate mode off moves the near-duplicates back.
+    cfg["image_processing"]["near_duplicates"]["mode"] = None
+    counts = process_image_dataset(cfg)
+    assert counts["processed"] == 0
+    assert len(load_jsonl(processed_folder / "metadata.jsonl")) == 4
+    assert (processed_folder / "3.jpg").exists()
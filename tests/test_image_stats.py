@@ -0,0 +1,64 @@
+"""Unit tests for the `image_stats` module."""
+
+import jsonlines
+import pytest
+from PIL import Image
+
+from nordjylland_news.image_stats import (
+    load_image_stats,
+    read_image_size,
+    scan_image_folder,
+    write_image_stats,
+)
+
+
+@pytest.mark.parametrize(
+    "mode,file_name,save_kwargs,channels",
+    [
+        ("RGB", "baseline.jpg", {"exif": Image.Exif()}, 3),
+        ("RGB", "progressive.jpg", {"progressive": True}, 3),
+        ("L", "grey.jpg", {}, 1),
+        ("RGBA", "alpha.png", {}, 4),
+        ("P", "palette.png", {}, 3),
+        ("RGB", "lossy.webp", {}, 3),
+        ("RGBA", "lossless.webp", {"lossless": True}, 4),
+    ],
+)
+def test_read_image_size(tmp_path, mode, file_name, save_kwargs, channels):
+    path = tmp_path / file_name
+    Image.new(mode, (321, 123)).save(path, **save_kwargs)
+    assert read_image_size(path) == (321, 123, channels)
+
+
+def test_read_image_size_unsupported(tmp_path):
+    path = tmp_path / "image.jpg"
+    path.write_bytes(b"\xff\xd8\xff\xe0\x00")
+    with pytest.raises(ValueError):
+        read_image_size(path)
+
+
+def test_scan_image_folder(tmp_path):
+    Image.new("RGB", (40, 30)).save(tmp_path / "a.jpg")
+    (tmp_path / "b.jpg").write_bytes(b"not an image")
+    with jsonlines.open(tmp_path / "metadata.jsonl", mode="w") as writer:
+        writer.write_all(
+            [
+                {"file_name": "a.jpg", "caption": "first"},
+                {"file_name": "a.jpg", "caption": "second"},
+                {"file_name": "b.jpg", "caption": "third"},
+            ]
+        )
+
+    stats = scan_image_folder(tmp_path, n_workers=2)
+    assert stats == [
+        {
+            "file_name": "a.jpg",
+            "width": 40,
+            "height": 30,
+            "channels": 3,
+            "bytes": (tmp_path / "a.jpg").stat().st_size,
+        }
+    ]
+
+    write_image_stats(stats, tmp_path / "image_stats.csv")
+    assert load_image_stats(tmp_path / "image_stats.csv") == stats
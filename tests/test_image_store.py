@@ -0,0 +1,26 @@
+"""Unit tests for the `image_store` module."""
+
+import hashlib
+
+from nordjylland_news.image_store import ContentAddressedImageStore
+
+
+def test_put_deduplicates(tmp_path):
+    store = ContentAddressedImageStore(tmp_path, shard_depth=2, shard_width=2)
+    content = b"\xff\xd8\xff image bytes"
+    digest = hashlib.sha256(content).hexdigest()
+
+    stored = []
+    for uuid in ["first-uuid", "second-uuid"]:
+        part_path = store.part_path(uuid)
+        part_path.write_bytes(content)
+        stored.append(store.put(part_path))
+        assert not part_path.exists()
+
+    assert stored[0] == stored[1]
+    assert stored[0][0] == digest
+
+    path = stored[0][1]
+    assert path == tmp_path / digest[:2] / digest[2:4] / f"{digest}.jpg"
+    assert path.read_bytes() == content
+    assert len(list(tmp_path.rglob("*.jpg"))) == 1
@@ -0,0 +1,57 @@
+"""Unit tests for the `near_duplicates` module."""
+
+import random
+
+import numpy as np
+
+from nordjylland_news.near_duplicates import MinHasher, find_clusters, shingles
+
+
+def make_text(rng, n_words=200):
+    return " ".join(
+        "".join(rng.choice("abcdefghijklmnopqrstuvwxyzæøå") for _ in range(6))
+        for _ in range(n_words)
+    )
+
+
+def test_shingles_ignore_case_and_whitespace():
+    assert np.array_equal(shingles("Nordjyske  Nyheder"), shingles("nordjyske nyheder"))
+
+
+def test_signatures_estimate_jaccard_similarity():
+    rng = random.Random(0)
+    text = make_text(rng)
+    words = text.split()
+    words[10] = "ændret"
+    texts = [text, " ".join(words), make_text(rng)]
+
+    signatures = MinHasher(n_permutations=128, seed=0).signatures(texts)
+    assert signatures.shape == (3, 128)
+    assert np.mean(signatures[0] == signatures[1]) > 0.8
+    assert np.mean(signatures[0] == signatures[2]) < 0.1
+
+
+def test_batches_give_the_same_signatures(monkeypatch):
+    rng = random.Random(1)
+    texts = [make_text(rng, n_words=rng.randint(1, 50)) for _ in range(50)]
+    signatures = MinHasher(n_permutations=32, seed=0).signatures(texts)
+
+    monkeypatch.setattr("nordjylland_news.near_duplicates.MAX_BATCH_SHINGLES", 100)
+    assert np.array_equal(
+        MinHasher(n_permutations=32, seed=0).signatures(texts), signatures
+    )
+
+
+def test_find_clusters():
+    rng = random.Random(2)
+    texts = [make_text(rng) for _ in range(20)]
+    words = texts[3].split()
+    words[-1] = "ændret"
+    texts.append(" ".join(words))
+    texts.append(texts[7].upper())
+
+    signatures = MinHasher(n_permutations=128, seed=0).signatures(texts)
+    clusters = find_clusters(signatures, n_bands=16, threshold=0.7)
+    assert clusters[20] == 3
+    assert clusters[21] == 7
+    assert sorted(set(clusters.tolist())) == list(range(20))
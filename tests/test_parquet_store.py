@@ -0,0 +1,71 @@
+"""Unit tests for the `parquet_store` module."""
+
+import pytest
+
+from nordjylland_news.parquet_store import (
+    SUMMARY_FIELDS,
+    ParquetDatasetWriter,
+    iter_parquet_records,
+    load_parquet_dataset,
+    parquet_parts,
+)
+from nordjylland_news.utils import append_jsonl
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def make_page(page, n_records=2):
+    return [
+        {
+            "page": page,
+            "canonical": f"c/{page}-{i}",
+            "uuid": f"{page}-{i}",
+            "text_content": "tekst",
+            "summary": "resumé",
+        }
+        for i in range(n_records)
+    ]
+
+
+def test_writer_and_readers(tmp_path):
+    folder = tmp_path / "summary_parquet"
+    writer = ParquetDatasetWriter(folder, SUMMARY_FIELDS, pages_per_row_group=2)
+    for page in range(1, 6):
+        writer.add_page(make_page(page))
+    writer.flush()
+
+    parts = parquet_parts(folder)
+    assert len(parts) == 3
+    assert pq.ParquetFile(parts[0]).metadata.num_row_groups == 1
+    assert writer.n_records == 10
+
+    table = load_parquet_dataset(folder, columns=["uuid", "page"])
+    assert table.column_names == ["uuid", "page"]
+    assert str(table.schema.field("page").type) == "int32"
+    assert table.column("uuid").to_pylist()[:3] == ["1-0", "1-1", "2-0"]
+
+    records = list(iter_parquet_records(folder, columns=["summary"], batch_size=3))
+    assert records == [{"summary": "resumé"}] * 10
+
+
+def test_sync_with_jsonl(tmp_path):
+    data_path = tmp_path / "summary.jsonl"
+    for page in range(1, 5):
+        append_jsonl(make_page(page), data_path)
+    folder = tmp_path / "summary_parquet"
+
+    # Records missing from the part files are copied from the JSONL file.
+    writer = ParquetDatasetWriter(folder, SUMMARY_FIELDS, pages_per_row_group=2)
+    writer.add_page(make_page(1))
+    writer.flush()
+    writer.sync(data_path, n_records=8)
+    assert writer.n_records == 8
+    assert load_parquet_dataset(folder).to_pylist() == sum(
+        (make_page(page) for page in range(1, 5)), []
+    )
+
+    # Part files beyond the committed records are written again.
+    writer = ParquetDatasetWriter(folder, SUMMARY_FIELDS, pages_per_row_group=2)
+    writer.sync(data_path, n_records=4)
+    assert writer.n_records == 4
+    assert len(load_parquet_dataset(folder)) == 4
@@ -0,0 +1,82 @@
+"""Unit tests for the `processing` module."""
+
+from nordjylland_news.processing import (
+    ClusterStage,
+    DedupStage,
+    FilterStage,
+    NearDuplicateStage,
+    SplitWriter,
+    load_split_manifest,
+    run_pipeline,
+)
+from nordjylland_news.utils import load_jsonl
+
+
+def make_record(i, text="Lang nok tekst", summary="Lang nok resumé"):
+    return {"uuid": str(i), "text_content": f"{text} {i}", "summary": summary}
+
+
+def test_run_pipeline(tmp_path):
+    records = [make_record(i) for i in range(100)]
+    records += [
+        make_record(0),
+        make_record(1, summary="Opdateres..."),
+        make_record(2, text=""),
+    ]
+    split_writer = SplitWriter(tmp_path, val_fraction=0.1, test_fraction=0.1)
+    stats = run_pipeline(
+        records,
+        [
+            FilterStage(min_length=10, blacklist_summaries=["Opdateres..."]),
+            DedupStage(keys=["text_content", "summary"]),
+            split_writer,
+        ],
+    )
+
+    assert [(s.name, s.n_in, s.n_dropped) for s in stats] == [
+        ("filter", 103, 2),
+        ("dedup", 101, 1),
+        ("split", 100, 0),
+    ]
+    splits = {
+        split: load_jsonl(tmp_path / f"{split}.jsonl") for split in split_writer.counts
+    }
+    assert {split: len(data) for split, data in splits.items()} == split_writer.counts
+    assert sum(split_writer.counts.values()) == 100
+    assert set(splits["train"][0]) == {"text", "summary", "text_len", "summary_len"}
+    assert load_split_manifest(tmp_path)["splits"]["val"]["n_records"] == len(
+        splits["val"]
+    )
+
+
+def test_splits_are_stable(tmp_path):
+    records = [make_record(i) for i in range(200)]
+    run_pipeline(records[:150], [SplitWriter(tmp_path / "a", 0.2, 0.2)])
+    run_pipeline(records, [SplitWriter(tmp_path / "b", 0.2, 0.2)])
+
+    # Adding records only appends to the splits.
+    for split in ["train", "val", "test"]:
+        before = load_jsonl(tmp_path / "a" / f"{split}.jsonl")
+        after = load_jsonl(tmp_path / "b" / f"{split}.jsonl")
+        assert after[: len(before)] == before
+
+
+def test_near_duplicates_share_a_split(tmp_path):
+    records = [
+        make_record(i, text="Den samme lange artikel om Aalborg") for i in range(50)
+    ]
+    near_duplicate_stage = NearDuplicateStage(
+        fields=["text_content", "summary"],
+        n_permutations=64,
+        n_bands=16,
+        threshold=0.5,
+        batch_size=16,
+        seed=0,
+    )
+    run_pipeline(records, [near_duplicate_stage])
+    clusters = near_duplicate_stage.clusters()
+    assert set(clusters.values()) == {"0"}
+
+    split_writer = SplitWriter(tmp_path, val_fraction=0.3, test_fraction=0.3)
+    run_pipeline(records, [ClusterStage(clusters), split_writer])
+    assert sorted(split_writer.counts.values()) == [0, 0, 50]
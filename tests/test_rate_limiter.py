@@ -0,0 +1,57 @@
+"""Unit tests for the `rate_limiter` module."""
+
+import time
+
+import pytest
+
+from nordjylland_news.rate_limiter import AdaptiveRateLimiter, build_rate_limiter
+
+
+@pytest.fixture
+def rate_limiter():
+    return AdaptiveRateLimiter(
+        initial_rate=10.0,
+        min_rate=1.0,
+        max_rate=12.0,
+        additive_increase=1.0,
+        multiplicative_decrease=0.5,
+        burst=2,
+    )
+
+
+def test_build_rate_limiter(config):
+    rate_limiter = build_rate_limiter(config["rate_limit"])
+    assert rate_limiter.rate == config["rate_limit"]["initial_rate"]
+
+
+def test_additive_increase(rate_limiter):
+    for _ in range(5):
+        rate_limiter.on_success()
+    assert rate_limiter.rate == 12.0
+
+
+def test_multiplicative_decrease(rate_limiter):
+    rate_limiter.on_throttle()
+    assert rate_limiter.rate == 5.0
+    for _ in range(10):
+        rate_limiter.on_throttle()
+    assert rate_limiter.rate == 1.0
+    assert rate_limiter.state["n_throttled"] == 11
+
+
+def test_retry_after_pauses_requests(rate_limiter):
+    rate_limiter.on_throttle(retry_after=0.2)
+    assert rate_limiter.state["paused_for"] > 0
+
+    start = time.monotonic()
+    rate_limiter.acquire()
+    assert time.monotonic() - start >= 0.15
+
+
+def test_acquire_respects_rate(rate_limiter):
+    # The first two requests are covered by the burst, the rest by the rate.
+    start = time.monotonic()
+    for _ in range(4):
+        rate_limiter.acquire()
+    assert time.monotonic() - start >= 0.15
+    assert rate_limiter.state["n_requests"] == 4
@@ -0,0 +1,70 @@
+"""Unit tests for the `retry` module."""
+
+import time
+
+import pytest
+import requests
+
+from nordjylland_news.exceptions import (
+    StatusCodeException,
+    TooManyRequestsException,
+)
+from nordjylland_news.retry import (
+    CircuitBreaker,
+    RetryBudget,
+    RetryPolicy,
+    build_retry_policies,
+    get_retry_policy,
+)
+
+
+@pytest.mark.parametrize("attempt", [1, 2, 5, 20])
+def test_retry_policy_delay(attempt):
+    policy = RetryPolicy(max_attempts=10, base_delay=1.0, max_delay=30.0)
+    cap = min(30.0, 2 ** (attempt - 1))
+    delays = [policy.delay(attempt) for _ in range(100)]
+    assert all(0 <= delay <= cap for delay in delays)
+
+
+@pytest.mark.parametrize(
+    "exception, policy_name",
+    [
+        (TooManyRequestsException("429"), "TooManyRequestsException"),
+        (StatusCodeException("404"), "StatusCodeException"),
+        (requests.ConnectionError("refused"), "RequestException"),
+        (requests.Timeout("timeout"), "RequestException"),
+    ],
+)
+def test_get_retry_policy(config, exception, policy_name):
+    policies = build_retry_policies(config["retry"]["policies"])
+    assert get_retry_policy(policies, exception) is policies[policy_name]
+
+
+def test_retry_budget():
+    budget = RetryBudget(ratio=0.5, min_retries=1)
+    assert budget.try_retry()
+    assert not budget.try_retry()
+    for _ in range(4):
+        budget.record_request()
+    assert sum(budget.try_retry() for _ in range(10)) == 2
+
+
+def test_circuit_breaker():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.1)
+    for _ in range(3):
+        assert breaker.allow_request("host")
+        breaker.record_failure("host")
+
+    # Other hosts are not affected.
+    assert breaker.is_open("host")
+    assert not breaker.allow_request("host")
+    assert breaker.allow_request("other_host")
+
+    # After the timeout a single probe is let through.
+    time.sleep(0.1)
+    assert breaker.allow_request("host")
+    assert not breaker.allow_request("host")
+
+    breaker.record_success("host")
+    assert not breaker.is_open("host")
+    assert breaker.allow_request("host")
@@ -0,0 +1,59 @@
+"""Unit tests for the `shards` module."""
+
+import pytest
+from PIL import Image
+
+from nordjylland_news.shards import (
+    ShardWriter,
+    iter_shard_samples,
+    list_shards,
+    read_image,
+)
+from nordjylland_news.utils import load_jsonl
+
+
+def test_write_and_read_shards(tmp_path):
+    image_paths = []
+    for i in range(5):
+        image_path = tmp_path / "images" / f"{i}.jpg"
+        image_path.parent.mkdir(exist_ok=True)
+        Image.new("RGB", (64, 64), color=(i * 50, 0, 0)).save(image_path)
+        image_paths.append(image_path)
+
+    shard_folder = tmp_path / "shards"
+    max_shard_size = 10 * 1024
+    with ShardWriter(shard_folder, max_shard_size=max_shard_size) as writer:
+        for i, image_path in enumerate(image_paths):
+            writer.write(
+                key=f"{i:09d}",
+                image_path=image_path,
+                caption=f"Billede nummer {i} fra Ålborg",
+                metadata={"file_name": image_path.name},
+            )
+
+    shards = list_shards(shard_folder)
+    assert len(shards) > 1
+    assert all(shard.stat().st_size <= max_shard_size for shard in shards)
+    assert [shard.name for shard in shards] == writer.shard_names
+
+    samples = list(iter_shard_samples(shards))
+    assert [sample["key"] for sample in samples] == [f"{i:09d}" for i in range(5)]
+    assert samples[3]["caption"] == "Billede nummer 3 fra Ålborg"
+    assert samples[3]["metadata"] == {"file_name": "3.jpg"}
+    assert samples[3]["image"] == image_paths[3].read_bytes()
+
+    index = load_jsonl(shard_folder / "index.jsonl")
+    assert read_image(shard_folder, index[4]) == image_paths[4].read_bytes()
+
+
+def test_failed_write_leaves_no_incomplete_shard(tmp_path):
+    image_path = tmp_path / "image.jpg"
+    Image.new("RGB", (64, 64)).save(image_path)
+
+    shard_folder = tmp_path / "shards"
+    with pytest.raises(FileNotFoundError):
+        with ShardWriter(shard_folder, max_shard_size=10 * 1024) as writer:
+            writer.write("000000000", image_path, caption="", metadata={})
+            writer.write("000000001", tmp_path / "missing.jpg", caption="", metadata={})
+
+    assert list(shard_folder.iterdir()) == []
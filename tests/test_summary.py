@@ -1,5 +1,7 @@
 """Unit tests for the `summary_dataset` module."""
 
+import copy
+
 import pytest
 
 from nordjylland_news.summary_dataset import SummaryDataSetBuilder
@@ -119,3 +121,65 @@ def test_summary_builder_get_text_content(
 ):
     text_content = summary_builder._get_text_content(article)
     assert text_content == expected_text_content
+
+
+@pytest.fixture
+def offline_summary_builder(config):
+    cfg = copy.deepcopy(config)
+    # Nothing listens on the discard port, so the builder does not reach the API.
+    cfg["api_info"]["url"] = "http://127.0.0.1:9/v1/articles"
+    cfg["retry"]["policies"]["RequestException"]["max_attempts"] = 1
+    cfg["text_extraction"]["n_workers"] = 2
+    cfg["text_extraction"]["chunksize"] = 2
+    builder = SummaryDataSetBuilder(cfg)
+    yield builder
+    builder.transport.close()
+
+
+def test_extract_articles_in_parallel(offline_summary_builder):
+    articles = [
+        {
+            "uuid": str(i),
+            "canonical": f"https://example.com/{i}",
+            "summary": f"Summary {i}.",
+            "content": [
+                {"type": "Text", "content": {"html": f"<p>Text {i}.</p>"}},
+                {"type": "Text", "content": {"html": "<p>Shared text.</p>"}},
+            ],
+        }
+        for i in range(20)
+    ]
+    assert offline_summary_builder.extraction_pool is None
+    parallel_data = offline_summary_builder.extract_articles(articles[:10])
+    pool = offline_summary_builder.extraction_pool
+    parallel_data += offline_summary_builder.extract_articles(articles[10:])
+    serial_data = [
+        offline_summary_builder.get_article_data(article) for article in articles
+    ]
+    assert parallel_data == serial_data
+    assert parallel_data[3]["text_content"] == "Text 3. Shared text."
+
+    # The pool is kept for the next batches, until the crawl is finished.
+    assert pool is not None
+    assert offline_summary_builder.extraction_pool is pool
+    offline_summary_builder.finish_crawl()
+    assert offline_summary_builder.extraction_pool is None
+
+
+@pytest.mark.parametrize(
+    "compression, stem",
+    [(None, "summary"), ("gzip", "summary_gz"), ("zstd", "summary_zst")],
+)
+def test_sidecar_paths_follow_data_path(config, compression, stem):
+    cfg = copy.deepcopy(config)
+    cfg["api_info"]["url"] = "http://127.0.0.1:9/v1/articles"
+    cfg["retry"]["policies"]["RequestException"]["max_attempts"] = 1
+    cfg["storage"]["compression"] = compression
+    builder = SummaryDataSetBuilder(cfg)
+    builder.transport.close()
+
+    assert builder.checkpoint_path == builder.data_path.with_name(
+        f"{stem}_checkpoint.json"
+    )
+    assert builder.uuid_index_path.name == f"{stem}_uuids.sqlite"
+    assert builder.parquet_path.name == f"{stem}_parquet"
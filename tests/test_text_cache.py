@@ -0,0 +1,48 @@
+"""Unit tests for the `text_cache` module."""
+
+from concurrent.futures import ProcessPoolExecutor
+
+from nordjylland_news.text_cache import HTMLTextCache
+
+
+def test_html_to_text_evicts_least_recently_used():
+    cache = HTMLTextCache(backend="stream", max_size=2)
+    assert cache.html_to_text("<p>a</p>") == "a"
+    assert cache.html_to_text("<p>b</p>") == "b"
+    assert cache.html_to_text("<p>a</p>") == "a"
+    assert cache.html_to_text("<p>c</p>") == "c"
+    assert cache.html_to_text("<p>a</p>") == "a"
+    assert cache.html_to_text("<p>b</p>") == "b"
+
+    state = cache.state
+    assert state["size"] == 2
+    assert state["n_hits"] == 2
+    assert state["n_misses"] == 4
+
+
+def test_save_and_load(tmp_path):
+    path = tmp_path / "cache.jsonl"
+    cache = HTMLTextCache(backend="stream", max_size=10, path=path)
+    cache.html_to_text("<p>Opdateres...</p>")
+    cache.save()
+
+    loaded = HTMLTextCache(backend="stream", max_size=10, path=path)
+    loaded.load()
+    assert loaded.html_to_text("<p>Opdateres...</p>") == "Opdateres..."
+    assert loaded.state["n_hits"] == 1
+
+    other_backend = HTMLTextCache(backend="bs4", max_size=10, path=path)
+    other_backend.load()
+    other_backend.html_to_text("<p>Opdateres...</p>")
+    assert other_backend.state["n_hits"] == 0
+
+
+def test_html_to_texts_in_process_pool():
+    htmls = [f"<p>Tekst {i % 7}</p>" for i in range(50)]
+    cache = HTMLTextCache(backend="stream", max_size=100)
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        texts = cache.html_to_texts(htmls, executor=executor, chunksize=4)
+
+    assert texts == [f"Tekst {i % 7}" for i in range(50)]
+    assert cache.state["n_misses"] == 7
+    assert cache.state["n_hits"] == 43
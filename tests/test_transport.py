@@ -0,0 +1,29 @@
+"""Unit tests for the `transport` module."""
+
+import pytest
+
+from nordjylland_news.constants import HEADERS
+from nordjylland_news.transport import HTTPTransport, build_transport, default_headers
+
+
+def test_default_headers_negotiate_compression():
+    headers = default_headers()
+    assert "gzip" in headers["accept-encoding"]
+    for key, value in HEADERS.items():
+        assert headers[key] == value
+
+
+def test_build_transport(config):
+    transport = build_transport(config["transport"])
+    assert isinstance(transport, HTTPTransport)
+    transport.close()
+
+
+@pytest.mark.parametrize("max_connections_per_host", [1, 8])
+def test_transport_pool_size(max_connections_per_host):
+    transport = HTTPTransport(
+        max_hosts=2, max_connections_per_host=max_connections_per_host
+    )
+    adapter = transport.session.get_adapter("https://public.nord.bazo.dk")
+    assert adapter._pool_maxsize == max_connections_per_host
+    transport.close()
@@ -0,0 +1,65 @@
+"""Unit tests for the JSONL helpers of the `utils` module."""
+
+from pathlib import Path
+
+import pytest
+
+from nordjylland_news.utils import (
+    append_jsonl,
+    init_jsonl,
+    iter_jsonl,
+    iter_jsonl_frames,
+    load_jsonl,
+    write_jsonl,
+)
+
+
+def test_append_and_load_jsonl(tmp_path):
+    file_name = tmp_path / "dataset.jsonl"
+    init_jsonl(file_name)
+    data = [{"file_name": Path("images/a.jpg"), "caption": "Æbler på Aalborg torv"}]
+    append_jsonl(data, file_name)
+    append_jsonl([{"file_name": "images/b.jpg", "caption": None}], file_name)
+
+    assert isinstance(data[0]["file_name"], Path)
+    assert load_jsonl(file_name) == [
+        {"file_name": "images/a.jpg", "caption": "Æbler på Aalborg torv"},
+        {"file_name": "images/b.jpg", "caption": None},
+    ]
+
+
+def test_iter_jsonl_skips_blank_lines(tmp_path):
+    file_name = tmp_path / "dataset.jsonl"
+    write_jsonl([{"page": 1}, {"page": 2}], file_name)
+    with open(file_name, "a") as f:
+        f.write("\n")
+
+    assert [record["page"] for record in iter_jsonl(file_name)] == [1, 2]
+
+
+@pytest.mark.parametrize("suffix", [".jsonl.gz", ".jsonl.zst"])
+def test_compressed_jsonl(tmp_path, suffix):
+    file_name = tmp_path / f"dataset{suffix}"
+    init_jsonl(file_name)
+    pages = [[{"page": 1, "uuid": "a"}, {"page": 1, "uuid": "b"}], [{"page": 2}]]
+    for page in pages:
+        append_jsonl(page, file_name)
+
+    assert load_jsonl(file_name) == pages[0] + pages[1]
+    frames = list(iter_jsonl_frames(file_name))
+    assert [records for _, records in frames] == pages
+    assert frames[-1][0] == file_name.stat().st_size
+
+    # A truncated last frame is not yielded.
+    with open(file_name, "r+b") as f:
+        f.truncate(file_name.stat().st_size - 3)
+    assert [records for _, records in iter_jsonl_frames(file_name)] == pages[:1]
+
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".jsonl.gz", ".jsonl.zst"])
+def test_write_jsonl_round_trip(tmp_path, suffix):
+    file_name = tmp_path / f"dataset{suffix}"
+    data = [{"page": i, "text_content": "tekst " * 100} for i in range(3000)]
+    write_jsonl(data, file_name)
+
+    assert load_jsonl(file_name) == data
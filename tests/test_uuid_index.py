@@ -0,0 +1,36 @@
+"""Unit tests for the `uuid_index` module."""
+
+import json
+
+from nordjylland_news.uuid_index import UUIDIndex
+
+
+def test_add_page_is_persisted(tmp_path):
+    path = tmp_path / "dataset_uuids.sqlite"
+    index = UUIDIndex(path)
+    index.add_page(page=1, uuids=["a", "b"], n_new_records=2)
+    index.add_page(page=2, uuids=["c"], n_new_records=1)
+    index.close()
+
+    index = UUIDIndex(path)
+    assert "a" in index
+    assert "d" not in index
+    assert sorted(index.uuids()) == ["a", "b", "c"]
+    assert len(index) == 3
+    assert index.n_records == 3
+    assert index.last_page == 2
+
+
+def test_rebuild(tmp_path):
+    data_path = tmp_path / "dataset.jsonl"
+    with open(data_path, "w") as f:
+        for page, uuid in [(1, "a"), (1, "b"), (2, "c"), (3, "d")]:
+            f.write(json.dumps({"page": page, "uuid": uuid}) + "\n")
+
+    index = UUIDIndex(tmp_path / "dataset_uuids.sqlite")
+    index.add_page(page=7, uuids=["stale"], n_new_records=1)
+    index.rebuild(data_path, n_records=3)
+
+    assert sorted(index.uuids()) == ["a", "b", "c"]
+    assert index.n_records == 3
+    assert index.last_page == 2
@@ -0,0 +1,31 @@
+"""Unit tests for the `uuid_set` module."""
+
+import random
+import uuid
+
+import pytest
+
+from nordjylland_news.uuid_set import CompactUUIDSet
+
+
+@pytest.mark.parametrize("bloom_false_positive_rate", [None, 0.01])
+def test_compact_uuid_set_behaves_like_set(bloom_false_positive_rate):
+    rng = random.Random(1)
+    uuids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(1000)]
+    uuids += ["123", "not-a-uuid", uuids[0].upper()]
+
+    compact = CompactUUIDSet(
+        uuids[:300],
+        merge_threshold=64,
+        bloom_false_positive_rate=bloom_false_positive_rate,
+    )
+    reference = set(uuids[:300])
+    for uuid_str in uuids[300:] + uuids[:10]:
+        assert (uuid_str in compact) == (uuid_str in reference)
+        compact.add(uuid_str)
+        reference.add(uuid_str)
+
+    assert len(compact) == len(reference)
+    assert set(compact) == reference
+    assert all(uuid_str in compact for uuid_str in uuids)
+    assert str(uuid.UUID(int=0)) not in compact